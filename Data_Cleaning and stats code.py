@@ -1,397 +1,201 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import glob
-from tqdm import tqdm
-import seaborn as sns
-from scipy import stats
-
-# Folder Path on Google Drive
-folder_path = folder_path = "C:\\Users\\DELL\\Desktop\\other files\\Project\\trip_data-20241014T032701Z-001\\trip_data"
+import argparse
+import os
 
-# Get all CSV files in the folder
-csv_files = glob.glob(folder_path + "*.csv")
+import pandas as pd
 
-# Initialize an empty list to store dataframes
-dfs = []
+from pipeline_profile import HOOKS, PipelineProfiler, slowest_stage
+from trip_cache import load_cached_trips, update_trip_cache
+from trip_cleaning import validate_station_mappings
+from trip_cube import CUBE_FILE_NAME, TripCube
+from trip_report import IMAGE_FORMATS, render_report, report_tables
+from trip_stats import compare_durations, summarize_cached_durations
 
-# Loop over each file with tqdm progress bar, load it, rename columns, and append to the list
-for file in tqdm(csv_files, desc="Loading and Processing CSV Files"):
-    df = pd.read_csv(file)
-    # Rename the columns
-    df = df.rename(columns={
-        "member_casual": "rider_type",
-        "rideable_type": "bike_type"
-    })
-    # Append to the list of dataframes
-    dfs.append(df)
+# Environment variable naming the trip data folder when it is not given on the command line
+DATA_FOLDER_VARIABLE = "BLUEBIKES_TRIP_DATA"
 
-# Combine all dataframes into one
-combined_df = pd.concat(dfs, ignore_index=True)
+# Per-stage timings of the last run, written to the cache directory unless --profile-output is given
+PROFILE_FILE_NAME = "pipeline_profile.json"
 
-# Sort the combined DataFrame by "started_at" column
-combined_df = combined_df.sort_values(by="started_at").reset_index(drop=True)
+# Station columns, only needed for the mapping checks
+station_columns = ["start_station_name", "start_station_id", "end_station_name", "end_station_id"]
 
-combined_df.shape
+# Columns counted into the trip cube
+cube_columns = ["started_at", "rider_type", "bike_type", "start_station_name"]
 
-# Missing values
-missing_values = combined_df.isnull().sum()
-missing_values
+# Columns counted into the origin-destination flow matrix
+flow_columns = ["started_at", "rider_type", "start_station_name", "end_station_name"]
 
-# Remove rows with any missing values
-combined_df = combined_df.dropna()
+# Columns counted into the station departure and arrival time series
+occupancy_columns = ["started_at", "ended_at", "start_station_name", "end_station_name"]
 
-combined_df.head()
+# Columns of the compact analysis table
+analysis_columns = ["started_at", "ended_at", "rider_type", "bike_type", "trip_duration"]
 
-# Most/least popular stations
-combined_df["start_station_name"].value_counts()
 
-def validate_station_mappings(dataframe):
+def parse_arguments(argv=None):
     """
-    Validate Station Name-to-ID mappings for both start and end stations.
-
-    This function checks for inconsistencies between station names and station IDs by identifying
-    cases where a station name is associated with multiple station IDs or where a station ID is
-    associated with multiple station names. The results are printed to the console.
+    Read the trip data folder from the command line, or from BLUEBIKES_TRIP_DATA.
 
     Parameters:
-        dataframe (pd.DataFrame): The DataFrame containing bike trip data with station names and IDs.
-    """
+        argv (list): Command-line arguments. Defaults to sys.argv.
 
-    # Create dictionaries to map start station names to IDs and start station IDs to names
-    start_name_to_ids = dataframe.groupby("start_station_name")["start_station_id"].unique().to_dict()
-    start_id_to_names = dataframe.groupby("start_station_id")["start_station_name"].unique().to_dict()
-
-    # Create dictionaries to map end station names to IDs and end station IDs to names
-    end_name_to_ids = dataframe.groupby("end_station_name")["end_station_id"].unique().to_dict()
-    end_id_to_names = dataframe.groupby("end_station_id")["end_station_name"].unique().to_dict()
-
-    # Check for mismatches in start stations (name to multiple IDs)
-    print("Start Station Names Mapping to Multiple IDs:")
-    if any(len(ids) > 1 for ids in start_name_to_ids.values()):
-        for name, ids in start_name_to_ids.items():
-            if len(ids) > 1:
-                print(f"{name}: {list(ids)} (Instances: {len(ids)})")
-    else:
-        print("nil")
-
-    # Check for mismatches in start stations (ID to multiple names)
-    print("\nStart Station IDs Mapping to Multiple Names:")
-    if any(len(names) > 1 for names in start_id_to_names.values()):
-        for station_id, names in start_id_to_names.items():
-            if len(names) > 1:
-                print(f"{station_id}: {list(names)} (Instances: {len(names)})")
-    else:
-        print("nil")
-
-    # Check for mismatches in end stations (name to multiple IDs)
-    print("\nEnd Station Names Mapping to Multiple IDs:")
-    if any(len(ids) > 1 for ids in end_name_to_ids.values()):
-        for name, ids in end_name_to_ids.items():
-            if len(ids) > 1:
-                print(f"{name}: {list(ids)} (Instances: {len(ids)})")
-    else:
-        print("nil")
-
-    # Check for mismatches in end stations (ID to multiple names)
-    print("\nEnd Station IDs Mapping to Multiple Names:")
-    if any(len(names) > 1 for names in end_id_to_names.values()):
-        for station_id, names in end_id_to_names.items():
-            if len(names) > 1:
-                print(f"{station_id}: {list(names)} (Instances: {len(names)})")
-    else:
-        print("nil")
-
-# Call the function with your DataFrame
-validate_station_mappings(combined_df)
-
-# Delete trips starting or ending at station ID "S32020" (this station does not exist)
-start_S32020 = combined_df["start_station_id"].value_counts().get("S32020", 0)
-end_S32020 = combined_df["end_station_id"].value_counts().get("S32020", 0)
-
-S32020_mismatch = start_S32020 + end_S32020
-print(f"{S32020_mismatch} of the trips start or end at station S32020.")
-
-combined_df = combined_df[~((combined_df["start_station_id"] == "S32020") |
-                            (combined_df["end_station_id"] == "S32020"))]
-
-# Count instances of "A32046" under start and end station IDs for the name "Tremont St at Court St"
-count_start = combined_df[(combined_df["start_station_id"] == "A32046") &
-                          (combined_df["start_station_name"] == "Tremont St at Court St")].shape[0]
-
-count_end = combined_df[(combined_df["end_station_id"] == "A32046") &
-                        (combined_df["end_station_name"] == "Tremont St at Court St")].shape[0]
-
-# Total instances
-total_count = count_start + count_end
-print(f"Total instances of station ID A32046 mismatched with Tremont St at Court St: {total_count}")
-
-# Update start_station_name and end_station_name for "A32046" instances
-# Station ID A32046 is for "Canal St at Causeway St" not "Tremont St at Court St"
-
-combined_df.loc[(combined_df["start_station_id"] == "A32046") &
-                (combined_df["start_station_name"] == "Tremont St at Court St"),
-                "start_station_name"] = "Canal St at Causeway St"
-
-combined_df.loc[(combined_df["end_station_id"] == "A32046") &
-                (combined_df["end_station_name"] == "Tremont St at Court St"),
-                "end_station_name"] = "Canal St at Causeway St"
-
-def update_station_names(dataframe, old_name, new_name):
+    Returns:
+        argparse.Namespace: The arguments, with "folder_path", the profiling and the report options.
     """
-    Update station names in both start and end station columns of the DataFrame.
-
-    This function replaces occurrences of the specified old station name with the new station name
-    in both "start_station_name" and "end_station_name" columns of the DataFrame.
-
-    Parameters:
-        dataframe (pd.DataFrame): The DataFrame containing bike trip data with station names.
-        old_name (str): The old station name to be replaced.
-        new_name (str): The new station name to replace with.
-    """
-    # Update both start and end station names
-    dataframe.loc[dataframe["start_station_name"] == old_name, "start_station_name"] = new_name
-    dataframe.loc[dataframe["end_station_name"] == old_name, "end_station_name"] = new_name
-
-# List of changes to be made
-changes = [
-    ["Canal St. at Causeway St.", "Canal St at Causeway St"],
-    ["Tremont St. at Court St.", "Tremont St at Court St"],
-    ["Chestnut Hill Ave. at Ledgemere Road", "Chestnut Hill Ave at Ledgemere Rd"],
-    ["Centre St. at Allandale St.", "Centre St at Allandale St"],
-    ["Hyde Square - Barbara St at Centre St", "Hyde Square - Centre St at Perkins St"],
-    ["Swan Pl. at Minuteman Bikeway", "Swan Place at Minuteman Bikeway"],
-    ["CambridgeSide Galleria - CambridgeSide PL at Land Blvd", "Cambridgeside Pl at Land Blvd"],
-    ["Summer St at Quincy St", "Somerville Hospital"],
-    ["Everett Square (Broadway at Chelsea St)", "Everett Square (Broadway at Norwood St)"],
-    ["Damrell st at Old Colony Ave", "Damrell St at Old Colony Ave"]
-]
-
-# Applying the changes to the DataFrame
-for old_name, new_name in changes:
-    update_station_names(combined_df, old_name, new_name)
-
-# Confirmation message
-print("Station names updated successfully.")
-
-# Check for mismatch again
-validate_station_mappings(combined_df)
-
-"""
-The \xa0 character is the Unicode representation for a non-breaking space (NBSP). This character
-is different from a regular space ( " " , Unicode U+0020 ) although they appear the same.
-"""
-
-# Standardize station names for A32046
-standard_name = "Canal St at Causeway St"
-
-# Identify and replace the inconsistent names
-combined_df.loc[
-    (combined_df["end_station_id"] == "A32046") &
-    (combined_df["end_station_name"].isin(["Canal St at Causeway St",
-    "Canal St\xa0at\xa0Causeway\xa0St"])), "end_station_name"] = standard_name
-
-# Final check for mismatch
-validate_station_mappings(combined_df)
-
-combined_df
-
-combined_df.dtypes
-
-# Check for date/time rows that contain fractional seconds
-fractional_seconds = combined_df[combined_df["started_at"].str.contains(r"\.\d+")]
-fractional_seconds[["started_at", "ended_at"]].head()
-
-# Convert started_at and ended_at columns to datetime format
-combined_df["started_at"] = pd.to_datetime(combined_df["started_at"], format="%Y-%m-%d %H:%M:%S", errors='coerce')
-combined_df["ended_at"] = pd.to_datetime(combined_df["ended_at"], format="%Y-%m-%d %H:%M:%S", errors='coerce')
-
-combined_df[["started_at", "ended_at"]].dtypes
-
-# TOTAL TRIPS PER HOUR OF DAY
-
-# Extract the hours the trips started
-combined_df["start_hour"] = combined_df["started_at"].dt.hour
-
-# Group by Hour of Day to calculate total trips
-hourly_trip_starts = combined_df.groupby("start_hour").size().reset_index(name="Total Start Trips")
-
-# Plotting
-plt.figure(figsize=(12, 4))
-plt.plot(hourly_trip_starts["start_hour"], hourly_trip_starts["Total Start Trips"], marker='o', color="blue")
-
-# Set x-axis ticks to show every hour
-plt.xticks(range(24))
-
-# Show morning and evening peaks
-plt.axvline(x=8, color='green', linestyle='--', label='Morning Peak Hour (08:00 A.M.)')
-plt.axvline(x=17, color='red', linestyle='--', label='Evening Peak Hour (05:00 P.M.)')
-
-# Add titles and labels
-plt.title("Total Trips by Hour of Day")
-plt.xlabel("Hour of Day")
-plt.ylabel("Total Trips")
-
-# Remove vertical grid lines
-plt.grid(axis='y')
-
-# Remove plot boundaries at right, left, and top
-plt.gca().spines['top'].set_visible(False)
-plt.gca().spines['right'].set_visible(False)
-plt.gca().spines['left'].set_visible(False)
-
-plt.legend()
-plt.tight_layout()
-plt.show()
-
-# TOTAL TRIPS PER HOUR OF DAY AND DAY OF WEEK
-
-# Extract the day of the week the trips started
-combined_df["start_day_of_week"] = combined_df["started_at"].dt.day_name()
-
-# Group by Day of the Week and Hour of Day to calculate total trips
-hourly_weekly_trip_starts = combined_df.groupby(["start_day_of_week", "start_hour"]).size().unstack(fill_value=0)
-
-# Reorder the days of the week for proper visualization
-days_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-hourly_weekly_trip_starts = hourly_weekly_trip_starts.reindex(days_order)
-
-# Plotting
-plt.figure(figsize=(12, 4))
-for day in hourly_weekly_trip_starts.index:
-    plt.plot(hourly_weekly_trip_starts.columns, hourly_weekly_trip_starts.loc[day], marker='o', label=day)
-
-plt.xticks(range(24))
-plt.title("Daily Trips by Hour of Day and Day of Week")
-plt.xlabel("Hour of Day")
-plt.ylabel("Total Trips")
-plt.grid(axis='y')
-
-# Remove plot boundaries at right, left, and top
-plt.gca().spines['top'].set_visible(False)
-plt.gca().spines['right'].set_visible(False)
-plt.gca().spines['left'].set_visible(False)
-
-plt.legend(title="Day of Week")
-plt.tight_layout()
-plt.show()
-
-# TOTAL TRIPS PER HOUR OF DAY AND DAY OF WEEK (HEATMAP)
-
-# Plotting the heatmap
-plt.figure(figsize=(12, 4))
-sns.heatmap(hourly_weekly_trip_starts, cmap="Blues", annot=False, cbar_kws={'label': 'Total Trips'},
-            linewidths=0.5, linecolor='black', square=True)
-
-# Customize the plot
-plt.title("Daily Trips by Hour of Day and Day of Week", fontsize=16)
-plt.xlabel("Hour of Day", fontsize=12)
-plt.ylabel("Day of Week", fontsize=12)
-
-# Set the x-ticks to show every hour
-plt.xticks(ticks=range(24), labels=range(24))
-
-# Remove plot boundaries at right, left, and top
-plt.gca().spines['top'].set_visible(False)
-plt.gca().spines['right'].set_visible(False)
-plt.gca().spines['left'].set_visible(False)
-
-plt.tight_layout()
-plt.show()
-
-# TOTAL TRIPS PER HOUR OF DAY BY RIDER TYPE
-
-# Group by Hour of Day and Rider Type to calculate total trips
-hourly_trip_starts_by_rider_type = combined_df.groupby(["start_hour", "rider_type"]).size().unstack(fill_value=0)
-
-# Plotting
-plt.figure(figsize=(12, 4))
-
-# Plot separate lines for each rider type
-for rider_type in hourly_trip_starts_by_rider_type.columns:
-    plt.plot(hourly_trip_starts_by_rider_type.index, hourly_trip_starts_by_rider_type[rider_type],
-             marker='o', label=rider_type.capitalize())
-
-# Set x-axis ticks to show every hour
-plt.xticks(range(24))
-
-# Add titles and labels
-plt.title("Total Trips by Hour of Day by Rider Type")
-plt.xlabel("Hour of Day")
-plt.ylabel("Total Trips")
-
-# Remove vertical grid lines
-plt.grid(axis='y')
-
-# Remove plot boundaries at right, left, and top
-plt.gca().spines['top'].set_visible(False)
-plt.gca().spines['right'].set_visible(False)
-plt.gca().spines['left'].set_visible(False)
-
-plt.legend(title="Rider Type")
-plt.tight_layout()
-plt.show()
-
-# RIDER TYPE ANALYSIS
-
-rider_type_analysis = combined_df.groupby(['rider_type', 'bike_type']).size().unstack()
-rider_type_analysis.plot(kind='bar', stacked=True)
-plt.title("Rider Type Analysis by Bike Type")
-plt.ylabel("Total Trips")
-plt.xlabel("Rider Type")
-plt.xticks(rotation=0)
-plt.show()
-
-# BOXPLOT FOR TRIP DURATION BY BIKE TYPE
-
-plt.figure(figsize=(4, 12))
-sns.boxplot(x='bike_type', y='trip_duration', data=combined_df)
-plt.title("Trip Duration by Bike Type")
-plt.show()
-
-# TOTAL TRIPS PER HOUR OF DAY BY BIKE TYPE
-
-# Group by Hour of Day and Bike Type to calculate total trips
-hourly_trip_starts_by_bike_type = combined_df.groupby(["start_hour", "bike_type"]).size().unstack(fill_value=0)
-
-# Plotting
-plt.figure(figsize=(12, 4))
-
-# Plot separate lines for each bike type
-for bike_type in hourly_trip_starts_by_bike_type.columns:
-    plt.plot(hourly_trip_starts_by_bike_type.index, hourly_trip_starts_by_bike_type[bike_type],
-             marker='o', label=bike_type.replace("_", " ").capitalize())
-
-# Set x-axis ticks to show every hour
-plt.xticks(range(24))
-
-# Add titles and labels
-plt.title("Total Trips by Hour of Day by Bike Type")
-plt.xlabel("Hour of Day")
-plt.ylabel("Total Trips")
-
-# Remove vertical grid lines
-plt.grid(axis='y')
-
-# Remove plot boundaries at right, left, and top
-plt.gca().spines['top'].set_visible(False)
-plt.gca().spines['right'].set_visible(False)
-plt.gca().spines['left'].set_visible(False)
-
-plt.legend(title="Bike Type")
-plt.tight_layout()
-plt.show()
-
-# Create a new column for trip duration in seconds
-combined_df["trip_duration"] = (combined_df["ended_at"] - combined_df["started_at"]).dt.total_seconds()
-
-# Filter the trip durations for electric and classic bikes
-electric_durations = combined_df[combined_df["bike_type"] == "electric_bike"]["trip_duration"]
-classic_durations = combined_df[combined_df["bike_type"] == "classic_bike"]["trip_duration"]
-
-# Perform independent t-test
-t_stat, p_value = stats.ttest_ind(electric_durations, classic_durations)
-
-# Output the result
-print(f"T-statistic: {t_stat}, P-value: {p_value}")
-
-
+    parser = argparse.ArgumentParser(description="Clean the Bluebikes trip data and render the trip analysis figures.")
+    parser.add_argument("folder_path", nargs="?", default=os.environ.get(DATA_FOLDER_VARIABLE),
+                        help=f"Folder containing the monthly trip CSV files (default: ${DATA_FOLDER_VARIABLE})")
+    parser.add_argument("--profile-output", help=f"JSON file for the stage timings (default: <cache>/{PROFILE_FILE_NAME})")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also record Python allocations per stage")
+    parser.add_argument("--profile-stage", action="append", default=[],
+                        help='Run a stage under the profiling hook; "slowest" is the slowest stage of the last run')
+    parser.add_argument("--profile-hook", choices=list(HOOKS), default="cprofile", help="Profiler for --profile-stage")
+    parser.add_argument("--report-dir", help="Directory for the analysis figures (default: <cache>/report)")
+    parser.add_argument("--report-formats", nargs="+", choices=IMAGE_FORMATS, default=list(IMAGE_FORMATS),
+                        help="Image formats of the analysis figures")
+    args = parser.parse_args(argv)
+    if not args.folder_path:
+        parser.error(f"give the trip data folder as an argument or set {DATA_FOLDER_VARIABLE}")
+    return args
+
+
+# Worker processes spawned by the loader import this file, so the pipeline only runs when executed directly
+if __name__ == "__main__":
+    args = parse_arguments()
+    folder_path = args.folder_path
+
+    # Cleaned trips are cached as Parquet next to the raw CSV files
+    cache_dir = os.path.join(folder_path, "cleaned_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Time and memory of every stage below, written after each stage so a crashed run still has them
+    profile_path = args.profile_output or os.path.join(cache_dir, PROFILE_FILE_NAME)
+    hook_stages = [slowest_stage(profile_path) if stage == "slowest" else stage for stage in args.profile_stage]
+    if None in hook_stages:
+        print(f"No earlier profile in {profile_path}; run once before profiling the slowest stage.")
+    profiler = PipelineProfiler("cleaning_script", trace_python=args.tracemalloc, hook=args.profile_hook,
+                                hook_stages=[stage for stage in hook_stages if stage], hook_dir=cache_dir,
+                                output_path=profile_path)
+
+    # Re-clean only the monthly CSV files that are new or changed since the last run; the workers
+    # time their read, parse, cleaning and write steps
+    with profiler.stage("update_trip_cache") as stage:
+        cache_report = update_trip_cache(folder_path, cache_dir, profile_steps=True)
+        stage["rows_out"] = sum(counts["rows_out"] for counts in cache_report["counts"].values())
+    profiler.add_worker_steps("update_trip_cache", cache_report["steps"].values())
+    print(f"Cleaned {len(cache_report['rebuilt'])} new or changed files, "
+          f"{len(cache_report['unchanged'])} unchanged, {len(cache_report['removed'])} removed.")
+
+    # Rows removed or fixed by each cleaning step, summed over all files
+    cleaning_counts = pd.DataFrame.from_dict(cache_report["counts"], orient="index")
+    cleaning_counts.sum()
+
+    print(f"{cleaning_counts['dropped_station_trips'].sum()} of the trips start or end at station S32020.")
+    print(f"Total instances of station ID A32046 mismatched with Tremont St at Court St: "
+          f"{cleaning_counts['renamed_at_id'].sum()}")
+    print(f"{cleaning_counts['names_remapped'].sum()} station names standardized.")
+
+    # Timestamps with fractional seconds are parsed too; any value that still fails is dropped as missing
+    print(f"{cleaning_counts['fallback_timestamps'].sum()} timestamps with fractional seconds, "
+          f"{cleaning_counts['unparsed_timestamps'].sum()} unparseable.")
+
+    # trip_duration (int32 seconds) is derived during cleaning; implausible durations are dropped
+    print(f"Trips dropped for duration: {cleaning_counts['negative_duration'].sum()} negative, "
+          f"{cleaning_counts['short_duration'].sum()} under a minute, "
+          f"{cleaning_counts['long_duration'].sum()} over a day.")
+
+    # Final check for mismatch, reading only the station columns
+    with profiler.stage("validate_station_mappings") as stage:
+        station_df = load_cached_trips(cache_dir, columns=station_columns)
+        station_report = validate_station_mappings(station_df)
+        stage["rows_in"] = len(station_df)
+
+    del station_df
+
+    # Count trips by date, hour, weekday, rider type, bike type and start station in one pass;
+    # every table below is a sum over this cube instead of a groupby over the trips
+    with profiler.stage("trip_cube") as stage:
+        cube_df = load_cached_trips(cache_dir, columns=cube_columns)
+        cube = TripCube.from_trips(cube_df)
+        cube.save(os.path.join(cache_dir, CUBE_FILE_NAME))
+        stage["rows_in"], stage["rows_out"] = len(cube_df), len(cube.counts)
+
+    del cube_df
+
+    # Most/least popular stations
+    cube.station_trip_starts()
+
+    # Trips between every pair of stations, by hour and rider type, in one sparse matrix; imported
+    # here because it loads scipy
+    from trip_flows import FLOW_FILE_NAME, FlowMatrix
+
+    with profiler.stage("flow_matrix") as stage:
+        flow_df = load_cached_trips(cache_dir, columns=flow_columns)
+        flows = FlowMatrix.from_trips(flow_df)
+        flows.save(os.path.join(cache_dir, FLOW_FILE_NAME))
+        stage["rows_in"], stage["rows_out"] = len(flow_df), flows.counts.nnz
+
+    del flow_df
+
+    # Most popular routes, and the share of trips balanced by trips in the opposite direction
+    print(flows.top_routes(10).to_string(index=False))
+    flow_share = flows.flow_share()
+    print(f"{flow_share['symmetric_share']:.1%} of trips are balanced by return trips, "
+          f"{flow_share['asymmetric_share']:.1%} are one-way flow.")
+
+    # Departures and arrivals per station in 15 minute buckets, for rebalancing
+    from trip_occupancy import OCCUPANCY_FILE_NAME, StationOccupancy
+
+    with profiler.stage("station_occupancy") as stage:
+        occupancy_df = load_cached_trips(cache_dir, columns=occupancy_columns)
+        occupancy = StationOccupancy.from_trips(occupancy_df, bucket_minutes=15)
+        occupancy.save(os.path.join(cache_dir, OCCUPANCY_FILE_NAME))
+        stage["rows_in"], stage["rows_out"] = len(occupancy_df), occupancy.departures.size
+
+    del occupancy_df
+
+    # Stations gaining or losing the most bikes over the whole period, and on each day
+    print(occupancy.worst_imbalance(10).to_string())
+    occupancy.worst_imbalance_per_period(k=3)
+
+    with profiler.stage("load_analysis_table") as stage:
+        # The cache already stores the compact types (categoricals, int32 durations), so no conversion is needed
+        combined_df = load_cached_trips(cache_dir, columns=analysis_columns)
+        stage["rows_out"] = len(combined_df)
+
+    combined_df.shape
+
+    combined_df.dtypes
+
+    # started_at and ended_at are parsed to datetime (including fractional seconds) while reading
+    combined_df[["started_at", "ended_at"]].dtypes
+
+    # Summarize trip durations per bike type, one cache partition per worker, and merge the summaries
+    with profiler.stage("duration_statistics"):
+        duration_stats = summarize_cached_durations(cache_dir, by=["bike_type"])
+    duration_stats.table()
+
+    # Hourly, weekday and rider/bike figures from the cube and the duration box plot from the
+    # histograms, drawn headless across worker processes; figures with unchanged input are skipped
+    with profiler.stage("render_report") as stage:
+        tables = report_tables(cube, duration_stats)
+        report = render_report(tables, args.report_dir or os.path.join(cache_dir, "report"), args.report_formats)
+        stage["rows_in"], stage["rows_out"] = len(tables), len(report["rendered"])
+    print(f"Rendered {len(report['rendered'])} figures, skipped {len(report['skipped'])} unchanged: {report['index']}")
+
+    # Welch t-test, Mann-Whitney U test and bootstrap interval for electric vs classic bikes
+    with profiler.stage("compare_durations"):
+        comparison = compare_durations(duration_stats.groups["electric_bike"], duration_stats.groups["classic_bike"])
+
+    # Output the result
+    print(f"T-statistic: {comparison['welch_t']}, P-value: {comparison['welch_p']}")
+    print(f"Mann-Whitney U: {comparison['mann_whitney_u']}, P-value: {comparison['mann_whitney_p']}")
+    print(f"Mean difference: {comparison['mean_difference']:.1f} s, "
+          f"95% CI: ({comparison['mean_difference_ci'][0]:.1f}, {comparison['mean_difference_ci'][1]:.1f})")
+
+    # Where the run spent its time and memory
+    profiler.write_json(profile_path)
+    print(profiler.summary())
+    for stage_name, output in profiler.hook_outputs.items():
+        print(f"{args.profile_hook} output for {stage_name}: {output}")
+    print(f"Stage profile written to {profile_path}")
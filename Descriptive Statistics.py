@@ -1,10 +1,30 @@
+import importlib
+import os
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy.stats import gmean, hmean, skew, kurtosis
+
+# Only light modules are imported at startup so the window appears quickly. pandas, pyarrow,
+# scipy and matplotlib are imported where they are first needed, and preloaded in the background
+# once the window is up (see preload_modules).
+from stats_core import CATEGORY_TECHNIQUES, MEAN_TYPES, compute_statistic, interpret_plot
+from stats_tasks import TaskRunner
+
+# Heavy modules imported on a background thread after startup
+PRELOAD_MODULES = ["stats_io", "stats_profile", "stats_plots", "matplotlib.figure", "matplotlib.cbook"]
+
+# Precision choices: exact statistics, or sketches with the given error bound. The column is already
+# in memory, and the exact statistics are faster than sketching it, so Exact is the default.
+PRECISION_OPTIONS = {
+    "Exact": None,
+    "Auto (sketch huge columns)": "auto",
+    "Approximate (1% error)": 0.01,
+    "Approximate (0.1% error)": 0.001
+}
+
+# Choice in the optional weight and group-by dropdowns meaning "no column"
+NO_COLUMN = "(none)"
 
 # GUI class
 class StatsApp:
@@ -12,73 +32,182 @@ class StatsApp:
         self.root = root
         self.root.title("Descriptive Statistics Analysis Tool")
 
+        # Controls on the left, the embedded plot on the right
+        controls = tk.Frame(root)
+        controls.pack(side=tk.LEFT, fill=tk.Y, padx=10)
+
+        # The matplotlib canvas is created in this frame on the first plot
+        self.plot_area = tk.Frame(root, width=700, height=450)
+        self.plot_area.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        self._plot_panel = None
+
         # File upload section
-        self.label = tk.Label(root, text="Upload Excel File for Analysis", font=("Arial", 12))
+        self.label = tk.Label(controls, text="Upload Excel, CSV or Parquet File for Analysis", font=("Arial", 12))
         self.label.pack(pady=10)
 
-        self.upload_button = tk.Button(root, text="Load Excel File", command=self.load_file)
+        self.upload_button = tk.Button(controls, text="Load Data File", command=self.load_file)
         self.upload_button.pack(pady=10)
 
         # Dropdown to select columns
-        self.column_dropdown = ttk.Combobox(root, values=[], state="readonly")
+        self.column_dropdown = ttk.Combobox(controls, values=[], state="readonly")
         self.column_dropdown.set("Select Column")
         self.column_dropdown.pack(pady=10)
 
         # Dropdown for main statistical category (Central Tendency, Dispersion, Visualization)
-        self.stat_category = ttk.Combobox(root, values=["Central Tendency", "Dispersion", "Graphical Analysis"], state="readonly")
+        self.stat_category = ttk.Combobox(controls, values=list(CATEGORY_TECHNIQUES), state="readonly")
         self.stat_category.set("Select Statistical Category")
         self.stat_category.pack(pady=10)
 
         # Dropdown for specific technique (mean, median, mode, etc.)
-        self.stat_technique = ttk.Combobox(root, values=[], state="readonly")
+        self.stat_technique = ttk.Combobox(controls, values=[], state="readonly")
         self.stat_technique.set("Select Statistical Technique")
         self.stat_technique.pack(pady=10)
 
         # Dropdown for sub-techniques (arithmetic, geometric, etc.)
-        self.sub_technique = ttk.Combobox(root, values=[], state="readonly")
+        self.sub_technique = ttk.Combobox(controls, values=[], state="readonly")
         self.sub_technique.set("Select Sub-technique")
         self.sub_technique.pack(pady=10)
 
-        self.analyze_button = tk.Button(root, text="Analyze", command=self.analyze_data)
+        # Optional weight column (for the weighted mean) and group-by column (statistics per group)
+        tk.Label(controls, text="Weight Column").pack()
+        self.weight_dropdown = ttk.Combobox(controls, values=[NO_COLUMN], state="readonly")
+        self.weight_dropdown.set(NO_COLUMN)
+        self.weight_dropdown.pack(pady=(0, 10))
+
+        tk.Label(controls, text="Group By").pack()
+        self.group_dropdown = ttk.Combobox(controls, values=[NO_COLUMN], state="readonly")
+        self.group_dropdown.set(NO_COLUMN)
+        self.group_dropdown.pack(pady=(0, 10))
+
+        # Exact or sketched median, mode, distinct count and box plot
+        self.precision = ttk.Combobox(controls, values=list(PRECISION_OPTIONS), state="readonly", width=28)
+        self.precision.set("Exact")
+        self.precision.pack(pady=10)
+
+        self.analyze_button = tk.Button(controls, text="Analyze", command=self.analyze_data)
         self.analyze_button.pack(pady=10)
 
+        # Progress of the file loads and analyses running in the background
+        self.progress = ttk.Progressbar(controls, length=250, mode="determinate", maximum=100)
+        self.progress.pack(pady=(10, 0))
+
+        self.status_label = tk.Label(controls, text="Ready", font=("Arial", 9))
+        self.status_label.pack()
+
+        self.cancel_button = tk.Button(controls, text="Cancel", command=self.cancel_tasks)
+        self.cancel_button.pack(pady=10)
+
         self.df = None
+        self.table_window = None
+
+        # Column statistics are computed once per loaded file and column; the cache is created per file
+        self.dataset_version = 0
+        self.profiles = None
+
+        # File loading and statistics run on worker threads; results come back on the Tk main thread
+        self.tasks = TaskRunner(root, on_progress=self.show_progress)
+        self.root.report_callback_exception = self.report_callback_error
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
         # Binding dropdowns for dynamic updates
         self.stat_category.bind("<<ComboboxSelected>>", self.update_technique_options)
         self.stat_technique.bind("<<ComboboxSelected>>", self.update_sub_technique_options)
 
+        self.root.after_idle(self.preload_modules)
+
+    def preload_modules(self):
+        # Import the data libraries while the user picks a file, so the first load does not wait for them
+        def import_all():
+            for module in PRELOAD_MODULES:
+                importlib.import_module(module)
+
+        threading.Thread(target=import_all, name="stats-preload", daemon=True).start()
+
+    @property
+    def plot_panel(self):
+        if self._plot_panel is None:
+            from stats_canvas import PlotPanel
+
+            self._plot_panel = PlotPanel(self.plot_area)
+            self._plot_panel.pack(fill=tk.BOTH, expand=True)
+        return self._plot_panel
+
     def load_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx *.xls")])
+        from stats_io import SUPPORTED_FILETYPES
+
+        file_path = filedialog.askopenfilename(filetypes=SUPPORTED_FILETYPES)
         if file_path:
-            try:
-                self.df = pd.read_excel(file_path)
-                self.column_dropdown['values'] = self.df.columns.tolist()
-                messagebox.showinfo("File Loaded", "Excel file loaded successfully!")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load file: {e}")
+            # CSV files are parsed in chunks and can be cancelled between them; pd.read_excel is one call
+            self.tasks.submit(self.read_file, file_path, on_done=self.file_loaded, on_error=self.file_load_failed,
+                              description=f"Loading {os.path.basename(file_path)}",
+                              cancellable=not file_path.lower().endswith((".xlsx", ".xls")))
         else:
-            messagebox.showwarning("File Not Found", "Please select a valid Excel file.")
+            messagebox.showwarning("File Not Found", "Please select a valid data file.")
+
+    # Runs on a worker thread
+    def read_file(self, task, file_path):
+        from stats_io import load_dataset
+
+        # Workbooks are parsed once into a columnar cache; columns are read when first analyzed
+        task.report_progress(0.0, "Opening file")
+        return load_dataset(file_path, progress=lambda message: task.report_progress(0.0, message))
+
+    def file_loaded(self, df):
+        from stats_profile import ProfileCache
+
+        self.df = df
+        self.dataset_version += 1
+        self.profiles = ProfileCache()
+        self.column_dropdown['values'] = self.df.columns.tolist()
+        for dropdown in (self.weight_dropdown, self.group_dropdown):
+            dropdown['values'] = [NO_COLUMN] + self.df.columns.tolist()
+            dropdown.set(NO_COLUMN)
+        messagebox.showinfo("File Loaded", f"{os.path.basename(df.source_path)} loaded successfully!")
+
+    def file_load_failed(self, error):
+        messagebox.showerror("Error", f"Failed to load file: {error}")
+
+    def report_callback_error(self, exc_type, error, traceback):
+        # Errors raised in Tk and task callbacks are shown instead of only printed to the console
+        messagebox.showerror("Error", f"Unexpected error: {error}")
+
+    def show_progress(self, task, fraction, message):
+        running = self.tasks.running
+        if not running:
+            self.progress["value"] = 0
+            self.status_label.config(text="Ready")
+            return
+
+        self.progress["value"] = fraction * 100
+        status = f"{task.description}: {message}" if message else task.description
+        if len(running) > 1:
+            status += f" ({len(running)} tasks running)"
+        self.status_label.config(text=status)
+
+    def cancel_tasks(self):
+        self.tasks.cancel_all()
+
+    def close(self):
+        self.tasks.shutdown()
+        if self._plot_panel is not None:
+            self._plot_panel.close()
+        self.root.destroy()
 
     def update_technique_options(self, event):
         category = self.stat_category.get()
-        if category == "Central Tendency":
-            self.stat_technique['values'] = ["Mean", "Median", "Mode"]
-        elif category == "Dispersion":
-            self.stat_technique['values'] = ["Range", "Variance", "Standard Deviation", "Skewness", "Kurtosis"]
-        elif category == "Graphical Analysis":
-            self.stat_technique['values'] = ["Histogram", "Box Plot", "Normal Distribution"]
+        if category in CATEGORY_TECHNIQUES:
+            self.stat_technique['values'] = CATEGORY_TECHNIQUES[category]
 
     def update_sub_technique_options(self, event):
         technique = self.stat_technique.get()
         if technique == "Mean":
-            self.sub_technique['values'] = ["Arithmetic Mean", "Geometric Mean", "Harmonic Mean", "Weighted Mean"]
+            self.sub_technique['values'] = MEAN_TYPES
         else:
             self.sub_technique['values'] = []  # No sub-options for other techniques
 
     def analyze_data(self):
         if self.df is None:
-            messagebox.showwarning("No Data", "Please load an Excel file first.")
+            messagebox.showwarning("No Data", "Please load a data file first.")
             return
 
         col = self.column_dropdown.get()
@@ -86,125 +215,143 @@ class StatsApp:
             messagebox.showerror("Error", f"Column '{col}' not found in the dataset.")
             return
 
-        data = self.df[col].dropna()
-
         selected_category = self.stat_category.get()
         selected_technique = self.stat_technique.get()
         selected_sub_technique = self.sub_technique.get()
+        precision = PRECISION_OPTIONS[self.precision.get()]
+        weight_col = self.weight_dropdown.get()
+        weight_col = None if weight_col == NO_COLUMN else weight_col
+        group_col = self.group_dropdown.get()
+        group_col = None if group_col == NO_COLUMN else group_col
+
+        # The statistic is computed in the background; several analyses can run at once. The data, its
+        # version and its profile cache are passed in, because loading a file replaces them
+        self.tasks.submit(self.run_analysis, self.df, self.dataset_version, self.profiles, col, selected_category,
+                          selected_technique, selected_sub_technique, precision, weight_col, group_col,
+                          on_done=self.show_analysis, on_error=self.analysis_failed,
+                          description=f"{selected_technique or selected_category} of {col}")
+
+    # Runs on a worker thread, so it must not touch any widget
+    def run_analysis(self, task, df, version, profiles, col, selected_category, selected_technique,
+                     selected_sub_technique, precision=None, weight_col=None, group_col=None):
+        from matplotlib.cbook import boxplot_stats
+        from stats_plots import DistributionSummary
+        from stats_profile import grouped_statistics, resolve_sketch_error
+
+        task.report_progress(0.1, "Preparing data")
+        analysis = {"category": selected_category, "technique": selected_technique}
+        sketch_error = resolve_sketch_error(precision, len(df))
+
+        if selected_category in ("Central Tendency", "Dispersion") and group_col is not None:
+            # Every statistic for every group in one pass, shown as a table
+            task.report_progress(0.5, f"Calculating per {group_col}")
+            weights = df[weight_col] if weight_col is not None else None
+            analysis["table"] = grouped_statistics(df[col], df[group_col], weights)
+            analysis["title"] = f"Statistics of {col} per {group_col}"
+
+        elif selected_category in ("Central Tendency", "Dispersion"):
+            # Computed on the first analysis of the column, looked up afterwards
+            task.report_progress(0.5, "Calculating")
+            profile = profiles.get(version, col, lambda: df[col].dropna(), sketch_error,
+                                   weight_col, lambda: df[weight_col])
+
+            result, interpretation = compute_statistic(profile, selected_category, selected_technique,
+                                                       selected_sub_technique)
+            analysis["result"] = result
+            analysis["interpretation"] = interpretation
 
-        if selected_category == "Central Tendency":
-            result = None
-            if selected_technique == "Mean":
-                result = self.calculate_mean(data, selected_sub_technique)
-            elif selected_technique == "Median":
-                result = self.calculate_median(data)
-            elif selected_technique == "Mode":
-                result = self.calculate_mode(data)
-            
-            interpretation = self.interpret_result(result, selected_technique, selected_sub_technique)
-            messagebox.showinfo("Result", f"Result: {result}\n\nInterpretation: {interpretation}")
-        
-        elif selected_category == "Dispersion":
-            result = self.calculate_dispersion(data, selected_technique)
-            interpretation = self.interpret_result(result, selected_technique)
-            messagebox.showinfo("Result", f"Result: {result}\n\nInterpretation: {interpretation}")
-        
         elif selected_category == "Graphical Analysis":
-            if selected_technique == "Histogram":
-                interpretation = self.interpret_plot("Histogram")
-                messagebox.showinfo("Plot Interpretation", interpretation)
-                self.plot_histogram(data)
+            if selected_technique == "Box Plot" and sketch_error is not None:
+                # The box is drawn from sketched quartiles instead of sorting the column
+                task.report_progress(0.5, "Sketching quantiles")
+                profile = profiles.get(version, col, lambda: df[col].dropna(), sketch_error)
+                analysis["box_stats"] = profile.box_stats(col)
             elif selected_technique == "Box Plot":
-                interpretation = self.interpret_plot("Box Plot")
-                messagebox.showinfo("Plot Interpretation", interpretation)
-                self.plot_boxplot(data)
-            elif selected_technique == "Normal Distribution":
-                interpretation = self.interpret_plot("Normal Distribution")
-                messagebox.showinfo("Plot Interpretation", interpretation)
-                self.plot_normal_distribution(data)
-
-    def calculate_mean(self, data, mean_type):
-        if mean_type == "Arithmetic Mean":
-            return data.mean()
-        elif mean_type == "Geometric Mean":
-            return gmean(data)
-        elif mean_type == "Harmonic Mean":
-            return hmean(data)
-        elif mean_type == "Weighted Mean":
-            weights = [1] * len(data)  # Placeholder for weights
-            return sum(data * weights) / sum(weights)
-
-    def calculate_median(self, data):
-        return data.median()
-
-    def calculate_mode(self, data):
-        return data.mode().iloc[0] if not data.mode().empty else "No mode"
-
-    def calculate_dispersion(self, data, technique):
-        if technique == "Range":
-            return data.max() - data.min()
-        elif technique == "Variance":
-            return data.var()
-        elif technique == "Standard Deviation":
-            return data.std()
-        elif technique == "Skewness":
-            return skew(data)
-        elif technique == "Kurtosis":
-            return kurtosis(data)
-
-    def interpret_result(self, result, technique, sub_technique=None):
-        if technique == "Mean":
-            if sub_technique == "Arithmetic Mean":
-                return f"The arithmetic mean is {result:.2f}. It reflects the average value in the dataset."
-            elif sub_technique == "Geometric Mean":
-                return f"The geometric mean is {result:.2f}. It’s useful for understanding multiplicative effects in the data."
-            elif sub_technique == "Harmonic Mean":
-                return f"The harmonic mean is {result:.2f}. This is ideal for rates and ratios."
-            elif sub_technique == "Weighted Mean":
-                return f"The weighted mean is {result:.2f}, accounting for different levels of importance of the values."
-        elif technique == "Median":
-            return f"The median is {result}. It divides the dataset into two equal halves, and it’s robust against outliers."
-        elif technique == "Mode":
-            return f"The mode is {result}. It represents the most frequent value in the dataset."
-        elif technique == "Range":
-            return f"The range is {result}. It shows the spread between the largest and smallest values."
-        elif technique == "Variance":
-            return f"The variance is {result:.2f}. It reflects how spread out the data is around the mean."
-        elif technique == "Standard Deviation":
-            return f"The standard deviation is {result:.2f}. It indicates how much variability there is in the dataset."
-        elif technique == "Skewness":
-            return f"The skewness is {result:.2f}. It measures the asymmetry of the data distribution. Positive values indicate a right skew, while negative values indicate a left skew."
-        elif technique == "Kurtosis":
-            return f"The kurtosis is {result:.2f}. It indicates the 'tailedness' of the data distribution. Higher values suggest heavier tails and more outliers."
-
-    def interpret_plot(self, plot_type):
-        if plot_type == "Histogram":
-            return ("The histogram shows the frequency distribution of your data. It helps to visualize the shape of the data distribution. "
-                    "If the data is normally distributed, you will see a bell curve. Look out for skewness, which can indicate the presence "
-                    "of outliers or asymmetry in the data.")
-        elif plot_type == "Box Plot":
-            return ("The box plot displays the distribution of your data and highlights potential outliers. "
-                    "The length of the box represents the interquartile range (IQR), and the line inside the box shows the median. "
-                    "Outliers are plotted as individual points. If the box is skewed or if there are many outliers, this suggests asymmetry or the presence of extreme values.")
-        elif plot_type == "Normal Distribution":
-            return ("The normal distribution plot visualizes whether your data follows a normal distribution. "
-                    "If the curve is symmetric and bell-shaped, your data is normally distributed. Deviations from this shape suggest "
-                    "skewness or kurtosis, which can influence statistical analysis.")
-
-    def plot_histogram(self, data):
-        sns.histplot(data, kde=True)
-        plt.title("Histogram")
-        plt.show()
-
-    def plot_boxplot(self, data):
-        sns.boxplot(data=data)
-        plt.title("Box Plot")
-        plt.show()
-
-    def plot_normal_distribution(self, data):
-        sns.histplot(data, kde=True)
-        plt.title("Normal Distribution")
-        plt.show()
+                task.report_progress(0.5, "Calculating quartiles")
+                analysis["box_stats"] = boxplot_stats(df[col].dropna().to_numpy(), labels=[col])[0]
+            else:
+                data = df[col].dropna()
+                profile = profiles.get(version, col, lambda: data, sketch_error)
+                if selected_technique in ("Histogram", "Normal Distribution") and profile.numeric and profile.count:
+                    # Binned once here; the plot only draws the aggregated arrays
+                    task.report_progress(0.5, "Binning data")
+                    analysis["distribution"] = DistributionSummary.from_data(data, profile)
+                else:
+                    analysis["data"] = data
+            analysis["interpretation"] = interpret_plot(selected_technique)
+
+        return analysis
+
+    def show_analysis(self, analysis):
+        if "table" in analysis:
+            self.show_table(analysis["title"], analysis["table"])
+
+        elif analysis["category"] in ("Central Tendency", "Dispersion"):
+            messagebox.showinfo("Result",
+                                f"Result: {analysis['result']}\n\nInterpretation: {analysis['interpretation']}")
+
+        elif analysis["category"] == "Graphical Analysis":
+            # Plots are drawn on the main thread, into the embedded canvas
+            technique = analysis["technique"]
+            if technique == "Histogram":
+                self.plot_histogram(analysis.get("data"), analysis.get("distribution"))
+                messagebox.showinfo("Plot Interpretation", analysis["interpretation"])
+            elif technique == "Box Plot":
+                self.plot_boxplot(analysis.get("data"), analysis.get("box_stats"))
+                messagebox.showinfo("Plot Interpretation", analysis["interpretation"])
+            elif technique == "Normal Distribution":
+                self.plot_normal_distribution(analysis.get("data"), analysis.get("distribution"))
+                messagebox.showinfo("Plot Interpretation", analysis["interpretation"])
+
+    def show_table(self, title, table):
+        # One table window, reused for every grouped analysis
+        if self.table_window is None or not self.table_window.winfo_exists():
+            self.table_window = tk.Toplevel(self.root)
+            self.table_tree = ttk.Treeview(self.table_window, show="headings")
+            scrollbar = ttk.Scrollbar(self.table_window, orient="vertical", command=self.table_tree.yview)
+            self.table_tree.configure(yscrollcommand=scrollbar.set)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            self.table_tree.pack(fill=tk.BOTH, expand=True)
+        self.table_window.title(title)
+
+        columns = [str(table.index.name or "Group")] + table.columns.tolist()
+        self.table_tree.delete(*self.table_tree.get_children())
+        self.table_tree["columns"] = columns
+        for column in columns:
+            self.table_tree.heading(column, text=column)
+            self.table_tree.column(column, width=110, anchor=tk.E)
+
+        for group, row in zip(table.index, table.itertuples(index=False)):
+            cells = [f"{value:.4g}" if isinstance(value, float) else value for value in row]
+            self.table_tree.insert("", tk.END, values=[group] + cells)
+        self.table_window.lift()
+
+    def analysis_failed(self, error):
+        messagebox.showerror("Error", f"Analysis failed: {error}")
+
+    def plot_histogram(self, data, distribution=None):
+        if distribution is not None:
+            self.plot_panel.show_histogram(distribution, "Histogram")
+        else:
+            import seaborn as sns
+            self.plot_panel.show_custom(lambda values, ax: sns.histplot(values, kde=True, ax=ax), data, "Histogram")
+
+    def plot_boxplot(self, data, box_stats=None):
+        if box_stats is not None:
+            # Quartiles and whiskers computed in the background, or estimated by a sketch
+            self.plot_panel.show_boxplot(box_stats, "Box Plot")
+        else:
+            import seaborn as sns
+            self.plot_panel.show_custom(lambda values, ax: sns.boxplot(data=values, ax=ax), data, "Box Plot")
+
+    def plot_normal_distribution(self, data, distribution=None):
+        if distribution is not None:
+            # Density histogram with the fitted normal curve, next to a normal Q-Q plot
+            self.plot_panel.show_normal_fit(distribution, "Normal Distribution")
+        else:
+            import seaborn as sns
+            self.plot_panel.show_custom(lambda values, ax: sns.histplot(values, kde=True, ax=ax), data,
+                                        "Normal Distribution")
 
 # Main GUI loop
 if __name__ == "__main__":
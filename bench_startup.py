@@ -0,0 +1,164 @@
+"""
+Startup-time benchmark for the two entry points, to catch import-time regressions.
+
+Each script is started in fresh interpreters with runpy and a run_name other than "__main__", so
+only its module-level code runs (no window main loop, no pipeline):
+
+- with -X importtime, to list the slowest top-level imports and check that none of the heavy
+  libraries the script should load lazily was imported at startup;
+- without it, to time the startup itself (median of several runs, from process launch);
+- for StatsApp, also creating the window and processing its first events, which is the time
+  until the window appears. This needs a display and is skipped without one.
+
+Exits with status 1 if a budget is exceeded or a lazily loaded library was imported at startup.
+
+Usage:
+    python bench_startup.py --budget-ms 500 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENTRY_POINTS = {
+    "StatsApp": "Descriptive Statistics.py",
+    "cleaning script": "Data_Cleaning and stats code.py"
+}
+
+# Libraries each entry point must not import before they are needed
+LAZY_MODULES = {
+    "StatsApp": ["pandas", "numpy", "pyarrow", "scipy", "matplotlib", "seaborn"],
+    "cleaning script": ["scipy", "matplotlib", "seaborn"]
+}
+
+# Runs the script's module-level code, then reports the wall-clock time and the loaded libraries
+IMPORT_CODE = """
+import json, runpy, sys, time
+runpy.run_path({path!r}, run_name="startup_benchmark")
+print(json.dumps({{"done": time.time(), "modules": sorted(m for m in {modules!r} if m in sys.modules)}}))
+"""
+
+# Also creates the StatsApp window and processes its first events
+WINDOW_CODE = """
+import json, runpy, time, tkinter
+namespace = runpy.run_path({path!r}, run_name="startup_benchmark")
+try:
+    root = tkinter.Tk()
+except tkinter.TclError as error:
+    print(json.dumps({{"skipped": str(error)}}))
+else:
+    app = namespace["StatsApp"](root)
+    root.update()
+    print(json.dumps({{"done": time.time()}}))
+    app.close()
+"""
+
+
+def run_child(code, importtime=False):
+    """
+    Run code in a fresh interpreter.
+
+    Returns:
+        tuple: Milliseconds from launch until the child reported "done" (None if it did not), the
+            child's JSON report and its stderr.
+    """
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    started = time.time()
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    elapsed = (report["done"] - started) * 1000 if "done" in report else None
+    return elapsed, report, result.stderr
+
+
+def parse_importtime(stderr):
+    """
+    Top-level imports from -X importtime output.
+
+    Returns:
+        list: (cumulative milliseconds, module name) pairs, slowest first.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented by two spaces per level after the separator's own space
+        if not name[1:].startswith(" "):
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)
+
+
+def bench_entry_point(name, path, repeat):
+    """
+    Import profile and startup times of one entry point.
+
+    Returns:
+        dict: Slowest imports, lazily loaded libraries found at startup, and the timings.
+    """
+    modules = LAZY_MODULES[name]
+    code = IMPORT_CODE.format(path=os.path.join(ROOT, path), modules=modules)
+
+    _, report, stderr = run_child(code, importtime=True)
+    result = {"script": path, "slowest_imports": parse_importtime(stderr), "eager_modules": report["modules"],
+              "startup_ms": statistics.median(run_child(code)[0] for _ in range(repeat))}
+
+    if name == "StatsApp":
+        window_code = WINDOW_CODE.format(path=os.path.join(ROOT, path))
+        times, skipped = [], None
+        for _ in range(repeat):
+            elapsed, report, _ = run_child(window_code)
+            if elapsed is None:
+                skipped = report["skipped"]
+                break
+            times.append(elapsed)
+        result["window_ms"] = statistics.median(times) if times else None
+        result["window_skipped"] = skipped
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup time of StatsApp and the cleaning script.")
+    parser.add_argument("--budget-ms", type=float, default=500, help="Maximum StatsApp window time (or startup time without a display)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the median is reported")
+    parser.add_argument("--top", type=int, default=8, help="Number of slowest imports to print")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results, failures = {}, []
+    for name, path in ENTRY_POINTS.items():
+        result = bench_entry_point(name, path, args.repeat)
+        results[name] = result
+
+        print(f"{name} ({path})")
+        print(f"  startup: {result['startup_ms']:.0f} ms")
+        for cumulative, module in result["slowest_imports"][:args.top]:
+            print(f"  {cumulative:8.1f} ms  {module}")
+        if result["eager_modules"]:
+            failures.append(f"{name} imports {', '.join(result['eager_modules'])} at startup")
+
+        if name == "StatsApp":
+            if result["window_ms"] is not None:
+                print(f"  window shown after: {result['window_ms']:.0f} ms")
+                measured = result["window_ms"]
+            else:
+                print(f"  window time skipped: {result['window_skipped']}")
+                measured = result["startup_ms"]
+            if measured > args.budget_ms:
+                failures.append(f"StatsApp needs {measured:.0f} ms, budget {args.budget_ms:.0f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
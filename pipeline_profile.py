@@ -0,0 +1,395 @@
+"""
+Per-stage timing and memory instrumentation for the trip pipeline.
+
+A PipelineProfiler wraps each stage of a run in a with block and records its wall-clock time, CPU
+time (including worker processes that finished during the stage), peak resident memory of the
+process and its workers, the change in resident memory, and rows in and out. With tracing on, the
+peak and change of Python allocations (tracemalloc) are recorded too. The run is written as JSON
+and printed as a summary table.
+
+Stages can be nested. Library code marks its own steps with profile_step, which does nothing unless
+a profiler is active in the process; worker processes (e.g. the cache refresh) activate one of
+their own and send their step records back, so time spent in read_csv, timestamp parsing, station
+renames or sorting inside the workers shows up under the stage that started them.
+
+For a closer look one stage can be run under cProfile (a .prof file for pstats or snakeviz) or
+py-spy (a speedscope file, including worker processes). "slowest" picks the slowest stage of the
+previous run's profile.
+"""
+import contextlib
+import cProfile
+import datetime
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import tracemalloc
+
+# Seconds between resident memory samples
+SAMPLE_INTERVAL = 0.01
+
+MEGABYTE = 1 << 20
+
+# Profiler of the current process, set by PipelineProfiler.activate
+_active = None
+
+
+def _statm_rss(pid="self"):
+    """Resident memory of a process in bytes from /proc, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_tree_rss():
+    """
+    Resident memory of this process plus its worker processes, in bytes.
+
+    Returns:
+        int: The total, or None on systems without /proc.
+    """
+    total = _statm_rss()
+    if total is None:
+        return None
+    for child in multiprocessing.active_children():
+        # A worker may exit between listing and reading
+        total += _statm_rss(child.pid) or 0
+    return total
+
+
+class RssSampler:
+    """
+    Background thread recording the peak resident memory of the process tree.
+
+    Process pools start and stop within a stage, so the peak has to be sampled while the stage
+    runs; the maximum RSS reported by the OS covers the whole process lifetime instead.
+
+    Parameters:
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = process_tree_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = process_tree_rss()
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        rss = process_tree_rss()
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+
+
+def _cpu_seconds():
+    """User and system CPU time of this process and its finished worker processes."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+@contextlib.contextmanager
+def measure_stage(name, rows_in=None, trace_python=False):
+    """
+    Measure the code in a with block as one stage.
+
+    Parameters:
+        name (str): Stage name.
+        rows_in (int): Number of rows the stage is given.
+        trace_python (bool): Also record Python allocations with tracemalloc. Tracing is started
+            if it is not running yet; inside a traced stage the peak is reset instead.
+
+    Yields:
+        dict: The stage record. Set its "rows_out" inside the block; the measurements are filled
+        in when the block exits, also when it raises, in which case "error" holds the exception.
+    """
+    record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+    started_tracing = trace_python and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_python:
+        tracemalloc.reset_peak()
+        python_before = tracemalloc.get_traced_memory()[0]
+
+    rss_before = process_tree_rss()
+    cpu_before = _cpu_seconds()
+    sampler = RssSampler()
+    try:
+        with sampler:
+            started = time.perf_counter()
+            try:
+                yield record
+            finally:
+                record["wall_s"] = time.perf_counter() - started
+    except BaseException as error:
+        record["error"] = repr(error)
+        raise
+    finally:
+        record["cpu_s"] = _cpu_seconds() - cpu_before
+        rss_after = process_tree_rss()
+        record["peak_rss_mb"] = sampler.peak / MEGABYTE if sampler.peak is not None else None
+        record["rss_delta_mb"] = (rss_after - rss_before) / MEGABYTE if rss_before is not None else None
+        if trace_python:
+            current, peak = tracemalloc.get_traced_memory()
+            record["python_peak_mb"] = peak / MEGABYTE
+            record["python_delta_mb"] = (current - python_before) / MEGABYTE
+            if started_tracing:
+                tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def cprofile_hook(path):
+    """Run the with block under cProfile and write the statistics to path (pstats format)."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+@contextlib.contextmanager
+def pyspy_hook(path):
+    """Sample the with block with py-spy, including worker processes, into a speedscope file."""
+    executable = shutil.which("py-spy")
+    if executable is None:
+        raise RuntimeError("py-spy is not installed; install it or use the cprofile hook")
+    command = [executable, "record", "--pid", str(os.getpid()), "--subprocesses", "--format", "speedscope",
+               "--output", path]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        yield
+    finally:
+        # py-spy writes its output when interrupted
+        if os.name == "nt":
+            process.terminate()
+        else:
+            process.send_signal(signal.SIGINT)
+        process.wait()
+
+
+# Hook function and output file suffix
+HOOKS = {"cprofile": (cprofile_hook, ".prof"), "py-spy": (pyspy_hook, ".speedscope.json")}
+
+
+def slowest_stage(profile_path):
+    """
+    Name of the slowest top-level stage in a profile written by PipelineProfiler.write_json.
+
+    Returns:
+        str: The stage name, or None if the file does not exist or has no stages.
+    """
+    if not os.path.exists(profile_path):
+        return None
+    with open(profile_path, encoding="utf-8") as file:
+        stages = [record for record in json.load(file)["stages"] if "/" not in record["stage"]]
+    return max(stages, key=lambda record: record["wall_s"])["stage"] if stages else None
+
+
+class PipelineProfiler:
+    """
+    Records the stages of one pipeline run.
+
+    Parameters:
+        name (str): Pipeline name, stored in the profile.
+        trace_python (bool): Record Python allocations with tracemalloc (slows allocation-heavy code).
+        hook (str): "cprofile" or "py-spy", run around the stages in hook_stages.
+        hook_stages (list): Stage names to run under the hook.
+        hook_dir (str): Folder for the hook output files. Defaults to the working directory.
+        output_path (str): JSON file rewritten after every top-level stage, so a run that crashes or
+            runs out of memory still leaves the stages it finished.
+    """
+
+    def __init__(self, name="pipeline", trace_python=False, hook="cprofile", hook_stages=(), hook_dir=None,
+                 output_path=None):
+        if hook not in HOOKS:
+            raise ValueError(f"hook must be one of {list(HOOKS)}, not {hook!r}")
+        self.name = name
+        self.trace_python = trace_python
+        self.hook = hook
+        self.hook_stages = set(hook_stages)
+        self.hook_dir = hook_dir or os.getcwd()
+        self.output_path = output_path
+        self.records = []
+        self.hook_outputs = {}
+        self._stack = []
+        self._started = time.perf_counter()
+        self._created = datetime.datetime.now().isoformat(timespec="seconds")
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Measure one stage; stages started inside it are recorded as "outer/inner".
+
+        Parameters:
+            name (str): Stage name.
+            rows_in (int): Number of rows the stage is given.
+
+        Yields:
+            dict: The stage record; set its "rows_out" inside the block. A stage that raises is
+            recorded too, with the exception under "error".
+        """
+        path = "/".join(self._stack + [name])
+        position = len(self.records)
+        self._stack.append(name)
+        record = None
+        try:
+            with contextlib.ExitStack() as hooks:
+                if name in self.hook_stages:
+                    hook, suffix = HOOKS[self.hook]
+                    output = os.path.join(self.hook_dir, f"{self.name}.{name}{suffix}")
+                    hooks.enter_context(hook(output))
+                    self.hook_outputs[path] = output
+                with measure_stage(path, rows_in, self.trace_python) as record:
+                    record["start_s"] = time.perf_counter() - self._started
+                    yield record
+        finally:
+            self._stack.pop()
+            if record is not None:
+                self._add_record(position, path, record)
+
+    def _add_record(self, position, path, record):
+        """Store a finished stage and rewrite the JSON file after a top-level stage."""
+        # Records in order of starting; nested stages were appended while this one ran
+        self.records.insert(position, record)
+        if self.trace_python:
+            # Nested stages reset the tracemalloc peak, so take the largest of theirs too
+            nested = [other.get("python_peak_mb", 0) for other in self.records[position + 1:]
+                      if other["stage"].startswith(path + "/")]
+            record["python_peak_mb"] = max([record["python_peak_mb"]] + nested)
+        if self.output_path and not self._stack:
+            self.write_json(self.output_path)
+
+    def add_worker_steps(self, stage, step_lists):
+        """
+        Add the step records sent back by worker processes, summed per step name.
+
+        Parameters:
+            stage (str): The stage that ran the workers.
+            step_lists (iterable): One list of step records per worker task.
+        """
+        steps = {}
+        for records in step_lists:
+            for record in records:
+                total = steps.setdefault(record["stage"], {"stage": f"{stage}/{record['stage']}", "tasks": 0,
+                                                           "rows_in": None, "rows_out": None, "wall_s": 0.0,
+                                                           "cpu_s": 0.0, "peak_rss_mb": None, "worker": True})
+                total["tasks"] += 1
+                for key in ["rows_in", "rows_out", "wall_s", "cpu_s"]:
+                    if record.get(key) is not None:
+                        total[key] = (total[key] or 0) + record[key]
+                if record.get("peak_rss_mb") is not None:
+                    total["peak_rss_mb"] = max(total["peak_rss_mb"] or 0, record["peak_rss_mb"])
+
+        # Insert after the stage and its other nested records
+        position = max((index for index, record in enumerate(self.records)
+                        if record["stage"] == stage or record["stage"].startswith(stage + "/")), default=None)
+        position = len(self.records) if position is None else position + 1
+        self.records[position:position] = list(steps.values())
+        if self.output_path:
+            self.write_json(self.output_path)
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Make this the profiler that profile_step records into, for the with block."""
+        global _active
+        previous, _active = _active, self
+        try:
+            yield self
+        finally:
+            _active = previous
+
+    def to_dict(self):
+        return {"pipeline": self.name, "created": self._created, "pid": os.getpid(),
+                "total_wall_s": time.perf_counter() - self._started, "trace_python": self.trace_python,
+                "hook_outputs": self.hook_outputs, "stages": self.records}
+
+    def write_json(self, path):
+        """Write the profile to a JSON file."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def summary(self):
+        """
+        The stages as a text table, with each top-level stage's share of the run time.
+
+        Returns:
+            str: The table.
+        """
+        total = sum(record["wall_s"] for record in self.records if "/" not in record["stage"]) or 1.0
+        width = max([len(record["stage"]) for record in self.records] + [5])
+        lines = [f"{'stage':<{width}}  {'wall s':>8}  {'cpu s':>8}  {'share':>6}  {'peak MB':>8}  "
+                 f"{'delta MB':>8}  {'rows in':>11}  {'rows out':>11}"]
+        slowest = max((record for record in self.records if "/" not in record["stage"]),
+                      key=lambda record: record["wall_s"], default=None)
+        for record in self.records:
+            share = f"{record['wall_s'] / total:6.1%}" if "/" not in record["stage"] else ""
+            line = (f"{record['stage']:<{width}}  {record['wall_s']:8.2f}  {record['cpu_s']:8.2f}  {share:>6}  "
+                    f"{_format(record.get('peak_rss_mb'), '8.0f', 8)}  "
+                    f"{_format(record.get('rss_delta_mb'), '+8.0f', 8)}  "
+                    f"{_format(record.get('rows_in'), '11,d', 11)}  {_format(record.get('rows_out'), '11,d', 11)}")
+            lines.append(line + ("  <- failed" if "error" in record else "  <- slowest" if record is slowest else ""))
+        return "\n".join(lines)
+
+
+def _format(value, spec, width):
+    """Format a measurement, or a dash right-aligned in width when it is missing."""
+    return format(value, spec) if value is not None else "-".rjust(width)
+
+
+@contextlib.contextmanager
+def profile_step(name, rows_in=None):
+    """
+    Record a step of library code under the active profiler; does nothing when none is active.
+
+    Parameters:
+        name (str): Step name.
+        rows_in (int): Number of rows the step is given.
+
+    Yields:
+        dict: The step record (a throwaway dict when no profiler is active).
+    """
+    if _active is None:
+        yield {}
+        return
+    with _active.stage(name, rows_in) as record:
+        yield record
+
+
+@contextlib.contextmanager
+def worker_profile(enabled, trace_python=False):
+    """
+    Activate a profiler in a worker process for the with block.
+
+    Parameters:
+        enabled (bool): Profile at all; when False the block runs unmeasured.
+        trace_python (bool): Record Python allocations too.
+
+    Yields:
+        list: The step records, to send back to the parent (empty when not enabled).
+    """
+    if not enabled:
+        yield []
+        return
+    profiler = PipelineProfiler("worker", trace_python=trace_python)
+    with profiler.activate():
+        yield profiler.records
@@ -0,0 +1,195 @@
+"""
+Declarative station name/ID remapping table.
+
+The station fixes are data rather than code: a JSON file (station_remap.json by default) lists the
+station IDs whose trips are dropped, plain name-to-name renames, and renames that only apply to a
+name under one station ID. The table is applied to a trip DataFrame in one vectorized pass per
+column: names are normalized and renamed once per unique string, and every row is updated by
+remapping its categorical code.
+
+The rules run in the order of the original cleaning script: the ID-specific renames first, on the
+name exactly as recorded, then the plain renames. Name normalization runs with the plain renames
+and, unlike the script (which only fixed the NBSP spelling of Canal St at Causeway St), applies to
+every station name.
+"""
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_REMAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_remap.json")
+
+SIDES = ("start", "end")
+
+
+class StationRemapTable:
+    """
+    Station name/ID corrections applied to the start and end station columns.
+
+    Parameters:
+        renames (dict): Old station name mapped to the new name, for every station ID.
+        renames_at_id (dict): (station ID, name as recorded) mapped to the new name. Applied before
+            normalization and the plain renames, so only the exact recorded spelling matches.
+        drop_ids (list): Station IDs whose trips are removed.
+        nbsp (bool): Replace non-breaking spaces in names with regular spaces.
+        strip_periods (bool): Remove periods from names (e.g. "St." becomes "St").
+    """
+
+    def __init__(self, renames=None, renames_at_id=None, drop_ids=None, nbsp=True, strip_periods=False):
+        self.nbsp = nbsp
+        self.strip_periods = strip_periods
+        self.drop_ids = set(drop_ids or [])
+
+        # Rule names are normalized the same way as the data, and chains of renames are followed
+        renames = {self.normalize(old): self.normalize(new) for old, new in (renames or {}).items()}
+        self.renames = {old: self._follow_renames(renames, old) for old in renames}
+
+        self.renames_at_id = {(station_id, old): self.canonical_name(new)
+                              for (station_id, old), new in (renames_at_id or {}).items()}
+
+    @staticmethod
+    def _follow_renames(renames, name):
+        seen = {name}
+        while name in renames and renames[name] not in seen:
+            name = renames[name]
+            seen.add(name)
+        return name
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_REMAP_PATH):
+        """
+        Load a remapping table from a JSON file.
+
+        Parameters:
+            path (str): Path to the JSON file.
+
+        Returns:
+            StationRemapTable: The loaded table.
+        """
+        with open(path, encoding="utf-8") as handle:
+            config = json.load(handle)
+
+        normalize = config.get("normalize", {})
+        return cls(
+            renames={rule["from"]: rule["to"] for rule in config.get("rename", [])},
+            renames_at_id={(rule["id"], rule["from"]): rule["to"] for rule in config.get("rename_at_id", [])},
+            drop_ids=[rule["id"] for rule in config.get("drop_ids", [])],
+            nbsp=normalize.get("nbsp", True),
+            strip_periods=normalize.get("strip_periods", False)
+        )
+
+    def normalize(self, name):
+        """
+        Normalize the characters of a station name.
+
+        The \xa0 character is the Unicode representation for a non-breaking space (NBSP). This character
+        is different from a regular space ( " " , Unicode U+0020 ) although they appear the same.
+        """
+        if self.nbsp:
+            name = name.replace("\xa0", " ")
+        if self.strip_periods:
+            name = name.replace(".", "")
+        return name
+
+    def canonical_name(self, name):
+        """Return the normalized, renamed form of a station name (ignoring the ID-specific rules)."""
+        name = self.normalize(name)
+        return self.renames.get(name, name)
+
+    def apply(self, dataframe):
+        """
+        Drop trips at removed stations and correct the start and end station names.
+
+        Parameters:
+            dataframe (pd.DataFrame): Trip data without missing station names or IDs.
+
+        Returns:
+            tuple: The corrected DataFrame, with categorical station name columns, and a dict with
+            the number of trips dropped ("dropped_station_trips"), station names changed by the
+            name rules ("names_remapped") and by the ID-specific rules ("renamed_at_id").
+        """
+        counts = {"dropped_station_trips": 0, "names_remapped": 0, "renamed_at_id": 0}
+
+        # Delete trips starting or ending at a station ID that does not exist
+        if self.drop_ids:
+            at_dropped_station = np.zeros(len(dataframe), dtype=bool)
+            for side in SIDES:
+                ids = dataframe[f"{side}_station_id"].astype("category")
+                dropped = np.isin(np.asarray(ids.cat.categories, dtype=object), list(self.drop_ids))
+                codes = ids.cat.codes.to_numpy()
+                at_dropped_station |= (codes >= 0) & dropped[codes]
+
+            counts["dropped_station_trips"] = int(at_dropped_station.sum())
+            dataframe = dataframe[~at_dropped_station]
+
+        dataframe = dataframe.copy()
+        for side in SIDES:
+            names, renamed, renamed_at_id = self._remap_names(dataframe[f"{side}_station_name"],
+                                                              dataframe[f"{side}_station_id"])
+            dataframe[f"{side}_station_name"] = names
+            counts["names_remapped"] += renamed
+            counts["renamed_at_id"] += renamed_at_id
+
+        return dataframe, counts
+
+    def _remap_names(self, names, ids):
+        """Remap one station name column, using the matching ID column for the ID-specific rules."""
+        names = names.astype("category")
+        old_categories = list(names.cat.categories)
+        codes = names.cat.codes.to_numpy().astype(np.int64)
+        present = codes >= 0
+
+        # ID-specific rules first, on the recorded names: each row's (ID, name) pair is encoded as
+        # one integer key, and rows with a rule are moved to the rule's target, added as a category
+        matched = np.zeros(len(codes), dtype=bool)
+        if self.renames_at_id:
+            ids = ids.astype("category")
+            id_codes = ids.cat.codes.to_numpy().astype(np.int64)
+            id_index = {station_id: code for code, station_id in enumerate(ids.cat.categories)}
+            name_index = {name: code for code, name in enumerate(old_categories)}
+            name_count = len(old_categories)
+
+            rule_keys = []
+            rule_targets = []
+            for (station_id, old_name), new_name in self.renames_at_id.items():
+                if station_id not in id_index or old_name not in name_index:
+                    continue
+                rule_keys.append(id_index[station_id] * name_count + name_index[old_name])
+                rule_targets.append(len(old_categories))
+                old_categories.append(new_name)
+
+            if rule_keys:
+                order = np.argsort(rule_keys)
+                rule_keys = np.asarray(rule_keys, dtype=np.int64)[order]
+                rule_targets = np.asarray(rule_targets, dtype=np.int64)[order]
+
+                keys = id_codes * name_count + codes
+                matched = np.isin(keys, rule_keys) & (id_codes >= 0) & present
+                codes[matched] = rule_targets[np.searchsorted(rule_keys, keys[matched])]
+
+        # Then normalize and rename each unique name once, and move every row to its new category
+        old_categories = np.asarray(old_categories, dtype=object)
+        canonical = np.array([self.canonical_name(name) for name in old_categories], dtype=object)
+        categories, lookup = np.unique(canonical, return_inverse=True)
+        if not len(categories):
+            return pd.Categorical.from_codes(codes, categories=[]), 0, 0
+
+        new_codes = np.where(present, lookup[codes], -1)
+        renamed = int(((canonical != old_categories)[codes] & present & ~matched).sum())
+        return pd.Categorical.from_codes(new_codes, categories=list(categories)), renamed, int(matched.sum())
+
+
+@lru_cache(maxsize=None)
+def load_remap_table(path=DEFAULT_REMAP_PATH):
+    """
+    Load a remapping table from a JSON file, reading each file only once per process.
+
+    Parameters:
+        path (str): Path to the JSON file. Defaults to station_remap.json next to this module.
+
+    Returns:
+        StationRemapTable: The loaded table.
+    """
+    return StationRemapTable.from_file(path)
@@ -0,0 +1,211 @@
+"""
+Headless batch mode for StatsApp: profile every numeric column of one or more files.
+
+Every Central Tendency and Dispersion statistic the window offers is computed for each numeric
+column, with the same interpretations (stats_core), and written to profile.json and profile.csv.
+With --plots a PNG of the histogram, box plot, fitted normal curve and Q-Q plot is saved per
+column. Files and columns are spread over a process pool. Nothing here imports Tk, so it runs on
+servers without a display.
+
+Usage:
+    python stats_batch.py data/*.xlsx --output-dir profiles --plots --workers 8
+"""
+import argparse
+import json
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from stats_core import CATEGORY_TECHNIQUES, MEAN_TYPES, compute_statistic, interpret_plot
+from stats_io import load_dataset
+from stats_profile import ColumnProfile, resolve_sketch_error
+
+PLOT_TECHNIQUES = ["Histogram", "Box Plot", "Normal Distribution"]
+
+# Statistics written per column, in output order; the weighted mean needs a weight column
+STATISTICS = [("Central Tendency", "Mean", mean_type) for mean_type in MEAN_TYPES if mean_type != "Weighted Mean"]
+STATISTICS += [(category, technique, None) for category in ("Central Tendency", "Dispersion")
+               for technique in CATEGORY_TECHNIQUES[category] if technique != "Mean"]
+
+
+def _plain(value):
+    """Convert NumPy scalars to Python values and non-finite numbers to None, for JSON."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _safe_name(name):
+    return re.sub(r"[^\w.-]+", "_", str(name)).strip("_") or "column"
+
+
+def parse_precision(text):
+    """Precision argument: "exact", "auto" or an error bound such as 0.01."""
+    if text == "exact":
+        return None
+    if text == "auto":
+        return "auto"
+    return float(text)
+
+
+def inspect_file(path):
+    """
+    Open a file (writing its sidecar cache if needed) and list its numeric columns.
+
+    Returns:
+        dict: "file", "rows" and "columns".
+    """
+    dataset = load_dataset(path)
+    return {"file": path, "rows": len(dataset), "columns": dataset.numeric_columns}
+
+
+def column_statistics(profile):
+    """
+    Every statistic in STATISTICS for a profiled column.
+
+    Parameters:
+        profile (stats_profile.ColumnProfile): The column's profile.
+
+    Returns:
+        tuple: Dicts of results, interpretations and errors, keyed by statistic name.
+    """
+    statistics, interpretations, errors = {}, {}, {}
+    for category, technique, sub_technique in STATISTICS:
+        name = sub_technique or technique
+        try:
+            result, interpretation = compute_statistic(profile, category, technique, sub_technique)
+        except (TypeError, ValueError) as error:
+            errors[name] = str(error)
+            continue
+        statistics[name] = _plain(result)
+        interpretations[name] = interpretation
+    return statistics, interpretations, errors
+
+
+def save_column_plots(data, profile, column, path):
+    """
+    Save a PNG with the histogram, box plot, fitted normal curve and Q-Q plot of a column.
+
+    Parameters:
+        data (pd.Series): The column's values, without missing values.
+        profile (stats_profile.ColumnProfile): The column's profile.
+        column (str): Column name, used in the titles.
+        path (str): Output PNG path.
+    """
+    # Imported here so runs without --plots never load matplotlib
+    from matplotlib.cbook import boxplot_stats
+    from matplotlib.figure import Figure
+
+    from stats_plots import DistributionSummary, draw_histogram, draw_normal_fit, draw_qq
+
+    distribution = DistributionSummary.from_data(data, profile)
+    box_stats = profile.box_stats(column) if profile.approximate else boxplot_stats(data.to_numpy(), labels=[column])[0]
+
+    figure = Figure(figsize=(11, 8), layout="constrained")
+    (histogram_ax, box_ax), (normal_ax, qq_ax) = figure.subplots(2, 2)
+    draw_histogram(histogram_ax, distribution)
+    histogram_ax.set_title("Histogram")
+    box_ax.bxp([box_stats], showfliers=len(box_stats["fliers"]) > 0)
+    box_ax.set_title("Box Plot")
+    draw_normal_fit(normal_ax, distribution)
+    normal_ax.set_title("Normal Distribution")
+    draw_qq(qq_ax, distribution)
+    figure.suptitle(str(column))
+    figure.savefig(path, dpi=100)
+
+
+def profile_column(path, column, precision=None, plot_dir=None):
+    """
+    Profile one column of a file. Runs in a worker process.
+
+    Parameters:
+        path (str): The file.
+        column (str): Column name.
+        precision: None for exact statistics, "auto" or a sketch error bound.
+        plot_dir (str): Folder for the column's PNG, or None for no plot.
+
+    Returns:
+        dict: File, column, count, statistics, interpretations, errors and the plot path.
+    """
+    data = load_dataset(path)[column].dropna()
+    profile = ColumnProfile.from_series(data, resolve_sketch_error(precision, len(data)))
+    statistics, interpretations, errors = column_statistics(profile)
+    record = {"file": path, "column": column, "count": profile.count, "approximate": profile.approximate,
+              "statistics": statistics, "interpretations": interpretations, "errors": errors}
+
+    if plot_dir is not None and profile.count:
+        file_dir = os.path.join(plot_dir, _safe_name(os.path.basename(path)))
+        os.makedirs(file_dir, exist_ok=True)
+        record["plot"] = os.path.join(file_dir, _safe_name(column) + ".png")
+        save_column_plots(data, profile, column, record["plot"])
+        record["plot_interpretations"] = {technique: interpret_plot(technique) for technique in PLOT_TECHNIQUES}
+    return record
+
+
+def profile_files(paths, output_dir, plots=False, precision=None, max_workers=None):
+    """
+    Profile every numeric column of several files and write the results.
+
+    Parameters:
+        paths (list): Excel, CSV or Parquet files.
+        output_dir (str): Folder for profile.json, profile.csv and the plots.
+        plots (bool): Also save a PNG per column.
+        precision: None for exact statistics, "auto" or a sketch error bound.
+        max_workers (int): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        list: One record per column, in file and column order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    plot_dir = os.path.join(output_dir, "plots") if plots else None
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # Files first, so each workbook is converted to its sidecar cache once
+        files = list(pool.map(inspect_file, paths))
+
+        futures = {}
+        for file_index, file_info in enumerate(files):
+            for column_index, column in enumerate(file_info["columns"]):
+                future = pool.submit(profile_column, file_info["file"], column, precision, plot_dir)
+                futures[future] = (file_index, column_index)
+
+        records = {}
+        for future in as_completed(futures):
+            record = future.result()
+            records[futures[future]] = record
+            print(f"Profiled {record['column']} of {os.path.basename(record['file'])}")
+
+    records = [records[key] for key in sorted(records)]
+    with open(os.path.join(output_dir, "profile.json"), "w", encoding="utf-8") as file:
+        json.dump(records, file, indent=2, default=str)
+
+    rows = [{"file": record["file"], "column": record["column"], "count": record["count"],
+             "approximate": record["approximate"], **record["statistics"]} for record in records]
+    columns = ["file", "column", "count", "approximate"] + [sub or technique for _, technique, sub in STATISTICS]
+    pd.DataFrame(rows, columns=columns).to_csv(os.path.join(output_dir, "profile.csv"), index=False)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile every numeric column of Excel, CSV or Parquet files.")
+    parser.add_argument("files", nargs="+", help="Files to profile")
+    parser.add_argument("--output-dir", default="profiles", help="Folder for the JSON, CSV and PNG output")
+    parser.add_argument("--plots", action="store_true", help="Save a PNG of the distribution plots per column")
+    parser.add_argument("--precision", type=parse_precision, default=None,
+                        help='"exact" (default), "auto", or a sketch error bound such as 0.01')
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    records = profile_files(args.files, args.output_dir, plots=args.plots, precision=args.precision,
+                            max_workers=args.workers)
+    print(f"Profiled {len(records)} columns of {len(args.files)} files into {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
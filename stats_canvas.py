@@ -0,0 +1,124 @@
+"""
+Embedded plot area for StatsApp.
+
+Plots are drawn on one matplotlib Figure embedded in the window with FigureCanvasTkAgg, instead of
+a new pyplot figure and a blocking plt.show() per analysis. The Figure is created directly, not
+through pyplot, so it is never registered with pyplot's figure manager and nothing piles up.
+While the plot type stays the same the axes and artists are reused and only their data is
+updated, so switching columns redraws the existing figure; changing the plot type clears it.
+"""
+import tkinter as tk
+
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.figure import Figure
+
+from stats_plots import draw_histogram, draw_normal_fit, draw_qq
+
+
+class PlotPanel:
+    """
+    Reusable embedded figure with a navigation toolbar.
+
+    Parameters:
+        master (tk.Widget): Parent widget.
+        figsize (tuple): Initial figure size in inches.
+    """
+
+    def __init__(self, master, figsize=(7, 4.5)):
+        self.frame = tk.Frame(master)
+        self.figure = Figure(figsize=figsize, layout="constrained")
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.frame)
+
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.frame, pack_toolbar=False)
+        self.toolbar.update()
+        self.toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        self.layout = None
+        self.axes = []
+        self.artists = []
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def _use_layout(self, layout, columns=1):
+        """Axes for a plot type; they are kept while the type stays the same, otherwise recreated."""
+        if layout != self.layout:
+            self.figure.clear()
+            self.axes = list(np.atleast_1d(self.figure.subplots(1, columns)))
+            self.artists = [None] * columns
+            self.layout = layout
+        return self.axes
+
+    def _draw(self):
+        # Redraw when Tk is idle; several updates in a row cost one draw
+        self.canvas.draw_idle()
+
+    def show_histogram(self, distribution, title="Histogram"):
+        """
+        Histogram and KDE of a binned column.
+
+        Parameters:
+            distribution (stats_plots.DistributionSummary): The binned column.
+            title (str): Axes title.
+        """
+        ax, = self._use_layout("histogram")
+        self.artists[0] = draw_histogram(ax, distribution, artists=self.artists[0])
+        ax.set_title(title)
+        self._draw()
+
+    def show_normal_fit(self, distribution, title="Normal Distribution"):
+        """
+        Density histogram with the fitted normal pdf, next to a normal Q-Q plot.
+
+        Parameters:
+            distribution (stats_plots.DistributionSummary): The binned column.
+            title (str): Title of the left axes.
+        """
+        ax, qq_ax = self._use_layout("normal", columns=2)
+        self.artists[0] = draw_normal_fit(ax, distribution, artists=self.artists[0])
+        self.artists[1] = draw_qq(qq_ax, distribution, artists=self.artists[1])
+        ax.set_title(title)
+        self._draw()
+
+    def show_boxplot(self, box_stats, title="Box Plot"):
+        """
+        Box plot from precomputed statistics.
+
+        Parameters:
+            box_stats (dict): Statistics for Axes.bxp (med, q1, q3, whislo, whishi, fliers, label).
+            title (str): Axes title.
+        """
+        ax, = self._use_layout("boxplot")
+
+        # A box plot is only a handful of artists; replace them rather than the axes
+        for artist in self.artists[0] or []:
+            artist.remove()
+        drawn = ax.bxp([box_stats], showfliers=len(box_stats.get("fliers", [])) > 0)
+        self.artists[0] = [artist for artists in drawn.values() for artist in artists]
+        ax.relim()
+        ax.autoscale_view()
+        ax.set_title(title)
+        self._draw()
+
+    def show_custom(self, plot, data, title):
+        """
+        Plot with a function drawing on fresh axes, e.g. a seaborn plot of a non-numeric column.
+
+        Parameters:
+            plot (callable): Called as plot(data, ax).
+            data: The data to plot.
+            title (str): Axes title.
+        """
+        self.layout = None
+        ax, = self._use_layout("custom")
+        plot(data, ax)
+        ax.set_title(title)
+        self._draw()
+
+    def close(self):
+        """Release the figure and the canvas widget."""
+        self.figure.clear()
+        self.canvas.get_tk_widget().destroy()
+        self.frame.destroy()
@@ -0,0 +1,134 @@
+"""
+Statistics and interpretations behind StatsApp, without any Tk dependency.
+
+The window (Descriptive Statistics.py) and the headless batch mode (stats_batch.py) both compute
+results from a cached stats_profile.ColumnProfile through these functions, so a statistic and its
+interpretation are the same wherever they are shown.
+"""
+CATEGORY_TECHNIQUES = {
+    "Central Tendency": ["Mean", "Median", "Mode"],
+    "Dispersion": ["Range", "Variance", "Standard Deviation", "Skewness", "Kurtosis", "Distinct Values"],
+    "Graphical Analysis": ["Histogram", "Box Plot", "Normal Distribution"]
+}
+
+MEAN_TYPES = ["Arithmetic Mean", "Geometric Mean", "Harmonic Mean", "Weighted Mean"]
+
+
+def calculate_mean(profile, mean_type):
+    profile.require_numeric()
+    if mean_type == "Arithmetic Mean":
+        return profile.mean
+    elif mean_type == "Geometric Mean":
+        return profile.geometric_mean
+    elif mean_type == "Harmonic Mean":
+        if profile.harmonic_mean is None:
+            raise ValueError("The harmonic mean is only defined for values greater than or equal to zero.")
+        return profile.harmonic_mean
+    elif mean_type == "Weighted Mean":
+        return profile.weighted_mean
+
+
+def calculate_median(profile):
+    profile.require_numeric()
+    return profile.median
+
+
+def calculate_mode(profile):
+    if profile.mode is not None:
+        return profile.mode
+    # A sketch cannot single out a mode when no value is more frequent than its error bound
+    return "not available from the sketch" if profile.approximate else "No mode"
+
+
+def calculate_dispersion(profile, technique):
+    if technique == "Range":
+        return profile.range
+    elif technique == "Variance":
+        return profile.variance
+    elif technique == "Standard Deviation":
+        return profile.std
+    elif technique == "Skewness":
+        return profile.skewness
+    elif technique == "Kurtosis":
+        return profile.kurtosis
+    elif technique == "Distinct Values":
+        return profile.distinct
+
+
+def interpret_result(result, technique, sub_technique=None):
+    if technique == "Mean":
+        if sub_technique == "Arithmetic Mean":
+            return f"The arithmetic mean is {result:.2f}. It reflects the average value in the dataset."
+        elif sub_technique == "Geometric Mean":
+            return f"The geometric mean is {result:.2f}. It’s useful for understanding multiplicative effects in the data."
+        elif sub_technique == "Harmonic Mean":
+            return f"The harmonic mean is {result:.2f}. This is ideal for rates and ratios."
+        elif sub_technique == "Weighted Mean":
+            return f"The weighted mean is {result:.2f}, accounting for different levels of importance of the values."
+    elif technique == "Median":
+        return f"The median is {result}. It divides the dataset into two equal halves, and it’s robust against outliers."
+    elif technique == "Mode":
+        return f"The mode is {result}. It represents the most frequent value in the dataset."
+    elif technique == "Range":
+        return f"The range is {result}. It shows the spread between the largest and smallest values."
+    elif technique == "Variance":
+        return f"The variance is {result:.2f}. It reflects how spread out the data is around the mean."
+    elif technique == "Standard Deviation":
+        return f"The standard deviation is {result:.2f}. It indicates how much variability there is in the dataset."
+    elif technique == "Skewness":
+        return f"The skewness is {result:.2f}. It measures the asymmetry of the data distribution. Positive values indicate a right skew, while negative values indicate a left skew."
+    elif technique == "Kurtosis":
+        return f"The kurtosis is {result:.2f}. It indicates the 'tailedness' of the data distribution. Higher values suggest heavier tails and more outliers."
+    elif technique == "Distinct Values":
+        return f"There are {result} distinct values. A low count relative to the number of rows means many repeated values."
+
+
+def interpret_approximation(profile):
+    return (f" (Estimated from a sketch of the {profile.count} values with a {profile.sketch.error:.1%} error bound; "
+            "choose Exact precision for the exact value.)")
+
+
+def interpret_plot(plot_type):
+    if plot_type == "Histogram":
+        return ("The histogram shows the frequency distribution of your data. It helps to visualize the shape of the data distribution. "
+                "If the data is normally distributed, you will see a bell curve. Look out for skewness, which can indicate the presence "
+                "of outliers or asymmetry in the data.")
+    elif plot_type == "Box Plot":
+        return ("The box plot displays the distribution of your data and highlights potential outliers. "
+                "The length of the box represents the interquartile range (IQR), and the line inside the box shows the median. "
+                "Outliers are plotted as individual points. If the box is skewed or if there are many outliers, this suggests asymmetry or the presence of extreme values.")
+    elif plot_type == "Normal Distribution":
+        return ("The normal distribution plot visualizes whether your data follows a normal distribution. "
+                "If the curve is symmetric and bell-shaped, your data is normally distributed. Deviations from this shape suggest "
+                "skewness or kurtosis, which can influence statistical analysis. The dashed curve is the normal distribution with the "
+                "data's mean and standard deviation; in the Q-Q plot, normal data lies close to the dashed line.")
+
+
+def compute_statistic(profile, category, technique, sub_technique=None):
+    """
+    Result and interpretation of a Central Tendency or Dispersion technique.
+
+    Parameters:
+        profile (stats_profile.ColumnProfile): The column's profile.
+        category (str): "Central Tendency" or "Dispersion".
+        technique (str): One of CATEGORY_TECHNIQUES[category].
+        sub_technique (str): One of MEAN_TYPES when technique is "Mean".
+
+    Returns:
+        tuple: The result and its interpretation.
+    """
+    result = None
+    if category == "Central Tendency":
+        if technique == "Mean":
+            result = calculate_mean(profile, sub_technique)
+        elif technique == "Median":
+            result = calculate_median(profile)
+        elif technique == "Mode":
+            result = calculate_mode(profile)
+    elif category == "Dispersion":
+        result = calculate_dispersion(profile, technique)
+
+    interpretation = interpret_result(result, technique, sub_technique)
+    if profile.approximate and technique in ("Median", "Mode", "Distinct Values"):
+        interpretation += interpret_approximation(profile)
+    return result, interpretation
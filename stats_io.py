@@ -0,0 +1,220 @@
+"""
+File loading for StatsApp with a columnar sidecar cache.
+
+pd.read_excel is by far the slowest reader pandas has, and StatsApp only ever looks at one column
+at a time. The first time a workbook (or CSV file) is loaded it is converted to an uncompressed
+Feather file next to it, tagged with the source path, modification time and size. Later loads of
+the unchanged file memory-map the Feather file instead of parsing the workbook, and a column is
+only converted to pandas when it is first used. Parquet files are read directly, column by column.
+"""
+import hashlib
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+SIDECAR_SUFFIX = ".stats-cache.feather"
+
+# Rows parsed at a time from CSV files, so a load can report progress and be cancelled
+CSV_CHUNK_ROWS = 200_000
+
+# Used when the folder holding the source file is not writable
+FALLBACK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "stats_app")
+
+SUPPORTED_FILETYPES = [
+    ("Data files", "*.xlsx *.xls *.csv *.parquet"),
+    ("Excel files", "*.xlsx *.xls"),
+    ("CSV files", "*.csv"),
+    ("Parquet files", "*.parquet")
+]
+
+
+class LazyFrame:
+    """
+    Read-only, DataFrame-like view of a file whose columns are materialized on first access.
+
+    Supports the parts of the DataFrame interface StatsApp uses: columns, len() and frame[column].
+    Columns may be read from several analysis threads at once; each is kept once read.
+
+    Parameters:
+        columns (list): Column names.
+        num_rows (int): Number of rows.
+        read_column (callable): Returns the pd.Series for a column name.
+        source_path (str): The file the data came from.
+        schema (pa.Schema): Arrow schema of the columns, used to tell numeric columns apart.
+    """
+
+    def __init__(self, columns, num_rows, read_column, source_path, schema=None):
+        self.columns = pd.Index(columns)
+        self.num_rows = num_rows
+        self.source_path = source_path
+        self.schema = schema
+        self._read_column = read_column
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, column):
+        with self._lock:
+            series = self._cache.get(column)
+        if series is None:
+            if column not in self.columns:
+                raise KeyError(column)
+            series = self._read_column(column)
+            # Two threads may read the same column; every caller gets the first one stored
+            with self._lock:
+                series = self._cache.setdefault(column, series)
+        return series
+
+    @property
+    def numeric_columns(self):
+        """Names of the integer, floating-point and decimal columns, without reading any data."""
+        is_numeric = (pa.types.is_integer, pa.types.is_floating, pa.types.is_decimal)
+        return [column for column in self.columns
+                if any(check(self.schema.field(column).type) for check in is_numeric)]
+
+    def to_pandas(self):
+        """Materialize every column as a regular DataFrame."""
+        return pd.DataFrame({column: self[column] for column in self.columns})
+
+
+def sidecar_path(file_path):
+    """
+    Path of the sidecar cache for a source file.
+
+    The cache sits next to the file as a hidden file; if that folder is not writable it goes to
+    FALLBACK_CACHE_DIR under a name derived from the full path.
+    """
+    folder, name = os.path.split(os.path.abspath(file_path))
+    if os.access(folder, os.W_OK):
+        return os.path.join(folder, "." + name + SIDECAR_SUFFIX)
+
+    os.makedirs(FALLBACK_CACHE_DIR, exist_ok=True)
+    digest = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(FALLBACK_CACHE_DIR, f"{name}.{digest}{SIDECAR_SUFFIX}")
+
+
+def _source_key(file_path):
+    """Metadata identifying the version of a source file."""
+    stat = os.stat(file_path)
+    return {b"source_path": os.path.abspath(file_path).encode("utf-8"),
+            b"source_mtime_ns": str(stat.st_mtime_ns).encode(),
+            b"source_size": str(stat.st_size).encode()}
+
+
+def _to_arrow(df):
+    """Convert a DataFrame to an Arrow table, turning mixed-type columns into strings."""
+    df = df.rename(columns=str)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    # Excel columns often mix numbers and text, which Arrow cannot store in one column
+    df = df.copy()
+    for column in df.columns:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _read_source(file_path, progress=None):
+    """Parse an Excel or CSV file into a DataFrame, calling progress(message) after each CSV chunk."""
+    if not file_path.lower().endswith(".csv"):
+        return pd.read_excel(file_path)
+
+    chunks = []
+    rows = 0
+    with pd.read_csv(file_path, chunksize=CSV_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            chunks.append(chunk)
+            rows += len(chunk)
+            if progress:
+                progress(f"Parsed {rows:,} rows")
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.read_csv(file_path)
+
+
+def write_sidecar(file_path, cache_path=None, progress=None):
+    """
+    Parse a source file and write its sidecar cache.
+
+    Parameters:
+        file_path (str): Excel or CSV file.
+        cache_path (str): Where to write the cache. Defaults to sidecar_path(file_path).
+        progress (callable): Optional progress(message) callback, called between CSV chunks. It may
+            raise to stop the load; nothing is written then.
+
+    Returns:
+        str: Path of the written cache.
+    """
+    cache_path = cache_path or sidecar_path(file_path)
+    key = _source_key(file_path)
+    table = _to_arrow(_read_source(file_path, progress))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **key})
+
+    # Uncompressed, so the cache can be memory-mapped without decoding
+    temp_path = cache_path + ".tmp"
+    feather.write_feather(table, temp_path, compression="uncompressed")
+    os.replace(temp_path, cache_path)
+    return cache_path
+
+
+def _sidecar_is_current(file_path, cache_path):
+    if not os.path.exists(cache_path):
+        return False
+    try:
+        # Only the schema is read; the footer of an Arrow IPC file holds it
+        with pa.memory_map(cache_path, "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (pa.ArrowInvalid, OSError):
+        return False
+    return all(metadata.get(name) == value for name, value in _source_key(file_path).items())
+
+
+def _open_feather(cache_path, source_path):
+    table = feather.read_table(cache_path, memory_map=True)
+
+    def read_column(column):
+        return table.column(column).to_pandas().rename(column)
+
+    return LazyFrame(table.column_names, table.num_rows, read_column, source_path, table.schema)
+
+
+def _open_parquet(file_path):
+    parquet_file = pq.ParquetFile(file_path, memory_map=True)
+    columns = [name for name in parquet_file.schema_arrow.names if not name.startswith("__index_level_")]
+
+    def read_column(column):
+        return parquet_file.read(columns=[column]).column(0).to_pandas().rename(column)
+
+    return LazyFrame(columns, parquet_file.metadata.num_rows, read_column, file_path, parquet_file.schema_arrow)
+
+
+def load_dataset(file_path, progress=None):
+    """
+    Open an Excel, CSV or Parquet file for analysis.
+
+    Parameters:
+        file_path (str): The file to open.
+        progress (callable): Optional progress(message) callback for slow steps. It may raise to stop
+            the load (StatsApp raises TaskCancelled from it).
+
+    Returns:
+        LazyFrame: The file's columns, read on first use.
+    """
+    if file_path.lower().endswith(".parquet"):
+        return _open_parquet(file_path)
+
+    cache_path = sidecar_path(file_path)
+    if not _sidecar_is_current(file_path, cache_path):
+        if progress:
+            progress("Parsing file and writing cache")
+        write_sidecar(file_path, cache_path, progress)
+    return _open_feather(cache_path, file_path)
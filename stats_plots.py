@@ -0,0 +1,265 @@
+"""
+Distribution plots for StatsApp drawn from binned data.
+
+sns.histplot(data, kde=True) evaluates a Gaussian KDE at every grid point for every value, which
+takes minutes on millions of rows. Here the column is binned once onto a fine grid with NumPy
+(DistributionSummary, computed on a worker thread). Everything drawn is derived from that grid
+and the cached column profile:
+
+- the histogram sums groups of grid bins,
+- the KDE convolves the grid counts with a Gaussian kernel by FFT,
+- the fitted normal pdf uses the profile's mean and standard deviation,
+- the Q-Q plot reads sample quantiles off the cumulative grid counts.
+
+Plot time therefore depends on the number of bins, not on the number of rows.
+"""
+import numpy as np
+from scipy import stats
+
+# Fine grid the data is binned onto; a power of two so histogram bins are groups of grid bins
+GRID_SIZE = 4096
+
+# The KDE extends this many bandwidths beyond the data, as seaborn's default cut
+KDE_CUT = 3
+
+# Number of points in the Q-Q plot
+QQ_POINTS = 200
+
+
+def scott_bandwidth(std, count):
+    """Scott's rule bandwidth, as used by scipy.stats.gaussian_kde and seaborn."""
+    return std * count ** (-1 / 5)
+
+
+def histogram_bin_count(std, count, data_range):
+    """
+    Number of histogram bins from Scott's normal reference rule, rounded to a power of two.
+
+    Parameters:
+        std (float): Standard deviation of the data.
+        count (int): Number of values.
+        data_range (float): Maximum minus minimum.
+    """
+    if not std > 0 or not data_range > 0:
+        return 8
+    bins = data_range / (3.49 * std * count ** (-1 / 3))
+    return int(2 ** np.clip(np.round(np.log2(max(bins, 1))), 3, 9))
+
+
+class DistributionSummary:
+    """
+    Binned representation of a numeric column for plotting.
+
+    Parameters:
+        grid_edges (np.ndarray): Edges of the fine grid bins.
+        grid_counts (np.ndarray): Number of values in each grid bin.
+        data_range (tuple): Minimum and maximum of the data.
+        mean (float): Mean of the data.
+        std (float): Standard deviation of the data.
+        bin_count (int): Number of histogram bins over the data range.
+        bandwidth (float): KDE bandwidth.
+    """
+
+    def __init__(self, grid_edges, grid_counts, data_range, mean, std, bin_count, bandwidth):
+        self.grid_edges = grid_edges
+        self.grid_counts = grid_counts
+        self.data_range = data_range
+        self.mean = mean
+        self.std = std
+        self.bin_count = bin_count
+        self.bandwidth = bandwidth
+
+    @classmethod
+    def from_data(cls, data, profile):
+        """
+        Bin a column once.
+
+        Parameters:
+            data (pd.Series): The column's values, without missing values.
+            profile (stats_profile.ColumnProfile): The column's cached profile.
+
+        Returns:
+            DistributionSummary: The binned column.
+        """
+        profile.require_numeric()
+        low, high = float(profile.minimum), float(profile.maximum)
+        std = float(profile.std) if profile.count > 1 else 0.0
+        bandwidth = scott_bandwidth(std, profile.count) if std > 0 else 0.0
+
+        if high == low:
+            # Constant column: one unit wide range around the value
+            low, high = low - 0.5, high + 0.5
+
+        # The grid covers the histogram range plus room for the KDE tails
+        bin_count = histogram_bin_count(std, profile.count, high - low)
+        grid_width = (high - low) / GRID_SIZE
+        pad_bins = int(np.ceil(KDE_CUT * bandwidth / grid_width))
+
+        grid_edges = low + grid_width * np.arange(-pad_bins, GRID_SIZE + pad_bins + 1)
+        positions = np.floor((data.to_numpy(dtype=np.float64) - low) / grid_width).astype(np.int64)
+        positions = np.clip(positions, 0, GRID_SIZE - 1) + pad_bins
+        grid_counts = np.bincount(positions, minlength=len(grid_edges) - 1)
+        return cls(grid_edges, grid_counts, (low, high), float(profile.mean), std, bin_count, bandwidth)
+
+    @property
+    def count(self):
+        return int(self.grid_counts.sum())
+
+    @property
+    def grid_width(self):
+        return self.grid_edges[1] - self.grid_edges[0]
+
+    @property
+    def grid_centers(self):
+        return (self.grid_edges[:-1] + self.grid_edges[1:]) / 2
+
+    def histogram(self):
+        """Histogram edges and counts over the data range, summed from the grid."""
+        pad_bins = (len(self.grid_counts) - GRID_SIZE) // 2
+        inner = self.grid_counts[pad_bins:pad_bins + GRID_SIZE]
+        counts = inner.reshape(self.bin_count, -1).sum(axis=1)
+        edges = np.linspace(self.data_range[0], self.data_range[1], self.bin_count + 1)
+        return edges, counts
+
+    def kde(self):
+        """
+        Gaussian KDE on the grid centers, by FFT convolution of the grid counts.
+
+        Returns:
+            tuple: Grid centers and density values (integrating to 1), or None if the data is constant.
+        """
+        if not self.bandwidth > 0:
+            return None
+        sigma_bins = self.bandwidth / self.grid_width
+        half_width = int(min(np.ceil(4 * sigma_bins), len(self.grid_counts)))
+        offsets = np.arange(-half_width, half_width + 1)
+        kernel = np.exp(-0.5 * (offsets / sigma_bins) ** 2)
+        kernel /= kernel.sum()
+
+        # Zero-padded FFT convolution, then keep the part aligned with the grid
+        size = len(self.grid_counts) + len(kernel) - 1
+        smoothed = np.fft.irfft(np.fft.rfft(self.grid_counts, size) * np.fft.rfft(kernel, size), size)
+        smoothed = np.maximum(smoothed[half_width:half_width + len(self.grid_counts)], 0)
+        return self.grid_centers, smoothed / (self.count * self.grid_width)
+
+    def normal_pdf(self, x):
+        """Normal density with the data's mean and standard deviation."""
+        return stats.norm.pdf(x, self.mean, self.std)
+
+    def quantiles(self, probabilities):
+        """Sample quantiles, interpolated within the grid bins."""
+        cumulative = np.cumsum(self.grid_counts)
+        targets = np.asarray(probabilities) * self.count
+
+        # Grid bin holding each quantile, and how far into the bin it lies
+        bins = np.minimum(np.searchsorted(cumulative, targets, side="left"), len(cumulative) - 1)
+        before = cumulative[bins] - self.grid_counts[bins]
+        fraction = (targets - before) / np.maximum(self.grid_counts[bins], 1)
+        return self.grid_edges[bins] + fraction * self.grid_width
+
+    def qq_points(self, points=QQ_POINTS):
+        """
+        Theoretical normal and sample quantiles for a Q-Q plot.
+
+        Returns:
+            tuple: Normal quantiles with the data's mean and std, and the sample quantiles.
+        """
+        points = min(points, self.count)
+        probabilities = (np.arange(1, points + 1) - 0.5) / points
+        theoretical = stats.norm.ppf(probabilities, self.mean, self.std if self.std > 0 else 1.0)
+        return theoretical, self.quantiles(probabilities)
+
+
+def _set_line(ax, artists, name, x, y, **style):
+    """Create the named line on the axes, or update its data if it already exists."""
+    if name in artists:
+        artists[name].set_data(x, y)
+    else:
+        artists[name], = ax.plot(x, y, **style)
+
+
+def _rescale(ax):
+    ax.relim()
+    ax.autoscale_view()
+
+
+def draw_histogram(ax, summary, density=False, kde=True, artists=None):
+    """
+    Draw the histogram and KDE of a DistributionSummary.
+
+    Parameters:
+        ax (matplotlib.axes.Axes): Axes to draw on.
+        summary (DistributionSummary): The binned column.
+        density (bool): Scale to a density instead of counts.
+        kde (bool): Overlay the KDE.
+        artists (dict): Artists returned by an earlier call on the same axes, updated in place
+            instead of drawing new ones.
+
+    Returns:
+        dict: The histogram and KDE artists.
+    """
+    artists = {} if artists is None else artists
+    edges, counts = summary.histogram()
+    heights = counts / (summary.count * np.diff(edges)) if density else counts
+    if "histogram" in artists:
+        artists["histogram"].set_data(heights, edges)
+    else:
+        artists["histogram"] = ax.stairs(heights, edges, fill=True, alpha=0.5, label="Histogram")
+
+    curve = summary.kde() if kde else None
+    if curve is not None:
+        x, y = curve
+        # Counts per histogram bin, as sns.histplot scales its KDE
+        _set_line(ax, artists, "kde", x, y if density else y * summary.count * np.diff(edges)[0], label="KDE")
+    elif "kde" in artists:
+        artists["kde"].set_data([], [])
+
+    ax.set_ylabel("Density" if density else "Count")
+    _rescale(ax)
+    return artists
+
+
+def draw_normal_fit(ax, summary, artists=None):
+    """
+    Draw the density histogram, KDE and the fitted normal pdf.
+
+    Parameters:
+        ax (matplotlib.axes.Axes): Axes to draw on.
+        summary (DistributionSummary): The binned column.
+        artists (dict): Artists returned by an earlier call on the same axes, updated in place.
+
+    Returns:
+        dict: The drawn artists.
+    """
+    artists = draw_histogram(ax, summary, density=True, artists=artists)
+    x = summary.grid_centers
+    y = summary.normal_pdf(x) if summary.std > 0 else np.full(len(x), np.nan)
+    _set_line(ax, artists, "normal", x, y, linestyle="--")
+    artists["normal"].set_label(f"Normal(μ={summary.mean:.3g}, σ={summary.std:.3g})")
+    ax.legend()
+    _rescale(ax)
+    return artists
+
+
+def draw_qq(ax, summary, artists=None):
+    """
+    Draw a normal Q-Q plot with the y = x reference line.
+
+    Parameters:
+        ax (matplotlib.axes.Axes): Axes to draw on.
+        summary (DistributionSummary): The binned column.
+        artists (dict): Artists returned by an earlier call on the same axes, updated in place.
+
+    Returns:
+        dict: The points and the reference line.
+    """
+    artists = {} if artists is None else artists
+    theoretical, sample = summary.qq_points()
+    _set_line(ax, artists, "points", theoretical, sample, marker="o", markersize=3, linestyle="none")
+    limits = [min(theoretical.min(), sample.min()), max(theoretical.max(), sample.max())]
+    _set_line(ax, artists, "reference", limits, limits, color="gray", linestyle="--")
+    ax.set_xlabel("Normal quantiles")
+    ax.set_ylabel("Sample quantiles")
+    ax.set_title("Normal Q-Q Plot")
+    _rescale(ax)
+    return artists
@@ -0,0 +1,298 @@
+"""
+Cached column profiles for StatsApp.
+
+A ColumnProfile holds every summary statistic the Central Tendency and Dispersion analyses can
+ask for: count, minimum, maximum, mean and the central moment sums M2, M3 and M4, plus median,
+mode and the geometric and harmonic means. They are computed together when a column is first
+analyzed, and every later choice for that column is a lookup. Profiles are cached per (dataset
+version, column, sketch error), so loading a new file invalidates them.
+
+grouped_statistics computes the same statistics for every group of a group-by column at once.
+
+For very large columns the median, mode, distinct count and box plot can come from the mergeable
+sketches in stats_sketch instead of a full sort and hash of the column; the moments stay exact.
+
+Results match the previous pandas/scipy calls: sample variance (ddof=1), and the biased skewness
+and Fisher kurtosis of scipy.stats.skew and scipy.stats.kurtosis.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from stats_sketch import sketch_column, smallest_or_first
+
+# Columns longer than this are sketched when the precision is "auto"
+SKETCH_THRESHOLD = 5_000_000
+
+
+def resolve_sketch_error(precision, count):
+    """
+    Sketch error to use for a column, or None for exact statistics.
+
+    Parameters:
+        precision: None for exact, "auto", or an error bound such as 0.01.
+        count (int): Number of rows in the column.
+    """
+    if precision == "auto":
+        return 0.01 if count > SKETCH_THRESHOLD else None
+    return precision
+
+
+class ColumnProfile:
+    """
+    Summary statistics of one column, without missing values.
+
+    Parameters:
+        count (int): Number of values.
+        mode: Most frequent value (the smallest if several are tied, or the first seen if the tied
+            values cannot be compared), or None when empty. A sketched mode is None when no value
+            is more frequent than the sketch's error bound (see CountMinSketch.mode).
+        distinct (int): Number of distinct values.
+        numeric (bool): Whether the column is numeric; the other statistics are None if not.
+        minimum, maximum: Smallest and largest value, in the column's dtype.
+        mean (float): Arithmetic mean.
+        m2, m3, m4 (float): Sums of the 2nd, 3rd and 4th powers of the deviations from the mean.
+        median (float): Median.
+        geometric_mean (float): Geometric mean (nan if a value is negative).
+        harmonic_mean (float): Harmonic mean, or None if a value is negative.
+        weighted_mean (float): Mean weighted by a weight column; the arithmetic mean without one.
+        sketch (stats_sketch.ColumnSketch): The sketches the median, mode and distinct count were
+            estimated from, or None if they are exact.
+    """
+
+    def __init__(self, count, mode, distinct, numeric, minimum=None, maximum=None, mean=None, m2=None, m3=None,
+                 m4=None, median=None, geometric_mean=None, harmonic_mean=None, weighted_mean=None, sketch=None):
+        self.count = count
+        self.mode = mode
+        self.distinct = distinct
+        self.numeric = numeric
+        self.minimum = minimum
+        self.maximum = maximum
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+        self.median = median
+        self.geometric_mean = geometric_mean
+        self.harmonic_mean = harmonic_mean
+        self.weighted_mean = weighted_mean
+        self.sketch = sketch
+
+    @property
+    def approximate(self):
+        return self.sketch is not None
+
+    @classmethod
+    def from_series(cls, data, sketch_error=None, weights=None):
+        """
+        Profile a column.
+
+        Parameters:
+            data (pd.Series): The column's values, without missing values.
+            sketch_error (float): Estimate the median, mode and distinct count with sketches of
+                this error bound instead of exactly.
+            weights (pd.Series): Weights for the weighted mean, aligned with data by index.
+                Missing weights count as 0.
+
+        Returns:
+            ColumnProfile: The statistics.
+        """
+        numeric = pd.api.types.is_numeric_dtype(data) and not pd.api.types.is_bool_dtype(data)
+
+        sketch = None
+        if sketch_error is not None and len(data):
+            sketch = sketch_column(data, sketch_error, numeric=numeric)
+            mode, distinct = sketch.frequencies.mode(), sketch.distinct.count()
+        else:
+            # Mode from one value count; pandas' mode returns the tied values sorted, so take the smallest
+            counts = data.value_counts(sort=False)
+            mode = smallest_or_first(counts.index[counts == counts.max()]) if len(counts) else None
+            distinct = len(counts)
+
+        if not numeric or len(data) == 0:
+            return cls(len(data), mode, distinct, numeric, sketch=sketch)
+
+        values = data.to_numpy()
+        x = values.astype(np.float64, copy=False)
+        mean = x.mean()
+        deviations = x - mean
+        squared = deviations * deviations
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Same conventions as scipy's gmean and hmean: zeros give 0, negative values are undefined
+            geometric_mean = np.exp(np.log(x).mean())
+            harmonic_mean = len(x) / np.sum(1.0 / x) if (x >= 0).all() else None
+            if harmonic_mean is not None and (x == 0).any():
+                harmonic_mean = 0.0
+
+        weighted_mean = mean
+        if weights is not None:
+            w = weights.reindex(data.index).to_numpy(dtype=np.float64, na_value=0.0)
+            total_weight = w.sum()
+            weighted_mean = np.dot(w, x) / total_weight if total_weight != 0 else np.nan
+
+        median = sketch.quantiles.quantile(0.5) if sketch is not None else np.median(x)
+        return cls(len(x), mode, distinct, True, minimum=values.min(), maximum=values.max(), mean=mean,
+                   m2=squared.sum(), m3=(squared * deviations).sum(), m4=(squared * squared).sum(),
+                   median=median, geometric_mean=geometric_mean, harmonic_mean=harmonic_mean,
+                   weighted_mean=weighted_mean, sketch=sketch)
+
+    def box_stats(self, label=None):
+        """Box plot statistics for Axes.bxp from the quantile sketch."""
+        self.require_numeric()
+        return self.sketch.quantiles.box_stats(label)
+
+    def require_numeric(self):
+        if not self.numeric:
+            raise TypeError("This statistic needs a numeric column.")
+        if self.count == 0:
+            raise ValueError("The column has no values.")
+
+    @property
+    def range(self):
+        self.require_numeric()
+        return self.maximum - self.minimum
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1)."""
+        self.require_numeric()
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def skewness(self):
+        """Biased sample skewness, as scipy.stats.skew."""
+        self.require_numeric()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (self.m3 / self.count) / (self.m2 / self.count) ** 1.5 if self.m2 > 0 else np.nan
+
+    @property
+    def kurtosis(self):
+        """Biased excess (Fisher) kurtosis, as scipy.stats.kurtosis."""
+        self.require_numeric()
+        return (self.m4 / self.count) / (self.m2 / self.count) ** 2 - 3 if self.m2 > 0 else np.nan
+
+
+class ProfileCache:
+    """
+    ColumnProfiles keyed by (dataset version, column, sketch error, weight column), shared by the
+    analysis worker threads.
+    """
+
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get(self, version, column, load_data, sketch_error=None, weight_column=None, load_weights=None):
+        """
+        Profile of a column, computed on first use.
+
+        Parameters:
+            version (int): Version of the loaded dataset.
+            column (str): Column name.
+            load_data (callable): Returns the column's values without missing values.
+            sketch_error (float): Error bound of the sketches, or None for exact statistics.
+            weight_column (str): Name of the weight column, or None.
+            load_weights (callable): Returns the weight column when weight_column is given.
+
+        Returns:
+            ColumnProfile: The cached or newly computed profile.
+        """
+        key = (version, column, sketch_error, weight_column)
+        with self._lock:
+            profile = self._profiles.get(key)
+        if profile is None:
+            weights = load_weights() if weight_column is not None else None
+            profile = ColumnProfile.from_series(load_data(), sketch_error, weights)
+            with self._lock:
+                profile = self._profiles.setdefault(key, profile)
+        return profile
+
+    def clear(self):
+        """Drop every cached profile, e.g. after a new file was loaded."""
+        with self._lock:
+            self._profiles.clear()
+
+
+# Columns of the grouped_statistics table, named as the StatsApp techniques
+GROUPED_STATISTICS = ["Count", "Arithmetic Mean", "Weighted Mean", "Geometric Mean", "Harmonic Mean", "Median",
+                      "Mode", "Range", "Variance", "Standard Deviation", "Skewness", "Kurtosis", "Distinct Values"]
+
+
+def grouped_statistics(values, groups, weights=None):
+    """
+    Every Central Tendency and Dispersion statistic per group, as a table.
+
+    The sums behind the moments and the means are computed for all groups at once with
+    np.bincount over the group codes, and the order statistics with one groupby, so the cost does
+    not grow with the number of groups. Conventions match ColumnProfile: sample variance, biased
+    skewness, Fisher kurtosis, the smallest value among tied modes, and nan for a geometric or
+    harmonic mean of a group with negative values.
+
+    Parameters:
+        values (pd.Series): Numeric column.
+        groups (pd.Series): Group labels, aligned with values by index. Rows without a label are dropped.
+        weights (pd.Series): Weights for the weighted mean, aligned by index. Missing weights count as 0.
+
+    Returns:
+        pd.DataFrame: One row per group (sorted), with the GROUPED_STATISTICS columns.
+    """
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        raise TypeError("This statistic needs a numeric column.")
+
+    frame = pd.DataFrame({"group": groups, "x": values})
+    frame["w"] = weights if weights is not None else 1.0
+    frame = frame.dropna(subset=["group", "x"])
+
+    codes, labels = pd.factorize(frame["group"], sort=True)
+    group_count = len(labels)
+    x = frame["x"].to_numpy(dtype=np.float64)
+    w = frame["w"].to_numpy(dtype=np.float64, na_value=0.0)
+
+    def group_sums(column):
+        return np.bincount(codes, weights=column, minlength=group_count)
+
+    count = np.bincount(codes, minlength=group_count)
+    mean = group_sums(x) / count
+    deviations = x - mean[codes]
+    squared = deviations * deviations
+    m2, m3, m4 = group_sums(squared), group_sums(squared * deviations), group_sums(squared * squared)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight_sums = group_sums(w)
+        weighted_mean = np.where(weight_sums != 0, group_sums(w * x) / weight_sums, np.nan)
+        # log(0) = -inf gives a geometric mean of 0 and 1/0 = inf a harmonic mean of 0, as in scipy
+        geometric_mean = np.exp(group_sums(np.log(x)) / count)
+        harmonic_mean = count / group_sums(1.0 / x)
+        variance = np.where(count > 1, m2 / (count - 1), np.nan)
+        skewness = np.where(m2 > 0, (m3 / count) / (m2 / count) ** 1.5, np.nan)
+        kurtosis = np.where(m2 > 0, (m4 / count) / (m2 / count) ** 2 - 3, np.nan)
+
+    order = frame.groupby(codes)["x"].agg(["min", "max", "median", "nunique"])
+    harmonic_mean[order["min"].to_numpy() < 0] = np.nan
+
+    # Value counts per (group, value), sorted by value, so idxmax picks the smallest tied mode
+    value_counts = frame.groupby([codes, frame["x"].to_numpy()]).size()
+    mode = value_counts.groupby(level=0).idxmax().map(lambda key: key[1])
+
+    table = pd.DataFrame({
+        "Count": count,
+        "Arithmetic Mean": mean,
+        "Weighted Mean": weighted_mean,
+        "Geometric Mean": geometric_mean,
+        "Harmonic Mean": harmonic_mean,
+        "Median": order["median"].to_numpy(),
+        "Mode": mode.to_numpy(),
+        "Range": (order["max"] - order["min"]).to_numpy(),
+        "Variance": variance,
+        "Standard Deviation": np.sqrt(variance),
+        "Skewness": skewness,
+        "Kurtosis": kurtosis,
+        "Distinct Values": order["nunique"].to_numpy()
+    }, index=pd.Index(labels, name=getattr(groups, "name", None)))
+    return table
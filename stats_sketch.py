@@ -0,0 +1,377 @@
+"""
+Mergeable approximate sketches for StatsApp's median, mode, distinct-count and box plot on huge
+columns.
+
+The exact statistics sort or hash the whole column. These sketches read the column in chunks,
+use memory that depends only on the requested error, and can be merged, so chunks (or separate
+processes working on parts of a file) can be sketched independently and combined:
+
+- KLLSketch: quantiles within a chosen normalized rank error (median, quartiles, box plot).
+- CountMinSketch: frequency estimates that overcount by at most error * total with probability
+  1 - delta, plus a list of heavy hitters for the mode. Heavy hitters that are within that bound of
+  each other cannot be told apart, so the mode is the smallest of them, as for the exact mode.
+- HyperLogLog: distinct counts with a chosen relative standard error.
+"""
+import hashlib
+import math
+
+import numpy as np
+import pandas as pd
+
+# Default chunk size when sketching a column
+CHUNK_SIZE = 1_000_000
+
+# One 16-character hash key per count-min row, plus one for HyperLogLog
+_HASH_KEYS = [f"statsapp-hash-{row:02d}" for row in range(32)]
+_HLL_HASH_KEY = "statsapp-hllkey0"
+
+
+def _hash(values, hash_key):
+    """64-bit hashes of an array of values (numbers, strings or mixed objects)."""
+    hashes = pd.util.hash_array(np.asarray(values), hash_key=hash_key)
+
+    # hash_array only uses the key for object arrays, so numbers would hash alike in every count-min
+    # row. Mix a constant derived from the key in with the splitmix64 finalizer.
+    seed = np.uint64(int.from_bytes(hashlib.sha256(hash_key.encode("utf-8")).digest()[:8], "little"))
+    mixed = (hashes ^ seed) * np.uint64(0x9E3779B97F4A7C15)
+    mixed = (mixed ^ (mixed >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    mixed = (mixed ^ (mixed >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return mixed ^ (mixed >> np.uint64(31))
+
+
+def smallest_or_first(values):
+    """The smallest of some values, or the first one if they cannot be compared (e.g. str and int)."""
+    try:
+        return values.min()
+    except TypeError:
+        return values[0]
+
+
+def kll_k(rank_error):
+    """Compactor size of a KLL sketch for a normalized rank error (empirical DataSketches fit)."""
+    return max(int(math.ceil((2.296 / rank_error) ** (1 / 0.9723))), 8)
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch of numeric values.
+
+    Parameters:
+        rank_error (float): Normalized rank error, e.g. 0.01 for quantiles within one percentile.
+        seed (int): Seed for the random compaction offsets.
+    """
+
+    def __init__(self, rank_error=0.01, seed=None):
+        self.rank_error = rank_error
+        self.k = kll_k(rank_error)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller compactors
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                # Sort, keep every other item (random offset) at twice the weight one level up
+                items = np.sort(self.levels[level])
+                odd = len(items) % 2
+                promoted = items[odd + self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:odd]
+            level += 1
+
+    def update(self, values):
+        """Add an array of values; missing values are ignored."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """
+        Add the values summarized by another KLLSketch.
+
+        Parameters:
+            other (KLLSketch): Sketch to merge in.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+
+    def weighted_items(self):
+        """The retained items, sorted, with their weights."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** depth, dtype=np.int64)
+                                  for depth, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        """
+        Approximate quantile(s).
+
+        Parameters:
+            q (float or array-like): Quantile level(s) between 0 and 1.
+
+        Returns:
+            float or np.ndarray: The quantile value(s).
+        """
+        if self.count == 0:
+            raise ValueError("The sketch is empty.")
+        items, weights = self.weighted_items()
+        cumulative = np.cumsum(weights)
+        levels = np.asarray(q, dtype=np.float64)
+        positions = np.minimum(np.searchsorted(cumulative, levels * cumulative[-1], side="left"), len(items) - 1)
+        result = items[positions]
+
+        # The exact extremes are tracked separately
+        result = np.where(levels <= 0, self.minimum, np.where(levels >= 1, self.maximum, result))
+        return result if result.ndim else float(result)
+
+    def rank(self, value):
+        """Approximate fraction of the values less than or equal to value."""
+        items, weights = self.weighted_items()
+        return weights[items <= value].sum() / weights.sum()
+
+    def box_stats(self, label=None):
+        """
+        Box plot statistics for Axes.bxp, with whiskers at 1.5 IQR and no fliers.
+
+        Parameters:
+            label (str): Label of the box.
+
+        Returns:
+            dict: med, q1, q3, whislo, whishi, fliers and label.
+        """
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        low_fence, high_fence = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+        # Whiskers end at the most extreme retained values inside the fences
+        items, _ = self.weighted_items()
+        inside = items[(items >= low_fence) & (items <= high_fence)]
+        whislo = self.minimum if self.minimum >= low_fence else (inside.min() if len(inside) else q1)
+        whishi = self.maximum if self.maximum <= high_fence else (inside.max() if len(inside) else q3)
+        return {"med": median, "q1": q1, "q3": q3, "whislo": min(whislo, q1), "whishi": max(whishi, q3),
+                "fliers": [], "label": label}
+
+
+class CountMinSketch:
+    """
+    Count-min frequency sketch with a heavy-hitter list.
+
+    Parameters:
+        error (float): Bound on the overcount of an estimate, as a fraction of the total count.
+        delta (float): Probability that an estimate exceeds that bound.
+        heavy_hitters (int): Number of most frequent candidate values to track.
+    """
+
+    def __init__(self, error=0.001, delta=0.01, heavy_hitters=20):
+        self.error = error
+        self.delta = delta
+        self.width = int(math.ceil(math.e / error))
+        self.depth = min(int(math.ceil(math.log(1 / delta))), len(_HASH_KEYS))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+        self.heavy_hitters = heavy_hitters
+        # Index of candidate values, in the column's dtype so they hash as in the table
+        self.candidates = pd.Index([])
+
+    def _add(self, values, counts):
+        for row in range(self.depth):
+            columns = (_hash(values, _HASH_KEYS[row]) % np.uint64(self.width)).astype(np.intp)
+            self.table[row] += np.bincount(columns, weights=counts, minlength=self.width).astype(np.int64)
+
+    def estimate(self, values):
+        """Estimated counts of an array of values (never below the true counts)."""
+        values = pd.Index(values).to_numpy()
+        if len(values) == 0:
+            return np.empty(0, dtype=np.int64)
+        estimates = [self.table[row, (_hash(values, _HASH_KEYS[row]) % np.uint64(self.width)).astype(np.intp)]
+                     for row in range(self.depth)]
+        return np.min(estimates, axis=0)
+
+    def _keep_top(self, candidates):
+        if len(self.candidates):
+            candidates = self.candidates.append(candidates)
+        candidates = candidates.unique()
+        estimates = self.estimate(candidates)
+        order = np.argsort(-estimates, kind="stable")[:self.heavy_hitters]
+        self.candidates = candidates[order]
+
+    def update(self, values):
+        """Add an array of values; missing values are ignored."""
+        counts = pd.Series(values).value_counts(dropna=True)
+        if counts.empty:
+            return
+        self._add(counts.index.to_numpy(), counts.to_numpy(dtype=np.float64))
+        self.total += int(counts.sum())
+        self._keep_top(counts.index[:self.heavy_hitters])
+
+    def merge(self, other):
+        """
+        Add the values summarized by another CountMinSketch with the same error and delta.
+
+        Parameters:
+            other (CountMinSketch): Sketch to merge in.
+        """
+        self.table += other.table
+        self.total += other.total
+        self._keep_top(other.candidates)
+
+    def most_common(self, n=None):
+        """Heavy hitters as (value, estimated count) pairs, most frequent first."""
+        candidates = self.candidates[:n] if n else self.candidates
+        return list(zip(candidates.tolist(), self.estimate(candidates).tolist()))
+
+    def mode(self):
+        """
+        Most frequent value, or None if the sketch cannot single one out.
+
+        Every heavy hitter whose estimate is within error * total of the largest may be the true
+        mode, so the smallest of them is returned. None is returned when even the largest estimate
+        is within that bound, as on near-uniform or continuous columns, or when the sketch is empty.
+        """
+        if not len(self.candidates):
+            return None
+        estimates = self.estimate(self.candidates)
+        bound = self.error * self.total
+        if estimates.max() <= bound:
+            return None
+        return smallest_or_first(self.candidates[estimates >= estimates.max() - bound])
+
+
+def _bit_length(values):
+    """Bit length of every uint64 in an array, exactly (float64 is exact on 32-bit halves)."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch.
+
+    Parameters:
+        relative_error (float): Relative standard error of the count, e.g. 0.01 for 1%.
+    """
+
+    def __init__(self, relative_error=0.01):
+        self.precision = int(np.clip(math.ceil(2 * math.log2(1.04 / relative_error)), 4, 18))
+        self.registers = np.zeros(2 ** self.precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values):
+        """Add an array of values; missing values are ignored."""
+        values = pd.Series(values).dropna().to_numpy()
+        if len(values) == 0:
+            return
+        hashes = _hash(values, _HLL_HASH_KEY)
+
+        # The first bits pick the register, the position of the first one bit in the rest is the rank
+        remaining_bits = 64 - self.precision
+        registers = (hashes >> np.uint64(remaining_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << remaining_bits) - 1)
+        ranks = (remaining_bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, registers, ranks)
+
+    def merge(self, other):
+        """
+        Add the values summarized by another HyperLogLog with the same precision.
+
+        Parameters:
+            other (HyperLogLog): Sketch to merge in.
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """Estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        # Linear counting is more accurate while many registers are still empty
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            estimate = m * math.log(m / empty)
+        return int(round(estimate))
+
+
+class ColumnSketch:
+    """
+    Quantile, frequency and distinct-count sketches of one column.
+
+    Parameters:
+        error (float): Rank error of the quantiles and relative error of the distinct count. The
+            count-min table uses a ten times smaller bound, as heavy hitters of long-tailed columns
+            are often close in frequency and the table stays small.
+        numeric (bool): Whether to keep a quantile sketch (numeric columns only).
+    """
+
+    def __init__(self, error=0.01, numeric=True):
+        self.error = error
+        self.quantiles = KLLSketch(error) if numeric else None
+        self.frequencies = CountMinSketch(error / 10)
+        self.distinct = HyperLogLog(error)
+
+    def update(self, values):
+        """Add an array of values."""
+        if self.quantiles is not None:
+            self.quantiles.update(values)
+        self.frequencies.update(values)
+        self.distinct.update(values)
+
+    def merge(self, other):
+        """
+        Add the values summarized by another ColumnSketch with the same settings.
+
+        Parameters:
+            other (ColumnSketch): Sketch to merge in.
+        """
+        if self.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        self.frequencies.merge(other.frequencies)
+        self.distinct.merge(other.distinct)
+
+
+def sketch_column(data, error=0.01, numeric=True, chunk_size=CHUNK_SIZE):
+    """
+    Sketch a column one chunk at a time.
+
+    Parameters:
+        data (pd.Series or np.ndarray): The column's values.
+        error (float): Error bound of the sketches.
+        numeric (bool): Whether to keep a quantile sketch.
+        chunk_size (int): Values sketched at a time.
+
+    Returns:
+        ColumnSketch: The sketches.
+    """
+    values = np.asarray(data)
+    sketch = ColumnSketch(error, numeric)
+    for start in range(0, len(values), chunk_size):
+        sketch.update(values[start:start + chunk_size])
+    return sketch
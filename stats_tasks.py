@@ -0,0 +1,196 @@
+"""
+Background task execution for StatsApp.
+
+Loading a workbook and computing statistics can take tens of seconds on large files, so they run
+on a pool of worker threads instead of the Tk main thread. Tk widgets may only be touched from the
+main thread, so workers never call back into the UI directly: they post events to a queue that the
+main thread drains with root.after, and the completion, error and progress callbacks run there.
+An exception raised by one of those callbacks is passed to root.report_callback_exception, like an
+exception in any other Tk callback, and the polling carries on.
+"""
+import itertools
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task function when its task has been cancelled."""
+
+
+class Task:
+    """
+    Handle for one background computation.
+
+    The task function receives its Task as first argument and can call report_progress and
+    check_cancelled between steps.
+
+    Parameters:
+        task_id (int): Identifier, unique within the runner.
+        description (str): Short text shown while the task runs.
+        events (queue.Queue): The runner's event queue.
+        cancellable (bool): Whether the task function checks for cancellation. Tasks that do not
+            (e.g. a single long library call) ignore cancel.
+    """
+
+    def __init__(self, task_id, description, events, cancellable=True):
+        self.id = task_id
+        self.description = description
+        self.cancellable = cancellable
+        self.future = None
+        self._events = events
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Ask the task to stop; its result is discarded even if it finishes."""
+        if not self.cancellable:
+            return
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check_cancelled(self):
+        """Raise TaskCancelled if the task has been cancelled."""
+        if self.cancelled:
+            raise TaskCancelled()
+
+    def report_progress(self, fraction, message=None):
+        """
+        Report progress to the UI. Stops the task if it has been cancelled.
+
+        Parameters:
+            fraction (float): Completed fraction, between 0 and 1.
+            message (str): Optional description of the current step.
+        """
+        self.check_cancelled()
+        self._events.put(("progress", self, (fraction, message)))
+
+
+class TaskRunner:
+    """
+    Runs functions on worker threads and delivers their results on the Tk main thread.
+
+    Parameters:
+        root (tk.Tk): The application root, used to schedule the event polling.
+        max_workers (int): Number of tasks that can run at the same time.
+        poll_interval (int): Milliseconds between polls of the event queue.
+        on_progress (callable): Called on the main thread as on_progress(task, fraction, message)
+            whenever a task reports progress or finishes (fraction 1.0).
+    """
+
+    def __init__(self, root, max_workers=4, poll_interval=50, on_progress=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_progress = on_progress
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stats-task")
+        self.events = queue.Queue()
+        self.tasks = {}
+        self.callbacks = {}
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    @property
+    def running(self):
+        """Tasks that have been submitted and have not finished yet."""
+        return list(self.tasks.values())
+
+    def submit(self, function, *args, on_done=None, on_error=None, description="", cancellable=True):
+        """
+        Run function(task, *args) on a worker thread.
+
+        Parameters:
+            function (callable): The computation. Must not touch Tk widgets.
+            *args: Further arguments for the function.
+            on_done (callable): Called on the main thread with the function's return value.
+            on_error (callable): Called on the main thread with the exception if the function raises.
+            description (str): Short text shown while the task runs.
+            cancellable (bool): Whether the function checks for cancellation (see Task).
+
+        Returns:
+            Task: Handle that can be used to cancel the task.
+        """
+        task = Task(next(self._ids), description, self.events, cancellable)
+        self.tasks[task.id] = task
+        self.callbacks[task.id] = (on_done, on_error)
+        task.future = self.executor.submit(self._run, task, function, args)
+        return task
+
+    def _run(self, task, function, args):
+        try:
+            result = function(task, *args)
+        except TaskCancelled:
+            self.events.put(("cancelled", task, None))
+        except Exception as error:
+            self.events.put(("error", task, error))
+        else:
+            self.events.put(("cancelled", task, None) if task.cancelled else ("done", task, result))
+
+    def _poll(self):
+        try:
+            # Drain everything the workers posted since the last poll
+            while True:
+                try:
+                    kind, task, payload = self.events.get_nowait()
+                except queue.Empty:
+                    break
+
+                if kind == "progress":
+                    if not task.cancelled and self.on_progress:
+                        self._call(self.on_progress, task, *payload)
+                    continue
+
+                self._finish(task, kind, payload)
+
+            # Tasks cancelled before a worker picked them up never run, so nothing else reports them
+            for task in list(self.tasks.values()):
+                if task.future.cancelled():
+                    self._finish(task, "cancelled", None)
+        finally:
+            # Keep polling whatever happened above, unless a callback shut the runner down
+            if not self._closed:
+                self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _call(self, callback, *args):
+        """Run a callback, reporting an exception instead of raising it. Returns False if it raised."""
+        try:
+            callback(*args)
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
+            return False
+        return True
+
+    def _finish(self, task, kind, payload):
+        if self.tasks.pop(task.id, None) is None:
+            return
+        on_done, on_error = self.callbacks.pop(task.id)
+
+        if self.on_progress:
+            self._call(self.on_progress, task, 1.0, None)
+        if kind == "done" and on_done:
+            try:
+                on_done(payload)
+            except Exception as error:
+                # A failing completion callback is reported like a failing task
+                if on_error is None or not self._call(on_error, error):
+                    self.root.report_callback_exception(type(error), error, error.__traceback__)
+        elif kind == "error":
+            if on_error is None or not self._call(on_error, payload):
+                self.root.report_callback_exception(type(payload), payload, payload.__traceback__)
+
+    def cancel_all(self):
+        """Cancel every running or queued task."""
+        for task in self.tasks.values():
+            task.cancel()
+
+    def shutdown(self):
+        """Cancel all tasks, stop polling and release the worker threads."""
+        self.cancel_all()
+        self._closed = True
+        self.root.after_cancel(self._poll_id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,40 @@
+"""
+Make the flat top-level modules importable from the tests, and shared fixtures.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def synthetic_folder(tmp_path_factory):
+    """Three months of synthetic raw trip CSV files; copy it before changing the files."""
+    from trip_synth import generate_trip_files
+
+    folder = tmp_path_factory.mktemp("synthetic")
+    generate_trip_files(str(folder), rows=3000, months=3, stations=60, seed=1)
+    return str(folder)
+
+
+@pytest.fixture(scope="session")
+def random_trips():
+    """
+    Factory of random cleaned-looking trips between "Station NN" names, with Zipf-distributed
+    start stations so a few stations dominate, as make(size, stations, days, zipf=1.5, seed=0).
+    """
+    def make(size, stations, days, zipf=1.5, seed=0):
+        rng = np.random.default_rng(seed)
+        names = np.array([f"Station {index:02d}" for index in range(stations)], dtype=object)
+        started = np.datetime64("2024-03-01T00:00:00") + rng.integers(0, days * 86400, size) * np.timedelta64(1, "s")
+        return pd.DataFrame({"started_at": started,
+                             "ended_at": started + rng.integers(60, 3600, size) * np.timedelta64(1, "s"),
+                             "start_station_name": names[rng.zipf(zipf, size) % stations],
+                             "end_station_name": names[rng.integers(0, stations, size)],
+                             "rider_type": rng.choice(["member", "casual"], size, p=[0.75, 0.25])})
+
+    return make
@@ -0,0 +1,94 @@
+import json
+import time
+import tracemalloc
+
+import pytest
+
+from pipeline_profile import PipelineProfiler, measure_stage, profile_step, slowest_stage, worker_profile
+
+
+def test_nested_stages_are_recorded_in_start_order(tmp_path):
+    path = str(tmp_path / "profile.json")
+    profiler = PipelineProfiler("test", output_path=path)
+    with profiler.stage("load", rows_in=10) as stage:
+        with profiler.stage("parse"):
+            time.sleep(0.01)
+        stage["rows_out"] = 8
+    with profiler.stage("plot"):
+        pass
+
+    assert [record["stage"] for record in profiler.records] == ["load", "load/parse", "plot"]
+    load = profiler.records[0]
+    assert load["rows_in"] == 10 and load["rows_out"] == 8 and load["wall_s"] >= profiler.records[1]["wall_s"] > 0
+    assert slowest_stage(path) == "load"
+    with open(path, encoding="utf-8") as file:
+        assert [record["stage"] for record in json.load(file)["stages"]] == ["load", "load/parse", "plot"]
+    assert "<- slowest" in profiler.summary().splitlines()[1]
+
+
+def test_failed_stage_is_recorded_and_written(tmp_path):
+    path = str(tmp_path / "profile.json")
+    profiler = PipelineProfiler("test", trace_python=True, output_path=path)
+    with pytest.raises(ValueError, match="bad month"):
+        with profiler.stage("clean"):
+            with profiler.stage("parse"):
+                raise ValueError("bad month")
+
+    assert [record["stage"] for record in profiler.records] == ["clean", "clean/parse"]
+    assert all(record["error"] == "ValueError('bad month')" for record in profiler.records)
+    assert all(record["wall_s"] >= 0 and "python_peak_mb" in record for record in profiler.records)
+    assert not tracemalloc.is_tracing()
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file)["stages"][0]["error"] == "ValueError('bad month')"
+    assert "<- failed" in profiler.summary()
+
+
+def test_measure_stage_stops_only_the_tracing_it_started():
+    tracemalloc.start()
+    try:
+        with measure_stage("inner", trace_python=True) as record:
+            data = [0] * 100_000
+        assert tracemalloc.is_tracing() and record["python_peak_mb"] > 0
+    finally:
+        tracemalloc.stop()
+    del data
+
+    with pytest.raises(KeyError):
+        with measure_stage("outer", trace_python=True):
+            raise KeyError("column")
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_steps_only_record_under_an_active_profiler():
+    with profile_step("idle") as record:
+        record["rows_out"] = 1
+
+    profiler = PipelineProfiler("test")
+    with profiler.activate():
+        with profile_step("read_csv", rows_in=5) as record:
+            record["rows_out"] = 5
+    assert [record["stage"] for record in profiler.records] == ["read_csv"]
+
+
+def test_worker_steps_are_summed_under_their_stage():
+    step_lists = []
+    for rows in (10, 20):
+        with worker_profile(True) as steps:
+            for _ in range(2):
+                with profile_step("read_csv", rows) as step:
+                    step["rows_out"] = rows
+        step_lists.append(steps)
+    with worker_profile(False) as steps:
+        assert steps == []
+
+    profiler = PipelineProfiler("test")
+    with profiler.stage("update_trip_cache"):
+        pass
+    with profiler.stage("render"):
+        pass
+    profiler.add_worker_steps("update_trip_cache", step_lists)
+
+    assert [record["stage"] for record in profiler.records] == [
+        "update_trip_cache", "update_trip_cache/read_csv", "render"]
+    summed = profiler.records[1]
+    assert summed["tasks"] == 4 and summed["rows_in"] == summed["rows_out"] == 60 and summed["worker"]
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from station_remap import StationRemapTable, load_remap_table
+
+
+def trips(rows):
+    """Trips from (start ID, start name, end ID, end name) tuples."""
+    return pd.DataFrame(rows, columns=["start_station_id", "start_station_name", "end_station_id", "end_station_name"])
+
+
+def test_id_rule_runs_before_renames_on_the_recorded_name():
+    dataframe = trips([
+        ("A32046", "Tremont St at Court St", "A32046", "Tremont St at Court St"),
+        # The dotted spelling is only renamed, as in the original cleaning script
+        ("A32046", "Tremont St. at Court St.", "A32001", "Tremont St. at Court St."),
+        ("A32001", "Tremont St at Court St", "A32046", "Canal St\xa0at\xa0Causeway\xa0St"),
+    ])
+    cleaned, counts = load_remap_table().apply(dataframe)
+
+    assert cleaned["start_station_name"].astype(str).tolist() == [
+        "Canal St at Causeway St", "Tremont St at Court St", "Tremont St at Court St"]
+    assert cleaned["end_station_name"].astype(str).tolist() == [
+        "Canal St at Causeway St", "Tremont St at Court St", "Canal St at Causeway St"]
+    assert counts["renamed_at_id"] == 2
+    assert counts["names_remapped"] == 3
+
+
+def test_nbsp_is_normalized_in_every_name_and_dropped_ids_are_removed():
+    dataframe = trips([
+        ("A32010", "Main St\xa0at Pearl St", "A32011", "Damrell st at Old Colony Ave"),
+        ("S32020", "Ghost", "A32011", "Main St at Pearl St"),
+    ])
+    cleaned, counts = load_remap_table().apply(dataframe)
+
+    assert len(cleaned) == 1
+    assert counts["dropped_station_trips"] == 1
+    assert cleaned["start_station_name"].astype(str).tolist() == ["Main St at Pearl St"]
+    assert cleaned["end_station_name"].astype(str).tolist() == ["Damrell St at Old Colony Ave"]
+
+
+def test_renames_follow_chains_and_rule_targets_are_renamed():
+    table = StationRemapTable(renames={"A": "B", "B": "C"}, renames_at_id={("X1", "Old"): "A"})
+    cleaned, counts = table.apply(trips([("X1", "Old", "X2", "A"), ("X2", "Old", "X1", "B")]))
+
+    assert cleaned["start_station_name"].astype(str).tolist() == ["C", "Old"]
+    assert cleaned["end_station_name"].astype(str).tolist() == ["C", "C"]
+    assert counts["renamed_at_id"] == 1
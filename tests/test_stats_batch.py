@@ -0,0 +1,57 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats_batch import STATISTICS, main, parse_precision, profile_column
+from stats_profile import ColumnProfile
+
+
+@pytest.fixture
+def data_files(tmp_path):
+    rng = np.random.default_rng(12)
+    first = str(tmp_path / "first.csv")
+    pd.DataFrame({"height": rng.normal(170, 10, 500), "name": [f"n{index}" for index in range(500)],
+                  "visits": rng.integers(0, 5, 500)}).to_csv(first, index=False)
+    second = str(tmp_path / "second.parquet")
+    pd.DataFrame({"score": rng.random(200)}).to_parquet(second, index=False)
+    return [first, second]
+
+
+def test_parse_precision():
+    assert parse_precision("exact") is None
+    assert parse_precision("auto") == "auto"
+    assert parse_precision("0.01") == 0.01
+
+
+def test_cli_profiles_every_numeric_column(data_files, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    main(data_files + ["--workers", "1"])
+
+    # The default output folder is "profiles", in the working directory
+    with open(os.path.join("profiles", "profile.json"), encoding="utf-8") as file:
+        records = json.load(file)
+    assert [(os.path.basename(record["file"]), record["column"]) for record in records] == [
+        ("first.csv", "height"), ("first.csv", "visits"), ("second.parquet", "score")]
+    assert "Profiled 3 columns of 2 files into profiles" in capsys.readouterr().out
+
+    table = pd.read_csv(os.path.join("profiles", "profile.csv"))
+    assert table.columns.tolist()[:4] == ["file", "column", "count", "approximate"]
+    assert len(table.columns) == 4 + len(STATISTICS)
+
+    # Same numbers as profiling the column directly
+    height = pd.read_csv(data_files[0])["height"]
+    profile = ColumnProfile.from_series(height)
+    assert table.loc[0, "Arithmetic Mean"] == pytest.approx(profile.mean)
+    assert table.loc[0, "Variance"] == pytest.approx(profile.variance)
+    assert not table["approximate"].any()
+
+
+def test_profile_column_with_plots_and_sketches(data_files, tmp_path):
+    record = profile_column(data_files[0], "height", precision=0.01, plot_dir=str(tmp_path / "plots"))
+    assert record["approximate"] and record["count"] == 500
+    assert os.path.getsize(record["plot"]) > 0
+    assert set(record["plot_interpretations"]) == {"Histogram", "Box Plot", "Normal Distribution"}
+    assert "sketch" in record["interpretations"]["Median"]
@@ -0,0 +1,100 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import stats_io
+from stats_io import LazyFrame, load_dataset, sidecar_path
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = str(tmp_path / "scores.csv")
+    pd.DataFrame({"score": [1.5, 2.5, None, 4.0], "count": [1, 2, 3, 4],
+                  "label": ["a", "b", "c", "d"]}).to_csv(path, index=False)
+    return path
+
+
+def test_sidecar_is_written_once_and_reused(csv_file, monkeypatch):
+    frame = load_dataset(csv_file)
+    assert os.path.exists(sidecar_path(csv_file))
+    assert len(frame) == 4 and frame.columns.tolist() == ["score", "count", "label"]
+    assert frame.numeric_columns == ["score", "count"]
+
+    # The unchanged file is not parsed again
+    def no_parse(*args):
+        raise AssertionError("source parsed again")
+
+    monkeypatch.setattr(stats_io, "_read_source", no_parse)
+    again = load_dataset(csv_file)
+    assert again["count"].tolist() == [1, 2, 3, 4]
+    assert again["label"].tolist() == ["a", "b", "c", "d"]
+    assert again.source_path == csv_file
+
+
+def test_changed_source_rewrites_the_sidecar(csv_file):
+    load_dataset(csv_file)
+    pd.DataFrame({"score": [9.0]}).to_csv(csv_file, index=False)
+    stat = os.stat(csv_file)
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+
+    frame = load_dataset(csv_file)
+    assert frame.columns.tolist() == ["score"] and frame["score"].tolist() == [9.0]
+
+
+def test_mixed_columns_are_stored_as_strings(tmp_path):
+    path = str(tmp_path / "mixed.csv")
+    with open(path, "w") as file:
+        file.write("code,value\n" + "".join(f"{index},{index}\n" for index in range(5)) + "x7,5\n")
+
+    frame = load_dataset(path)
+    assert frame["code"].tolist() == ["0", "1", "2", "3", "4", "x7"]
+    assert frame.numeric_columns == ["value"]
+
+
+def test_unwritable_folder_uses_the_fallback_cache_dir(csv_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(stats_io, "FALLBACK_CACHE_DIR", str(tmp_path / "fallback"))
+    monkeypatch.setattr(stats_io.os, "access", lambda path, mode: False)
+    path = sidecar_path(csv_file)
+    assert os.path.dirname(path) == str(tmp_path / "fallback")
+    assert load_dataset(csv_file)["count"].tolist() == [1, 2, 3, 4]
+    assert os.path.exists(path)
+
+
+def test_parquet_columns_are_read_lazily(tmp_path):
+    path = str(tmp_path / "values.parquet")
+    pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}).to_parquet(path, index=False)
+
+    frame = load_dataset(path)
+    assert not os.path.exists(sidecar_path(path))
+    assert frame.columns.tolist() == ["a", "b"] and frame.numeric_columns == ["a"]
+    assert frame.to_pandas()["b"].tolist() == ["x", "y", "z"]
+    with pytest.raises(KeyError):
+        frame["missing"]
+
+
+def test_concurrent_reads_share_one_series():
+    barrier = threading.Barrier(8)
+    reads = []
+
+    def read_column(column):
+        reads.append(column)
+        return pd.Series(range(1000), name=column)
+
+    frame = LazyFrame(["value"], 1000, read_column, "memory")
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(frame["value"])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8 and all(series is results[0] for series in results)
+    assert frame["value"] is results[0]
+    assert 1 <= len(reads) <= 8
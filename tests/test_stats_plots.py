@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from stats_plots import DistributionSummary, histogram_bin_count
+from stats_profile import ColumnProfile
+
+
+def summarize(values):
+    data = pd.Series(values)
+    return DistributionSummary.from_data(data, ColumnProfile.from_series(data))
+
+
+@pytest.fixture(scope="module")
+def bimodal():
+    rng = np.random.default_rng(11)
+    return np.concatenate([rng.normal(0, 1, 15_000), rng.normal(6, 0.5, 5_000)])
+
+
+def test_fft_kde_matches_scipy_gaussian_kde(bimodal):
+    summary = summarize(bimodal)
+    x, density = summary.kde()
+
+    expected = stats.gaussian_kde(bimodal)(x)
+    assert np.abs(density - expected).max() <= 0.005 * expected.max()
+    assert density.sum() * summary.grid_width == pytest.approx(1, abs=1e-3)
+    # The grid reaches three bandwidths past the data
+    assert x[0] < bimodal.min() - 2.9 * summary.bandwidth and x[-1] > bimodal.max() + 2.9 * summary.bandwidth
+
+
+def test_histogram_matches_numpy_on_its_edges(bimodal):
+    summary = summarize(bimodal)
+    edges, counts = summary.histogram()
+
+    assert len(counts) == summary.bin_count and counts.sum() == len(bimodal)
+    np.testing.assert_array_equal(counts, np.histogram(bimodal, bins=edges)[0])
+    assert edges[0] == bimodal.min() and edges[-1] == bimodal.max()
+
+
+def test_quantiles_are_within_one_grid_bin(bimodal):
+    summary = summarize(bimodal)
+    # 0.75 falls in the gap between the two modes, where sample quantile definitions differ
+    probabilities = np.array([0.01, 0.25, 0.5, 0.9, 0.99])
+    np.testing.assert_allclose(summary.quantiles(probabilities), np.quantile(bimodal, probabilities),
+                               atol=summary.grid_width)
+
+    theoretical, sample = summary.qq_points(50)
+    assert len(theoretical) == len(sample) == 50 and (np.diff(sample) >= 0).all()
+
+
+@pytest.mark.parametrize("std, count, data_range, bins", [
+    (1.0, 100, 4.0, 8), (1.0, 1_000_000, 10.0, 256), (1.0, 10 ** 9, 1000.0, 512), (0.0, 10, 0.0, 8)])
+def test_histogram_bin_count_is_a_clipped_power_of_two(std, count, data_range, bins):
+    assert histogram_bin_count(std, count, data_range) == bins
+
+
+def test_constant_column_has_no_kde():
+    summary = summarize(np.full(100, 3.0))
+    assert summary.kde() is None
+    edges, counts = summary.histogram()
+    assert counts.sum() == 100 and edges[0] < 3.0 < edges[-1]
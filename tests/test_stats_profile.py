@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from stats_profile import GROUPED_STATISTICS, ColumnProfile, ProfileCache, grouped_statistics
+
+
+def expected_statistics(x, w):
+    """The statistics of one column from numpy and scipy."""
+    return {
+        "Count": len(x),
+        "Arithmetic Mean": np.mean(x),
+        "Weighted Mean": np.average(x, weights=w),
+        "Geometric Mean": stats.gmean(x),
+        "Harmonic Mean": stats.hmean(x),
+        "Median": np.median(x),
+        "Mode": stats.mode(x, keepdims=False).mode,
+        "Range": np.ptp(x),
+        "Variance": np.var(x, ddof=1),
+        "Standard Deviation": np.std(x, ddof=1),
+        "Skewness": stats.skew(x),
+        "Kurtosis": stats.kurtosis(x),
+        "Distinct Values": len(np.unique(x)),
+    }
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(0)
+    size = 3000
+    return pd.DataFrame({"x": rng.integers(1, 60, size).astype(np.float64),
+                         "w": rng.random(size),
+                         "group": rng.choice(["a", "b", "c"], size)})
+
+
+def test_column_profile_matches_numpy_and_scipy(frame):
+    profile = ColumnProfile.from_series(frame["x"], weights=frame["w"])
+    expected = expected_statistics(frame["x"].to_numpy(), frame["w"].to_numpy())
+
+    actual = {"Count": profile.count, "Arithmetic Mean": profile.mean, "Weighted Mean": profile.weighted_mean,
+              "Geometric Mean": profile.geometric_mean, "Harmonic Mean": profile.harmonic_mean,
+              "Median": profile.median, "Mode": profile.mode, "Range": profile.range,
+              "Variance": profile.variance, "Standard Deviation": profile.std, "Skewness": profile.skewness,
+              "Kurtosis": profile.kurtosis, "Distinct Values": profile.distinct}
+    for name, value in expected.items():
+        assert actual[name] == pytest.approx(value, rel=1e-9), name
+
+
+def test_grouped_statistics_match_numpy_and_scipy(frame):
+    table = grouped_statistics(frame["x"], frame["group"], frame["w"])
+    assert list(table.columns) == GROUPED_STATISTICS
+    assert list(table.index) == ["a", "b", "c"]
+
+    for group, rows in frame.groupby("group"):
+        expected = expected_statistics(rows["x"].to_numpy(), rows["w"].to_numpy())
+        for name, value in expected.items():
+            assert table.loc[group, name] == pytest.approx(value, rel=1e-9), (group, name)
+
+
+def test_grouped_statistics_nan_for_negative_values():
+    table = grouped_statistics(pd.Series([-1.0, 2.0, 3.0, 4.0]), pd.Series(["a", "a", "b", "b"]))
+    assert np.isnan(table.loc["a", "Harmonic Mean"]) and np.isnan(table.loc["a", "Geometric Mean"])
+    assert table.loc["b", "Harmonic Mean"] == pytest.approx(stats.hmean([3.0, 4.0]))
+
+
+def test_mode_takes_the_smallest_tied_value():
+    assert ColumnProfile.from_series(pd.Series([3, 1, 3, 1, 2])).mode == 1
+    assert ColumnProfile.from_series(pd.Series(["b", "a", "b", "a"])).mode == "a"
+
+
+def test_mode_of_mixed_types_does_not_compare_them():
+    profile = ColumnProfile.from_series(pd.Series(["a", 1, "a", 1, 2], dtype=object))
+    assert profile.mode in ("a", 1)
+    assert profile.distinct == 3 and not profile.numeric
+
+
+def test_empty_column():
+    profile = ColumnProfile.from_series(pd.Series([], dtype=np.float64))
+    assert profile.count == 0 and profile.mode is None
+    with pytest.raises(ValueError):
+        profile.variance
+
+
+def test_profile_cache_computes_each_profile_once():
+    cache = ProfileCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return pd.Series([1.0, 2.0])
+
+    first = cache.get(1, "x", load)
+    assert cache.get(1, "x", load) is first
+    assert cache.get(2, "x", load) is not first
+    assert len(loads) == 2
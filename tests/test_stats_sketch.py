@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats_core import compute_statistic
+from stats_profile import ColumnProfile
+from stats_sketch import CountMinSketch, HyperLogLog, KLLSketch, sketch_column
+
+
+@pytest.mark.parametrize("rank_error", [0.01, 0.05])
+def test_kll_quantile_rank_error_is_within_the_bound(rank_error):
+    values = np.random.default_rng(3).lognormal(size=200_000)
+    sketch = KLLSketch(rank_error, seed=0)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+
+    ordered = np.sort(values)
+    levels = np.linspace(0.01, 0.99, 99)
+    estimates = sketch.quantile(levels)
+    ranks = np.searchsorted(ordered, estimates, side="right") / len(values)
+    assert np.abs(ranks - levels).max() <= rank_error
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+
+def test_kll_merge_keeps_the_bound():
+    rng = np.random.default_rng(4)
+    parts = [rng.normal(loc, size=50_000) for loc in (0, 5, 10)]
+    merged = KLLSketch(0.01, seed=0)
+    for part in parts:
+        sketch = KLLSketch(0.01, seed=1)
+        sketch.update(part)
+        merged.merge(sketch)
+
+    values = np.sort(np.concatenate(parts))
+    rank = np.searchsorted(values, merged.quantile(0.5), side="right") / len(values)
+    assert merged.count == len(values) and abs(rank - 0.5) <= 0.01
+
+
+def test_count_min_overcounts_by_at_most_the_bound():
+    values = np.random.default_rng(5).zipf(1.5, size=100_000) % 5000
+    sketch = CountMinSketch(error=0.001)
+    sketch.update(values)
+
+    counts = pd.Series(values).value_counts()
+    estimates = sketch.estimate(counts.index)
+    assert (estimates >= counts.to_numpy()).all()
+    assert (estimates - counts.to_numpy()).max() <= sketch.error * sketch.total
+    assert sketch.mode() == counts.index[0]
+
+
+def test_count_min_mode_takes_the_smallest_value_within_the_bound():
+    values = np.concatenate([np.full(1000, 7), np.full(1000, 3), np.full(999, 5), np.arange(100, 2100)])
+    sketch = CountMinSketch(error=0.01)
+    sketch.update(np.random.default_rng(6).permutation(values))
+    assert sketch.mode() == 3
+
+
+def test_count_min_has_no_mode_on_continuous_values():
+    sketch = CountMinSketch(error=0.001)
+    sketch.update(np.random.default_rng(7).random(50_000))
+    assert sketch.mode() is None
+
+    profile = ColumnProfile.from_series(pd.Series(np.random.default_rng(7).random(50_000)), sketch_error=0.01)
+    result, interpretation = compute_statistic(profile, "Central Tendency", "Mode")
+    assert profile.mode is None and result == "not available from the sketch" and "sketch" in interpretation
+
+
+@pytest.mark.parametrize("distinct", [500, 20_000, 200_000])
+def test_hyperloglog_count_is_within_three_standard_errors(distinct):
+    values = np.random.default_rng(8).permutation(np.tile(np.arange(distinct), 2))
+    sketch = HyperLogLog(0.01)
+    sketch.update(values)
+    assert abs(sketch.count() - distinct) <= 3 * sketch.relative_error * distinct
+
+
+def test_sketched_profile_matches_exact_within_the_bounds():
+    data = pd.Series(np.random.default_rng(9).integers(0, 1000, size=300_000))
+    exact = ColumnProfile.from_series(data)
+    sketched = ColumnProfile.from_series(data, sketch_error=0.01)
+
+    assert sketched.approximate and not exact.approximate
+    assert sketched.mean == exact.mean and sketched.m2 == exact.m2
+    rank = (data <= sketched.median).mean()
+    assert abs(rank - 0.5) <= 0.01
+    assert abs(sketched.distinct - exact.distinct) <= 0.03 * exact.distinct
+
+
+def test_text_columns_are_sketched_in_chunks():
+    values = np.random.default_rng(10).integers(0, 50, size=30_000).astype(str)
+    whole = sketch_column(values, 0.01, numeric=False, chunk_size=7_000)
+    assert whole.quantiles is None
+    assert whole.frequencies.total == len(values)
+    assert abs(whole.distinct.count() - 50) <= 3 * whole.distinct.relative_error * 50
+    assert whole.frequencies.estimate(["7"])[0] >= (values == "7").sum()
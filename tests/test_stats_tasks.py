@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import stats_io
+from stats_io import load_dataset, sidecar_path
+from stats_tasks import TaskCancelled, TaskRunner
+
+
+class FakeRoot:
+    """The parts of tk.Tk the runner uses, with after callbacks run by hand."""
+
+    def __init__(self):
+        self.pending = {}
+        self.errors = []
+        self._next_id = 0
+
+    def after(self, delay, callback):
+        self._next_id += 1
+        self.pending[self._next_id] = callback
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def report_callback_exception(self, exc_type, error, traceback):
+        self.errors.append(error)
+
+    def run_pending(self):
+        callbacks, self.pending = list(self.pending.values()), {}
+        for callback in callbacks:
+            callback()
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+
+def poll_until(root, condition, timeout=5.0):
+    """Run the runner's polling until the condition holds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        root.run_pending()
+        time.sleep(0.01)
+
+
+def test_results_errors_and_progress_reach_the_callbacks(root):
+    progress = []
+    runner = TaskRunner(root, on_progress=lambda task, fraction, message: progress.append((task.id, fraction, message)))
+    results, errors = [], []
+
+    def work(task, value):
+        task.report_progress(0.5, "halfway")
+        return value * 2
+
+    def fail(task):
+        raise ValueError("bad column")
+
+    done = runner.submit(work, 21, on_done=results.append)
+    runner.submit(fail, on_error=errors.append)
+    poll_until(root, lambda: not runner.running)
+
+    assert results == [42]
+    assert [str(error) for error in errors] == ["bad column"]
+    assert (done.id, 0.5, "halfway") in progress and (done.id, 1.0, None) in progress
+    assert root.errors == []
+    runner.shutdown()
+
+
+def test_polling_survives_failing_callbacks(root):
+    runner = TaskRunner(root, on_progress=lambda *args: 1 / 0)
+    errors, results = [], []
+
+    def broken_done(result):
+        raise RuntimeError("plot failed")
+
+    runner.submit(lambda task: 1, on_done=broken_done, on_error=errors.append)
+    poll_until(root, lambda: not runner.running)
+
+    # The failing completion callback went to on_error, the failing progress callback to the root
+    assert [str(error) for error in errors] == ["plot failed"]
+    assert root.errors and all(isinstance(error, ZeroDivisionError) for error in root.errors)
+    assert root.pending
+
+    # A task without on_error has its exception reported to the root, and later tasks still complete
+    runner.submit(lambda task: 1 / 0)
+    runner.submit(lambda task: "next", on_done=results.append)
+    poll_until(root, lambda: results == ["next"])
+    runner.shutdown()
+    assert not root.pending
+
+
+def test_cancel_stops_cooperative_tasks_only(root):
+    runner = TaskRunner(root, max_workers=2)
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def cooperative(task):
+        started.set()
+        while not release.wait(0.01):
+            task.check_cancelled()
+        return "finished"
+
+    def blocking(task):
+        release.wait(5)
+        return "loaded"
+
+    runner.submit(cooperative, on_done=results.append)
+    uncancellable = runner.submit(blocking, on_done=results.append, cancellable=False)
+    started.wait(5)
+    runner.cancel_all()
+    assert not uncancellable.cancelled
+
+    poll_until(root, lambda: len(runner.running) == 1)
+    release.set()
+    poll_until(root, lambda: not runner.running)
+    assert results == ["loaded"]
+    runner.shutdown()
+
+
+def test_csv_load_can_be_stopped_between_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(stats_io, "CSV_CHUNK_ROWS", 10)
+    path = str(tmp_path / "values.csv")
+    pd.DataFrame({"value": range(100)}).to_csv(path, index=False)
+
+    messages = []
+
+    def progress(message):
+        messages.append(message)
+        if message.startswith("Parsed 30 "):
+            raise TaskCancelled()
+
+    with pytest.raises(TaskCancelled):
+        load_dataset(path, progress=progress)
+    assert messages[-1] == "Parsed 30 rows"
+    assert not os.path.exists(sidecar_path(path))
+
+    frame = load_dataset(path, progress=messages.append)
+    assert frame["value"].tolist() == list(range(100))
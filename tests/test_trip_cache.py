@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import trip_cache
+from trip_cache import (MANIFEST_NAME, TRIPS_DIR_NAME, cached_partition_paths, clean_source_file, load_cached_trips,
+                        read_manifest, update_trip_cache)
+from trip_cleaning import clean_trip_data
+from trip_ingest import find_trip_files, read_trip_file
+
+
+@pytest.fixture
+def folders(tmp_path, synthetic_folder):
+    source = tmp_path / "source"
+    shutil.copytree(synthetic_folder, source)
+    return str(source), str(tmp_path / "cache")
+
+
+def test_first_update_cleans_every_file_and_loads_like_clean_trip_data(folders):
+    source, cache = folders
+    report = update_trip_cache(source, cache, max_workers=1)
+    names = [os.path.basename(path) for path in find_trip_files(source)]
+    assert sorted(report["rebuilt"]) == names and report["unchanged"] == [] and report["removed"] == []
+
+    expected = pd.concat([clean_trip_data(read_trip_file(path))[0] for path in find_trip_files(source)],
+                         ignore_index=True).sort_values("started_at", kind="stable", ignore_index=True)
+    loaded = load_cached_trips(cache, columns=["started_at", "trip_duration", "start_station_name"])
+    assert len(loaded) == len(expected) == sum(counts["rows_out"] for counts in report["counts"].values())
+    assert (loaded["started_at"].to_numpy() == expected["started_at"].to_numpy()).all()
+    assert sorted(loaded["trip_duration"]) == sorted(expected["trip_duration"])
+
+
+def test_chunked_rebuild_matches_whole_file_cleaning(folders):
+    source, cache = folders
+    path = find_trip_files(source)[0]
+    trips_dir = os.path.join(cache, TRIPS_DIR_NAME)
+    partitions, counts, _ = clean_source_file(path, trips_dir, chunksize=150)
+
+    expected, expected_counts = clean_trip_data(read_trip_file(path))
+    written = pd.concat([pd.read_parquet(os.path.join(trips_dir, partition)) for partition in partitions],
+                        ignore_index=True).sort_values("started_at", kind="stable", ignore_index=True)
+    assert len(written) == len(expected) == counts["rows_out"]
+    assert {key: counts[key] for key in expected_counts} == expected_counts
+    assert (written["started_at"].to_numpy() == expected["started_at"].to_numpy()).all()
+    assert written["start_station_name"].astype(str).tolist() == expected["start_station_name"].astype(str).tolist()
+    # Temporary files are moved into place
+    assert not [name for _, _, files in os.walk(trips_dir) for name in files if name.startswith(".")]
+
+
+def test_months_and_partitions(folders):
+    source, cache = folders
+    update_trip_cache(source, cache, max_workers=1)
+    february = load_cached_trips(cache, columns=["started_at"], months=["2024-02"])
+    assert len(february) and (february["started_at"].dt.month == 2).all()
+    assert all("month=02" in path for path in cached_partition_paths(cache, months=[(2024, 2)]))
+
+
+def test_unchanged_touched_changed_and_removed_sources(folders):
+    source, cache = folders
+    update_trip_cache(source, cache, max_workers=1)
+    january, february, march = find_trip_files(source)
+
+    # Touched only: the hash still matches
+    stat = os.stat(january)
+    os.utime(january, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+    report = update_trip_cache(source, cache, max_workers=1)
+    assert report["rebuilt"] == [] and len(report["unchanged"]) == 3
+
+    # Changed contents: only that file is cleaned again
+    with open(february) as file:
+        lines = file.readlines()
+    with open(february, "w") as file:
+        file.writelines(lines[:-100])
+    report = update_trip_cache(source, cache, max_workers=1)
+    assert report["rebuilt"] == [os.path.basename(february)]
+
+    # Deleted source: its partitions are removed
+    partitions = read_manifest(cache)["sources"][os.path.basename(march)]["partitions"]
+    os.remove(march)
+    report = update_trip_cache(source, cache, max_workers=1)
+    assert report["removed"] == [os.path.basename(march)]
+    assert not any(os.path.exists(os.path.join(cache, TRIPS_DIR_NAME, path)) for path in partitions)
+    assert (load_cached_trips(cache, columns=["started_at"])["started_at"].dt.month != 3).all()
+
+
+def test_cache_version_change_rebuilds_everything(folders, monkeypatch):
+    source, cache = folders
+    update_trip_cache(source, cache, max_workers=1)
+    with open(os.path.join(cache, MANIFEST_NAME)) as file:
+        assert json.load(file)["version"] == trip_cache.CACHE_VERSION
+
+    monkeypatch.setattr(trip_cache, "CACHE_VERSION", trip_cache.CACHE_VERSION + 1)
+    assert len(update_trip_cache(source, cache, max_workers=1)["rebuilt"]) == 3
+
+
+def test_empty_cache_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_cached_trips(str(tmp_path))
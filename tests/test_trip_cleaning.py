@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from trip_cleaning import (MAX_TRIP_SECONDS, MIN_TRIP_SECONDS, add_trip_duration, station_pairs,
+                           validate_station_mappings)
+
+
+def trips(rows):
+    """Trips from (start ID, start name, end ID, end name) tuples."""
+    return pd.DataFrame(rows, columns=["start_station_id", "start_station_name", "end_station_id", "end_station_name"])
+
+
+def test_station_pairs_lists_each_pair_once_with_its_side():
+    pairs = station_pairs(trips([
+        ("A1", "First", "B1", "Second"),
+        ("A1", "First", "A1", "First"),
+        ("C1", "Third", "B1", "Second"),
+        (None, "Missing", "B1", "Second"),
+    ]))
+    assert list(pairs.itertuples(index=False, name=None)) == [
+        ("A1", "First", "both"), ("B1", "Second", "end"), ("C1", "Third", "start")]
+
+
+def test_conflicts_are_reported_across_start_and_end_stations(capsys):
+    report = validate_station_mappings(trips([
+        ("A1", "First", "B1", "Second"),
+        # The same name under a second ID, only at the end of a trip
+        ("B1", "Second", "A2", "First"),
+        # A second name for B1, only at the start of a trip
+        ("B1", "Second Street", "A1", "First"),
+    ]), verbose=False)
+
+    name_to_ids = report["name_to_ids"]
+    assert name_to_ids["station_name"].tolist() == ["First"]
+    assert name_to_ids["station_ids"].tolist() == [["A1", "A2"]]
+    assert name_to_ids["instances"].tolist() == [2]
+
+    id_to_names = report["id_to_names"]
+    assert id_to_names["station_id"].tolist() == ["B1"]
+    assert id_to_names["station_names"].tolist() == [["Second", "Second Street"]]
+    assert id_to_names["instances"].tolist() == [2]
+    assert capsys.readouterr().out == ""
+
+
+def test_consistent_mappings_give_empty_tables_and_print_nil(capsys):
+    report = validate_station_mappings(trips([("A1", "First", "B1", "Second"), ("B1", "Second", "A1", "First")]))
+    assert report["name_to_ids"].empty and report["id_to_names"].empty
+    assert len(report["pairs"]) == 2
+    assert capsys.readouterr().out.count("nil") == 2
+
+
+def timed_trips(durations):
+    """Trips starting on the hour with the given durations in seconds."""
+    started_at = pd.Timestamp("2024-03-01") + pd.to_timedelta(np.arange(len(durations)), unit="h")
+    return pd.DataFrame({"ride_id": [f"r{index}" for index in range(len(durations))], "started_at": started_at,
+                         "ended_at": started_at + pd.to_timedelta(durations, unit="s")})
+
+
+def test_add_trip_duration_filters_and_keeps_order():
+    durations = [600, -5, 30, MAX_TRIP_SECONDS + 1, MIN_TRIP_SECONDS, MAX_TRIP_SECONDS, 0]
+    dataframe, counts = add_trip_duration(timed_trips(durations))
+
+    assert counts == {"negative_duration": 1, "short_duration": 2, "long_duration": 1}
+    assert dataframe["ride_id"].tolist() == ["r0", "r4", "r5"]
+    assert dataframe["trip_duration"].dtype == np.int32
+    assert dataframe["trip_duration"].tolist() == [600, MIN_TRIP_SECONDS, MAX_TRIP_SECONDS]
+
+
+def test_add_trip_duration_bounds_can_be_disabled():
+    dataframe, counts = add_trip_duration(timed_trips([-5, 0, 30, 2 * MAX_TRIP_SECONDS]), None, None)
+    assert dataframe["ride_id"].tolist() == ["r1", "r2", "r3"]
+    assert counts == {"negative_duration": 1, "short_duration": 0, "long_duration": 0}
+
+
+def test_sub_second_durations_are_truncated_to_whole_seconds():
+    dataframe = timed_trips([0])
+    dataframe["ended_at"] = dataframe["started_at"] + pd.Timedelta(seconds=90.7)
+    assert add_trip_duration(dataframe)[0]["trip_duration"].tolist() == [90]
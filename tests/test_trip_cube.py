@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from trip_cleaning import clean_trip_data
+from trip_cube import CUBE_FILE_NAME, TripCube
+from trip_ingest import find_trip_files, read_trip_file
+from trip_schema import DAYS_ORDER
+
+
+@pytest.fixture(scope="module")
+def cleaned_months(synthetic_folder):
+    return [clean_trip_data(read_trip_file(path))[0] for path in find_trip_files(synthetic_folder)]
+
+
+@pytest.fixture(scope="module")
+def cleaned(cleaned_months):
+    return pd.concat(cleaned_months, ignore_index=True)
+
+
+def test_tables_match_groupbys_over_the_trips(cleaned):
+    cube = TripCube.from_trips(cleaned)
+    started_at = cleaned["started_at"].dt
+    assert cube.counts["trips"].sum() == len(cleaned)
+
+    hourly = cleaned.groupby(started_at.hour).size().reindex(range(24), fill_value=0)
+    assert cube.hourly_trip_starts()["Total Start Trips"].tolist() == hourly.tolist()
+
+    weekly = pd.crosstab(started_at.dayofweek, started_at.hour).reindex(index=range(7), columns=range(24),
+                                                                         fill_value=0)
+    weekly.index = pd.Index(DAYS_ORDER, name="start_day_of_week")
+    assert (cube.hourly_weekly_trip_starts().to_numpy() == weekly.to_numpy()).all()
+    assert cube.hourly_weekly_trip_starts().index.tolist() == DAYS_ORDER
+
+    by_rider = pd.crosstab(started_at.hour, cleaned["rider_type"].astype(object)).reindex(range(24), fill_value=0)
+    table = cube.hourly_trip_starts_by("rider_type")
+    assert (table[by_rider.columns].to_numpy() == by_rider.to_numpy()).all()
+
+    riders = pd.crosstab(cleaned["rider_type"].astype(object), cleaned["bike_type"].astype(object))
+    assert (cube.rider_type_analysis().loc[riders.index, riders.columns].to_numpy() == riders.to_numpy()).all()
+
+    stations = cleaned["start_station_name"].astype(object).value_counts()
+    assert cube.station_trip_starts().to_dict() == stations.to_dict()
+
+
+def test_cube_cells_carry_date_and_weekday(cleaned):
+    cube = TripCube.from_trips(cleaned)
+    dates = pd.to_datetime(cube.counts["date"])
+    assert (dates.dt.dayofweek.to_numpy() == cube.counts["weekday"].to_numpy()).all()
+    assert dates.min() == cleaned["started_at"].min().normalize()
+
+
+def test_merged_month_cubes_equal_the_full_cube_and_survive_save(tmp_path, cleaned_months, cleaned):
+    cube = TripCube.from_trips(cleaned_months[0])
+    for month in cleaned_months[1:]:
+        cube = cube.merge(TripCube.from_trips(month))
+    full = TripCube.from_trips(cleaned)
+
+    assert cube.total(["date", "hour"]).to_dict() == full.total(["date", "hour"]).to_dict()
+    pd.testing.assert_frame_equal(cube.rider_type_analysis(), full.rider_type_analysis())
+
+    path = str(tmp_path / CUBE_FILE_NAME)
+    cube.save(path)
+    loaded = TripCube.load(path)
+    pd.testing.assert_frame_equal(loaded.hourly_weekly_trip_starts(), cube.hourly_weekly_trip_starts())
+    assert loaded.station_trip_starts().to_dict() == cube.station_trip_starts().to_dict()
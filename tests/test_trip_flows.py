@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trip_flows import FlowMatrix
+
+
+@pytest.fixture(scope="module")
+def trips(random_trips):
+    return random_trips(5000, stations=30, days=7, zipf=1.6)
+
+
+@pytest.fixture(scope="module")
+def flows(trips):
+    return FlowMatrix.from_trips(trips)
+
+
+def route_counts(trips):
+    return trips.groupby(["start_station_name", "end_station_name"]).size()
+
+
+def test_top_routes_match_groupby(trips, flows):
+    expected = route_counts(trips).sort_values(ascending=False, kind="stable")
+    top = flows.top_routes(10)
+    assert top["trips"].tolist() == expected.head(10).tolist()
+    for row in top.itertuples():
+        assert expected[(row.origin, row.destination)] == row.trips
+
+
+def test_top_routes_by_hour_and_rider_type(trips, flows):
+    selected = trips[trips["started_at"].dt.hour.isin([7, 8]) & (trips["rider_type"] == "casual")]
+    top = flows.top_routes(5, include_round_trips=False, hours=[7, 8], rider_types="casual")
+    expected = route_counts(selected)
+    expected = expected[[origin != destination for origin, destination in expected.index]]
+    assert top["trips"].tolist() == expected.sort_values(ascending=False).head(5).tolist()
+    assert (top["origin"] != top["destination"]).all()
+
+
+def test_degrees_and_top_stations_match_groupby(trips, flows):
+    degrees = flows.degrees()
+    departures = trips["start_station_name"].value_counts()
+    arrivals = trips["end_station_name"].value_counts()
+    assert (degrees["departures"] == departures.reindex(degrees.index, fill_value=0)).all()
+    assert (degrees["arrivals"] == arrivals.reindex(degrees.index, fill_value=0)).all()
+    out_degree = trips.groupby("start_station_name")["end_station_name"].nunique()
+    assert (degrees["out_degree"] == out_degree.reindex(degrees.index, fill_value=0)).all()
+    assert flows.top_stations(3).tolist() == departures.head(3).tolist()
+
+
+def test_flow_share_matches_dense_counts(trips, flows):
+    dense = flows.matrix().toarray()
+    share = flows.flow_share()
+    assert share["trips"] == len(trips)
+    assert share["symmetric"] == np.minimum(dense, dense.T).sum()
+    assert share["round_trips"] == (trips["start_station_name"] == trips["end_station_name"]).sum()
+
+
+def test_merge_and_save_load(tmp_path, trips, flows):
+    halves = [FlowMatrix.from_trips(part) for part in (trips.iloc[:2000], trips.iloc[2000:])]
+    merged = halves[0].merge(halves[1])
+    pd.testing.assert_frame_equal(merged.degrees(), flows.degrees())
+
+    path = str(tmp_path / "flows.npz")
+    flows.save(path)
+    loaded = FlowMatrix.load(path)
+    pd.testing.assert_frame_equal(loaded.top_routes(10), flows.top_routes(10))
+
+
+def test_hours_outside_the_day_raise(flows):
+    assert flows.matrix(hours=[0, 23]).sum() > 0
+    for hours in (24, [3, -1], [25]):
+        with pytest.raises(ValueError, match="between 0 and 23"):
+            flows.matrix(hours=hours)
+    with pytest.raises(ValueError):
+        FlowMatrix.from_trips(pd.DataFrame({"start_station_name": ["a"], "end_station_name": ["b"]}),
+                              by=()).matrix(hours=3)
+
+
+def test_k_zero_is_empty_and_negative_k_raises(flows):
+    assert flows.top_routes(0).empty
+    assert list(flows.top_routes(0).columns) == ["origin", "destination", "trips"]
+    assert flows.top_stations(0).empty
+    with pytest.raises(ValueError):
+        flows.top_routes(-1)
+    with pytest.raises(ValueError):
+        flows.top_stations(-1)
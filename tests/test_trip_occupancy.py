@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trip_occupancy import StationOccupancy
+
+
+@pytest.fixture(scope="module")
+def trips(random_trips):
+    return random_trips(4000, stations=25, days=5)
+
+
+@pytest.fixture(scope="module")
+def occupancy(trips):
+    return StationOccupancy.from_trips(trips, bucket_minutes=15)
+
+
+def net_flow(trips):
+    arrivals = trips["end_station_name"].value_counts()
+    departures = trips["start_station_name"].value_counts()
+    return arrivals.sub(departures, fill_value=0).astype(np.int64)
+
+
+def test_counts_match_groupby(trips, occupancy):
+    assert occupancy.departures.sum() == occupancy.arrivals.sum() == len(trips)
+    series = occupancy.station_series("Station 03")
+    buckets = trips.loc[trips["start_station_name"] == "Station 03", "started_at"].dt.floor("15min")
+    expected = buckets.value_counts()
+    assert (series["departures"].loc[expected.index] == expected).all()
+    assert series["departures"].sum() == len(buckets)
+    assert (series["cumulative_net_flow"] == series["net_flow"].cumsum()).all()
+
+
+def test_worst_imbalance_matches_groupby(trips, occupancy):
+    worst = occupancy.worst_imbalance(5)
+    expected = net_flow(trips)
+    assert worst["net_flow"].abs().tolist() == expected.abs().sort_values(ascending=False).head(5).tolist()
+    for station, row in worst.iterrows():
+        assert row["net_flow"] == expected[station]
+        assert row["max_deficit"] <= min(row["net_flow"], 0) and row["max_surplus"] >= max(row["net_flow"], 0)
+
+
+def test_worst_imbalance_per_day_matches_groupby(trips, occupancy):
+    per_day = occupancy.worst_imbalance_per_period(k=2)
+    day = pd.Timestamp("2024-03-02")
+    on_day = trips[(trips["started_at"].dt.floor("D") == day) | (trips["ended_at"].dt.floor("D") == day)]
+    arrivals = on_day.loc[on_day["ended_at"].dt.floor("D") == day, "end_station_name"].value_counts()
+    departures = on_day.loc[on_day["started_at"].dt.floor("D") == day, "start_station_name"].value_counts()
+    expected = arrivals.sub(departures, fill_value=0)
+    rows = per_day[per_day["period_start"] == day]
+    assert rows["rank"].tolist() == [1, 2]
+    assert rows["net_flow"].abs().tolist() == expected.abs().sort_values(ascending=False).head(2).tolist()
+
+
+def test_append_matches_a_single_pass(tmp_path, trips, occupancy):
+    grown = StationOccupancy.from_trips(trips.iloc[2000:], bucket_minutes=15)
+    grown.append(trips.iloc[:2000])
+    pd.testing.assert_frame_equal(grown.worst_imbalance(25), occupancy.worst_imbalance(25))
+
+    path = str(tmp_path / "occupancy.npz")
+    occupancy.save(path)
+    loaded = StationOccupancy.load(path)
+    np.testing.assert_array_equal(loaded.cumulative_net_flow, occupancy.cumulative_net_flow)
+
+
+def test_appending_hours_in_order_grows_the_buffers_geometrically(trips, occupancy):
+    ordered = trips.sort_values("started_at", ignore_index=True)
+    hours = ordered["started_at"].dt.floor("h")
+    first = hours == hours.iloc[0]
+    grown = StationOccupancy.from_trips(ordered[first], bucket_minutes=15)
+
+    buffers = {id(grown._departures)}
+    for _, hour in ordered[~first].groupby(hours[~first]):
+        grown.append(hour)
+        buffers.add(id(grown._departures))
+
+    # About 120 hourly appends, but only a logarithmic number of reallocations
+    assert len(buffers) <= 12
+    assert grown.capacity[1] >= grown.bucket_count and grown.capacity[0] >= len(grown.stations)
+    assert grown.bucket_count == occupancy.bucket_count and grown.start == occupancy.start
+    rows = grown.stations.get_indexer(occupancy.stations)
+    np.testing.assert_array_equal(grown.departures[rows], occupancy.departures)
+    np.testing.assert_array_equal(grown.arrivals[rows], occupancy.arrivals)
+
+
+def test_appending_earlier_trips_shifts_the_counts(trips, occupancy):
+    ordered = trips.sort_values("started_at", ignore_index=True)
+    grown = StationOccupancy.from_trips(ordered.iloc[3000:], bucket_minutes=15)
+    grown.append(ordered.iloc[:3000])
+    assert grown.start == occupancy.start
+    rows = grown.stations.get_indexer(occupancy.stations)
+    np.testing.assert_array_equal(grown.cumulative_net_flow[rows], occupancy.cumulative_net_flow)
+
+
+def test_k_zero_is_empty_and_negative_k_raises(occupancy):
+    assert occupancy.worst_imbalance(0).empty
+    assert list(occupancy.worst_imbalance(0).columns) == ["departures", "arrivals", "net_flow", "max_deficit",
+                                                          "max_surplus"]
+    assert occupancy.worst_imbalance_per_period(k=0).empty
+    with pytest.raises(ValueError):
+        occupancy.worst_imbalance(-1)
+    with pytest.raises(ValueError):
+        occupancy.worst_imbalance_per_period(k=-1)
@@ -0,0 +1,76 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from trip_cleaning import clean_trip_data
+from trip_cube import TripCube
+from trip_ingest import find_trip_files, read_trip_file
+from trip_report import INDEX_FILE_NAME, REPORT_MANIFEST_NAME, render_report, table_digest
+
+
+@pytest.fixture(scope="module")
+def tables(synthetic_folder):
+    cleaned = pd.concat([clean_trip_data(read_trip_file(path))[0] for path in find_trip_files(synthetic_folder)],
+                        ignore_index=True)
+    cube = TripCube.from_trips(cleaned)
+    box_stats = [{"med": 600.0, "q1": 400.0, "q3": 900.0, "whislo": 60.0, "whishi": 1650.0, "fliers": [],
+                  "label": "classic_bike"}]
+    return {"hourly_trip_starts": cube.hourly_trip_starts(), "rider_type_analysis": cube.rider_type_analysis(),
+            "trip_duration_by_bike_type": box_stats}
+
+
+def render(tables, output_dir, **options):
+    return render_report(tables, str(output_dir), formats=["png"], max_workers=1, **options)
+
+
+def test_unchanged_figures_are_skipped(tmp_path, tables):
+    first = render(tables, tmp_path)
+    assert first["rendered"] == list(tables) and first["skipped"] == []
+    with open(tmp_path / REPORT_MANIFEST_NAME) as file:
+        manifest = json.load(file)
+    assert manifest["hourly_trip_starts"]["files"] == ["hourly_trip_starts.png"]
+    modified = os.path.getmtime(tmp_path / "hourly_trip_starts.png")
+
+    second = render(tables, tmp_path)
+    assert second["rendered"] == [] and second["skipped"] == list(tables)
+    assert os.path.getmtime(tmp_path / "hourly_trip_starts.png") == modified
+
+    # The index lists every figure, in report order, whether drawn or skipped
+    with open(second["index"], encoding="utf-8") as file:
+        page = file.read()
+    assert second["index"] == str(tmp_path / INDEX_FILE_NAME)
+    positions = [page.index(f'<section id="{name}">') for name in tables]
+    assert positions == sorted(positions)
+    assert 'src="rider_type_analysis.png"' in page
+
+
+def test_changed_input_missing_file_and_force_redraw(tmp_path, tables):
+    render(tables, tmp_path)
+
+    changed = dict(tables, hourly_trip_starts=tables["hourly_trip_starts"].assign(**{"Total Start Trips": 1}))
+    assert render(changed, tmp_path)["rendered"] == ["hourly_trip_starts"]
+
+    os.remove(tmp_path / "rider_type_analysis.png")
+    assert render(changed, tmp_path)["rendered"] == ["rider_type_analysis"]
+
+    assert render(changed, tmp_path, force=True)["rendered"] == list(tables)
+
+
+def test_digest_covers_labels_formats_and_box_stats(tables):
+    table = tables["rider_type_analysis"]
+    digest = table_digest("rider_type_analysis", table, ["png"])
+    assert digest == table_digest("rider_type_analysis", table.copy(), ["png"])
+    assert digest != table_digest("rider_type_analysis", table.rename(columns=str.upper), ["png"])
+    assert digest != table_digest("rider_type_analysis", table, ["png", "svg"])
+
+    box_stats = tables["trip_duration_by_bike_type"]
+    moved = [dict(box_stats[0], med=601.0)]
+    assert table_digest("trip_duration_by_bike_type", box_stats, ["png"]) != \
+        table_digest("trip_duration_by_bike_type", moved, ["png"])
+
+
+def test_unknown_format_raises(tmp_path, tables):
+    with pytest.raises(ValueError, match="formats"):
+        render_report(tables, str(tmp_path), formats=["jpg"])
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from trip_stats import (DurationSummary, GroupedDurationStats, bootstrap_mean_difference, mann_whitney,
+                        welch_ttest)
+
+
+def durations(seed, size, scale):
+    """Whole-second, log-normal trip durations."""
+    return np.random.default_rng(seed).lognormal(np.log(scale), 0.7, size).astype(np.int64)
+
+
+def summarize(values):
+    stats_by_group = GroupedDurationStats(["bike_type"])
+    stats_by_group.update(pd.DataFrame({"trip_duration": values, "bike_type": "classic_bike"}))
+    return stats_by_group.groups["classic_bike"]
+
+
+@pytest.fixture(scope="module")
+def groups():
+    a, b = durations(0, 4000, 700), durations(1, 3000, 760)
+    return a, b, summarize(a), summarize(b)
+
+
+def test_welch_ttest_matches_scipy(groups):
+    a, b, summary_a, summary_b = groups
+    expected = stats.ttest_ind(a, b, equal_var=False)
+    t_statistic, p_value = welch_ttest(summary_a, summary_b)
+    assert t_statistic == pytest.approx(expected.statistic, rel=1e-9)
+    assert p_value == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+@pytest.mark.parametrize("use_continuity", [True, False])
+def test_mann_whitney_matches_scipy(groups, use_continuity):
+    a, b, summary_a, summary_b = groups
+    expected = stats.mannwhitneyu(a, b, use_continuity=use_continuity, method="asymptotic")
+    u_statistic, p_value = mann_whitney(summary_a, summary_b, use_continuity=use_continuity)
+    assert u_statistic == pytest.approx(expected.statistic)
+    assert p_value == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_mann_whitney_default_matches_scipy_default(groups):
+    a, b, summary_a, summary_b = groups
+    assert mann_whitney(summary_a, summary_b)[1] == pytest.approx(stats.mannwhitneyu(a, b).pvalue, rel=1e-9)
+
+
+def test_merged_summaries_match_a_single_pass():
+    values = durations(2, 10_000, 600)
+    frame = pd.DataFrame({"trip_duration": values, "bike_type": np.where(values % 3 == 0, "electric_bike",
+                                                                         "classic_bike")})
+    single = GroupedDurationStats(["bike_type"])
+    single.update(frame)
+
+    merged = GroupedDurationStats(["bike_type"])
+    for chunk in np.array_split(np.arange(len(frame)), 7):
+        part = GroupedDurationStats(["bike_type"])
+        part.update(frame.iloc[chunk])
+        merged.merge(part)
+
+    assert sorted(merged.groups) == sorted(single.groups)
+    for key, summary in single.groups.items():
+        other = merged.groups[key]
+        group = values[frame["bike_type"].to_numpy() == key]
+        assert other.count == summary.count == len(group)
+        assert other.mean == pytest.approx(group.mean(), rel=1e-12)
+        assert other.variance == pytest.approx(group.var(ddof=1), rel=1e-9)
+        np.testing.assert_array_equal(other.histogram, summary.histogram)
+        assert other.quantile(0.5) == pytest.approx(np.median(group), abs=1)
+
+
+def test_box_stats_match_matplotlib():
+    from matplotlib.cbook import boxplot_stats
+
+    values = durations(3, 20_000, 650)
+    box = summarize(values).box_stats("classic_bike")
+    expected = boxplot_stats(values)[0]
+    for key in ("med", "q1", "q3", "whislo", "whishi"):
+        assert box[key] == pytest.approx(expected[key], abs=1), key
+    assert box["label"] == "classic_bike" and box["fliers"] == []
+
+
+def test_bootstrap_interval_covers_the_mean_difference(groups):
+    a, b, summary_a, summary_b = groups
+    low, high = bootstrap_mean_difference(summary_a, summary_b, n_resamples=400, seed=0)
+
+    # Close to the normal-approximation interval of the difference in means
+    difference = a.mean() - b.mean()
+    error = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    assert low < difference < high
+    assert (high - low) == pytest.approx(2 * 1.96 * error, rel=0.2)
+    assert bootstrap_mean_difference(summary_a, summary_b, n_resamples=400, seed=0) == (low, high)
+
+
+def test_bootstrap_only_resamples_occupied_bins():
+    sparse = DurationSummary()
+    sparse.histogram[[100, 500]] = [10, 30]
+    sparse.add_moments(40, 400.5, 0.0)
+    low, high = bootstrap_mean_difference(sparse, sparse, n_resamples=200, seed=1)
+    assert -400 < low <= 0 <= high < 400
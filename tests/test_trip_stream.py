@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from trip_ingest import find_trip_files
+from trip_stream import ParquetSink, clean_chunks, read_trip_chunks, stream_clean_trips
+from trip_synth import generate_trip_files
+
+
+def station_chunk(stations, rows):
+    """A chunk with a categorical column of the given number of categories."""
+    names = [f"Station {index:03d}" for index in range(stations)]
+    return pd.DataFrame({"station": pd.Categorical(np.resize(names, rows), categories=names),
+                         "trips": np.arange(rows, dtype=np.int64)})
+
+
+def test_parquet_sink_accepts_chunks_with_more_categories(tmp_path):
+    chunks = [station_chunk(3, 10), station_chunk(300, 1000), station_chunk(40, 5)]
+    # A chunk whose categorical column has no values at all
+    chunks.append(pd.DataFrame({"station": pd.Categorical([None, None]), "trips": np.zeros(2, dtype=np.int64)}))
+
+    path = str(tmp_path / "stations.parquet")
+    with ParquetSink(path) as sink:
+        for chunk in chunks:
+            sink.write(chunk)
+
+    written = pq.read_table(path).to_pandas()
+    expected = pd.concat([chunk.astype({"station": object}) for chunk in chunks], ignore_index=True)
+    assert len(written) == len(expected)
+    assert written["station"].isna().tolist() == expected["station"].isna().tolist()
+    assert written["station"].dropna().astype(object).tolist() == expected["station"].dropna().tolist()
+    assert pq.ParquetFile(path).num_row_groups == len(chunks)
+
+
+def test_stream_small_first_file_then_full_month(tmp_path):
+    folder = tmp_path / "trips"
+    generate_trip_files(str(folder), rows=6000, months=2, stations=300, seed=2)
+
+    # A small file sorts first, so the first chunk has far fewer station categories than the next
+    first = find_trip_files(str(folder))[0]
+    with open(first) as file:
+        lines = file.readlines()[:101]
+    with open(first, "w") as file:
+        file.writelines(lines)
+
+    path = str(tmp_path / "cleaned.parquet")
+    with ParquetSink(path) as sink:
+        counts, aggregates = stream_clean_trips(str(folder), sink, chunksize=50_000)
+
+    expected = pd.concat(clean_chunks(read_trip_chunks(find_trip_files(str(folder)), 50_000), counts.copy()),
+                         ignore_index=True)
+    written = pq.read_table(path).to_pandas()
+    assert len(written) == len(expected) == aggregates.hourly.sum()
+    for column in ["start_station_name", "end_station_name", "bike_type", "rider_type"]:
+        assert written[column].astype(str).tolist() == expected[column].astype(str).tolist(), column
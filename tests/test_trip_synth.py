@@ -0,0 +1,79 @@
+import filecmp
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trip_cleaning import clean_trip_data
+from trip_ingest import find_trip_files, read_trip_file
+from trip_synth import (DEFAULT_RATES, DROPPED_STATION_ID, MANIFEST_NAME, RAW_COLUMNS, generate_trip_files,
+                        read_generator_manifest)
+
+
+def raw_trips(folder):
+    return pd.concat([pd.read_csv(path, dtype=str) for path in find_trip_files(folder)], ignore_index=True)
+
+
+def test_same_seed_writes_the_same_files(tmp_path):
+    first, second, other = (str(tmp_path / name) for name in ("first", "second", "other"))
+    generate_trip_files(first, rows=2000, months=2, stations=50, seed=3)
+    generate_trip_files(second, rows=2000, months=2, stations=50, seed=3)
+    generate_trip_files(other, rows=2000, months=2, stations=50, seed=4)
+
+    names = sorted(os.listdir(first))
+    assert names == sorted(os.listdir(second))
+    assert all(filecmp.cmp(os.path.join(first, name), os.path.join(second, name), shallow=False) for name in names)
+    csv_name = [name for name in names if name.endswith(".csv")][0]
+    assert not filecmp.cmp(os.path.join(first, csv_name), os.path.join(other, csv_name), shallow=False)
+
+
+def test_rows_are_split_over_the_months_and_recorded(tmp_path):
+    folder = str(tmp_path / "trips")
+    manifest = generate_trip_files(folder, rows=1003, months=3, year=2023, stations=40, seed=0, chunk_rows=100)
+
+    assert [entry["rows"] for entry in manifest["files"]] == [335, 334, 334]
+    assert [entry["file"] for entry in manifest["files"]] == [os.path.basename(path)
+                                                             for path in find_trip_files(folder)]
+    assert read_generator_manifest(folder) == manifest
+    assert os.path.exists(os.path.join(folder, MANIFEST_NAME))
+    assert read_generator_manifest(str(tmp_path)) is None
+
+    for entry, month in zip(manifest["files"], (1, 2, 3)):
+        trips = pd.read_csv(os.path.join(folder, entry["file"]), dtype=str)
+        assert trips.columns.tolist() == RAW_COLUMNS and len(trips) == entry["rows"]
+        started = pd.to_datetime(trips["started_at"], format="ISO8601")
+        assert (started.dt.year == 2023).all() and (started.dt.month == month).all()
+
+    assert raw_trips(folder)["ride_id"].astype(int).tolist() == list(range(1003))
+
+
+def test_injected_problems_appear_at_their_rates(tmp_path):
+    folder = str(tmp_path / "trips")
+    rates = {**DEFAULT_RATES, "fractional_seconds": 0.2, "dropped_station": 0.1, "missing_end_station": 0.1}
+    generate_trip_files(folder, rows=20_000, months=1, stations=80, seed=5, rates=rates)
+    trips = raw_trips(folder)
+
+    fractional = trips["started_at"].str.contains(".", regex=False).mean()
+    assert fractional == pytest.approx(0.2, abs=0.02)
+    dropped = ((trips["start_station_id"] == DROPPED_STATION_ID) | (trips["end_station_id"] == DROPPED_STATION_ID))
+    assert dropped.mean() == pytest.approx(0.1, abs=0.02)
+    assert trips["end_station_id"].isna().mean() == pytest.approx(0.1, abs=0.02)
+    assert trips["start_station_name"].str.contains("\u00a0").mean() == pytest.approx(0.01, abs=0.005)
+
+
+def test_zero_rates_give_data_the_cleaning_keeps(tmp_path):
+    folder = str(tmp_path / "trips")
+    generate_trip_files(folder, rows=3000, months=1, stations=60, seed=6,
+                        rates={name: 0.0 for name in DEFAULT_RATES})
+    cleaned, counts = clean_trip_data(read_trip_file(find_trip_files(folder)[0]))
+
+    assert counts["rows_out"] == counts["rows_in"] == 3000
+    assert counts["names_remapped"] == 0
+    assert (cleaned["trip_duration"] >= 60).all()
+    assert np.isin(cleaned["start_station_id"].astype(str), [DROPPED_STATION_ID], invert=True).all()
+
+
+def test_months_must_fit_in_a_year(tmp_path):
+    with pytest.raises(ValueError):
+        generate_trip_files(str(tmp_path), rows=10, months=13)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from trip_timestamps import parse_timestamp_columns, parse_trip_timestamps
+
+
+def test_fractional_seconds_use_the_iso8601_fallback():
+    values = pd.Series(["2024-01-12 12:06:52", "2024-01-12 12:06:52.123", None, "2024-01-12 12:06:52",
+                        "2024-01-12T12:07:00", "not a time"], index=[10, 11, 12, 13, 14, 15], name="started_at")
+    report = {}
+    parsed = parse_trip_timestamps(values, report)
+
+    assert parsed.index.tolist() == values.index.tolist() and parsed.name == "started_at"
+    assert parsed.iloc[0] == parsed.iloc[3] == pd.Timestamp("2024-01-12 12:06:52")
+    assert parsed.iloc[1] == pd.Timestamp("2024-01-12 12:06:52.123")
+    assert parsed.iloc[4] == pd.Timestamp("2024-01-12 12:07:00")
+    assert pd.isna(parsed.iloc[2]) and pd.isna(parsed.iloc[5])
+    assert report == {"timestamps": 5, "distinct_timestamps": 4, "fallback_timestamps": 3, "unparsed_timestamps": 1}
+
+
+def test_matches_pandas_on_fixed_format_strings():
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(0, 90 * 86400, size=2000)
+    expected = pd.Timestamp("2024-01-01") + pd.to_timedelta(seconds, unit="s")
+    parsed = parse_trip_timestamps(expected.strftime("%Y-%m-%d %H:%M:%S").tolist())
+    np.testing.assert_array_equal(parsed.to_numpy(), expected.to_numpy())
+
+
+def test_column_counts_are_summed_over_columns_and_calls():
+    frame = pd.DataFrame({"started_at": ["2024-01-01 00:00:00", "2024-01-01 00:00:01.5"],
+                          "ended_at": ["2024-01-01 00:10:00", "2024-01-01 00:10:00"]})
+    report = {"timestamps": 10}
+    parse_timestamp_columns(frame, ["started_at", "ended_at"], report)
+
+    assert frame["ended_at"].dtype.kind == "M"
+    assert frame["started_at"].iloc[1] == pd.Timestamp("2024-01-01 00:00:01.500")
+    assert report["timestamps"] == 14 and report["distinct_timestamps"] == 3 and report["fallback_timestamps"] == 1
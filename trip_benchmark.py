@@ -0,0 +1,460 @@
+"""
+Benchmark suite for the trip cleaning and analysis pipeline.
+
+Runs each stage of the pipeline on a folder of monthly trip CSV files (real, or written by
+trip_synth) and measures it separately: wall-clock time, CPU time (including worker processes),
+peak resident memory of the process and its workers, the change in resident memory, and rows in
+and out. With --tracemalloc the peak of Python allocations is recorded as well; tracing slows
+allocation-heavy stages, so it is off by default. The measuring is done by pipeline_profile, so
+the steps the library marks inside a stage (such as read_csv and station_remap, also in worker
+processes) are recorded under it as "stage/step". Work a stage needs that is not what it measures
+(reading the raw strings the timestamp parser is given, for example) happens before its clock
+starts.
+
+Results are written as JSON together with the library versions, the git commit and the data
+(the trip_synth manifest, or the file names and sizes), so runs on different commits can be
+compared with the compare subcommand.
+
+Usage:
+    python trip_benchmark.py generate data/synthetic --rows 10000000
+    python trip_benchmark.py run data/synthetic --output before.json
+    python trip_benchmark.py run data/synthetic --output after.json
+    python trip_benchmark.py compare before.json after.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from pipeline_profile import PipelineProfiler
+from station_remap import load_remap_table
+from trip_cache import load_cached_trips, update_trip_cache
+from trip_cleaning import clean_trip_data, validate_station_mappings
+from trip_cube import TripCube
+from trip_flows import FlowMatrix
+from trip_ingest import count_rows, find_trip_files, load_trip_data
+from trip_occupancy import StationOccupancy
+from trip_schema import optimize_trip_table
+from trip_stats import GroupedDurationStats, compare_durations, summarize_cached_durations
+from trip_synth import add_generator_arguments, generate_from_arguments, read_generator_manifest
+from trip_timestamps import parse_trip_timestamps
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+STATION_COLUMNS = ["start_station_name", "start_station_id", "end_station_name", "end_station_id"]
+CUBE_COLUMNS = ["started_at", "rider_type", "bike_type", "start_station_name"]
+FLOW_COLUMNS = ["started_at", "rider_type", "start_station_name", "end_station_name"]
+OCCUPANCY_COLUMNS = ["started_at", "ended_at", "start_station_name", "end_station_name"]
+ANALYSIS_COLUMNS = ["started_at", "ended_at", "rider_type", "bike_type", "trip_duration"]
+
+# Stages. Each takes the shared state dict, does any untimed setup, and returns the number of rows
+# it is given and the function to time; that function stores its results in the state and returns
+# the number of rows out.
+
+def stage_count_rows(state):
+    def run():
+        return sum(count_rows(file_path) for file_path in state["files"])
+    return None, run
+
+
+def stage_load_trip_data(state):
+    def run():
+        state["raw"] = load_trip_data(state["folder_path"], max_workers=state["workers"])
+        return len(state["raw"])
+    return None, run
+
+
+def stage_parse_timestamps(state):
+    # The raw strings of the first file; the loader parses them in its workers
+    strings = pd.read_csv(state["files"][0], usecols=["started_at"], dtype=str)["started_at"]
+
+    def run():
+        return len(parse_trip_timestamps(strings))
+    return len(strings), run
+
+
+def stage_station_remap(state):
+    remap_table = load_remap_table()
+    trips = state["raw"][STATION_COLUMNS].dropna()
+
+    def run():
+        remapped, _ = remap_table.apply(trips)
+        return len(remapped)
+    return len(trips), run
+
+
+def stage_clean_trip_data(state):
+    def run():
+        state["clean"], state["cleaning_counts"] = clean_trip_data(state.pop("raw"))
+        return len(state["clean"])
+    return len(state["raw"]), run
+
+
+def stage_validate_station_mappings(state):
+    stations = state["clean"][STATION_COLUMNS]
+
+    def run():
+        validate_station_mappings(stations, verbose=False)
+        return len(stations)
+    return len(stations), run
+
+
+def stage_pandas_groupbys(state):
+    # The groupbys the cleaning script used to run on the trip table, as a baseline for the cube
+    trips = state["clean"]
+
+    def run():
+        started_at = trips["started_at"].dt
+        hours, weekdays = started_at.hour, started_at.day_name()
+        trips.groupby(hours).size()
+        trips.groupby([weekdays, hours]).size().unstack(fill_value=0)
+        for column in ["rider_type", "bike_type"]:
+            trips.groupby([hours, trips[column]], observed=True).size().unstack(fill_value=0)
+        trips.groupby(["rider_type", "bike_type"], observed=True).size().unstack(fill_value=0)
+        return len(trips["start_station_name"].value_counts())
+    return len(trips), run
+
+
+def stage_trip_cube(state):
+    trips = state["clean"][CUBE_COLUMNS]
+
+    def run():
+        state["cube"] = TripCube.from_trips(trips)
+        return len(state["cube"].counts)
+    return len(trips), run
+
+
+def stage_cube_tables(state):
+    cube = state["cube"]
+
+    def run():
+        cube.hourly_trip_starts()
+        cube.hourly_weekly_trip_starts()
+        cube.hourly_trip_starts_by("rider_type")
+        cube.hourly_trip_starts_by("bike_type")
+        cube.rider_type_analysis()
+        return len(cube.station_trip_starts())
+    return len(cube.counts), run
+
+
+def stage_pandas_flow_queries(state):
+    # Route and station questions answered with groupbys on the station names, as a baseline
+    trips = state["clean"][FLOW_COLUMNS]
+
+    def run():
+        routes = trips.groupby(["start_station_name", "end_station_name"], observed=True).size()
+        routes.nlargest(10)
+        trips["start_station_name"].value_counts()
+        trips["end_station_name"].value_counts()
+        trips.groupby("start_station_name", observed=True)["end_station_name"].nunique()
+        return len(routes)
+    return len(trips), run
+
+
+def stage_flow_matrix(state):
+    trips = state["clean"][FLOW_COLUMNS]
+
+    def run():
+        state["flows"] = FlowMatrix.from_trips(trips)
+        return state["flows"].counts.nnz
+    return len(trips), run
+
+
+def stage_flow_queries(state):
+    flows = state["flows"]
+
+    def run():
+        flows.top_routes(10)
+        flows.top_stations(10, "departures")
+        flows.top_stations(10, "arrivals", hours=[7, 8, 9], rider_types="member")
+        flows.flow_share()
+        return len(flows.degrees())
+    return flows.counts.nnz, run
+
+
+def stage_pandas_station_imbalance(state):
+    # Daily net flow per station with groupbys, as a baseline for the occupancy arrays
+    trips = state["clean"][OCCUPANCY_COLUMNS]
+
+    def run():
+        departures = trips.groupby([trips["start_station_name"].rename("station"),
+                                    trips["started_at"].dt.floor("D").rename("day")], observed=True).size()
+        arrivals = trips.groupby([trips["end_station_name"].rename("station"),
+                                  trips["ended_at"].dt.floor("D").rename("day")], observed=True).size()
+        net = arrivals.sub(departures, fill_value=0).abs()
+        return len(net.groupby(level="day", group_keys=False).nlargest(5))
+    return len(trips), run
+
+
+def stage_station_occupancy(state):
+    trips = state["clean"][OCCUPANCY_COLUMNS]
+
+    def run():
+        state["occupancy"] = StationOccupancy.from_trips(trips, bucket_minutes=15)
+        return state["occupancy"].departures.size
+    return len(trips), run
+
+
+def stage_occupancy_queries(state):
+    occupancy = state["occupancy"]
+
+    def run():
+        occupancy.worst_imbalance(10)
+        return len(occupancy.worst_imbalance_per_period(k=5))
+    return occupancy.departures.size, run
+
+
+def stage_optimize_trip_table(state):
+    trips = state["clean"]
+
+    def run():
+        compact, _ = optimize_trip_table(trips)
+        return len(compact)
+    return len(trips), run
+
+
+def stage_duration_statistics(state):
+    trips = state["clean"][ANALYSIS_COLUMNS]
+
+    def run():
+        duration_stats = GroupedDurationStats(["bike_type"])
+        duration_stats.update(trips)
+        groups = duration_stats.groups
+        if "electric_bike" in groups and "classic_bike" in groups:
+            compare_durations(groups["electric_bike"], groups["classic_bike"], seed=0)
+        return len(groups)
+    return len(trips), run
+
+
+def stage_update_trip_cache(state):
+    def run():
+        report = update_trip_cache(state["folder_path"], state["cache_dir"], max_workers=state["workers"],
+                                   profile_steps=True)
+        state["worker_steps"] = report["steps"].values()
+        return sum(counts["rows_out"] for counts in report["counts"].values())
+    return None, run
+
+
+def stage_unchanged_trip_cache(state):
+    # Second refresh with nothing changed: only the size and modification time checks
+    def run():
+        report = update_trip_cache(state["folder_path"], state["cache_dir"], max_workers=state["workers"])
+        return len(report["unchanged"])
+    return None, run
+
+
+def stage_load_cached_trips(state):
+    def run():
+        return len(load_cached_trips(state["cache_dir"], columns=ANALYSIS_COLUMNS))
+    return None, run
+
+
+def stage_summarize_cached_durations(state):
+    def run():
+        summaries = summarize_cached_durations(state["cache_dir"], by=["bike_type"], max_workers=state["workers"])
+        return len(summaries.groups)
+    return None, run
+
+
+# In-memory stages need the whole trip table in memory; the cache stages work file by file and
+# are the ones to run at the largest scales
+PIPELINES = {
+    "in-memory": [("count_rows", stage_count_rows),
+                  ("load_trip_data", stage_load_trip_data),
+                  ("parse_timestamps", stage_parse_timestamps),
+                  ("station_remap", stage_station_remap),
+                  ("clean_trip_data", stage_clean_trip_data),
+                  ("validate_station_mappings", stage_validate_station_mappings),
+                  ("pandas_groupbys", stage_pandas_groupbys),
+                  ("trip_cube", stage_trip_cube),
+                  ("cube_tables", stage_cube_tables),
+                  ("pandas_flow_queries", stage_pandas_flow_queries),
+                  ("flow_matrix", stage_flow_matrix),
+                  ("flow_queries", stage_flow_queries),
+                  ("pandas_station_imbalance", stage_pandas_station_imbalance),
+                  ("station_occupancy", stage_station_occupancy),
+                  ("occupancy_queries", stage_occupancy_queries),
+                  ("optimize_trip_table", stage_optimize_trip_table),
+                  ("duration_statistics", stage_duration_statistics)],
+    "cache": [("update_trip_cache", stage_update_trip_cache),
+              ("unchanged_trip_cache", stage_unchanged_trip_cache),
+              ("load_cached_trips", stage_load_cached_trips),
+              ("summarize_cached_durations", stage_summarize_cached_durations)]
+}
+
+
+def run_pipeline(folder_path, pipelines, workers=None, trace_python=False):
+    """
+    Run and measure the stages of some pipelines once.
+
+    Parameters:
+        folder_path (str): Folder containing the monthly trip CSV files.
+        pipelines (list): Names from PIPELINES, run in order.
+        workers (int): Number of worker processes for the parallel stages.
+        trace_python (bool): Record the peak of Python allocations per stage.
+
+    Returns:
+        list: One record per stage and per step measured inside it (see pipeline_profile).
+    """
+    files = find_trip_files(folder_path)
+    if not files:
+        raise FileNotFoundError(f"No files matching '*.csv' found in {folder_path}")
+
+    profiler = PipelineProfiler("trip_benchmark", trace_python=trace_python)
+    cache_dir = tempfile.mkdtemp(prefix="trip_benchmark_")
+    state = {"folder_path": folder_path, "files": files, "workers": workers, "cache_dir": cache_dir}
+    try:
+        # Active, so the steps the library marks with profile_step are recorded under each stage
+        with profiler.activate():
+            for pipeline in pipelines:
+                for name, stage in PIPELINES[pipeline]:
+                    rows_in, run = stage(state)
+                    with profiler.stage(name, rows_in) as record:
+                        record["rows_out"] = run()
+                    if "worker_steps" in state:
+                        profiler.add_worker_steps(name, state.pop("worker_steps"))
+                    print(f"  {name:<28} {record['wall_s']:8.2f} s  {record['peak_rss_mb'] or 0:8.0f} MB")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return profiler.records
+
+
+def summarize_runs(runs):
+    """
+    Combine repeated runs: the median time of each stage and the largest memory figures.
+
+    Parameters:
+        runs (list): Lists of stage records, one list per run.
+
+    Returns:
+        list: One record per stage, with the times of every run in "wall_s_runs".
+    """
+    summary = []
+    for records in zip(*runs):
+        record = dict(records[0])
+        record["wall_s_runs"] = [stage["wall_s"] for stage in records]
+        for key in ["wall_s", "cpu_s"]:
+            record[key] = statistics.median(stage[key] for stage in records)
+        for key in ["peak_rss_mb", "rss_delta_mb", "python_peak_mb", "python_delta_mb"]:
+            values = [stage[key] for stage in records if stage.get(key) is not None]
+            if values:
+                record[key] = max(values)
+        summary.append(record)
+    return summary
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def describe_environment(folder_path):
+    """Versions, machine and data description stored with the results."""
+    files = find_trip_files(folder_path)
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"numpy": np.__version__, "pandas": pd.__version__, "pyarrow": pa.__version__},
+        "data": {"folder": os.path.abspath(folder_path), "generator": read_generator_manifest(folder_path),
+                 "files": [{"file": os.path.basename(path), "bytes": os.path.getsize(path)} for path in files]}
+    }
+
+
+def compare_results(old, new, threshold=0.1):
+    """
+    Compare the stage times of two result files.
+
+    Parameters:
+        old (dict): Baseline results.
+        new (dict): Results to check.
+        threshold (float): Relative slowdown reported as a regression.
+
+    Returns:
+        tuple: A DataFrame with the times, memory and ratio per stage, and the list of stages that
+        got slower by more than the threshold.
+    """
+    old_stages = {record["stage"]: record for record in old["stages"]}
+    rows = {}
+    for record in new["stages"]:
+        baseline = old_stages.get(record["stage"])
+        if baseline is None:
+            continue
+        rows[record["stage"]] = {"old_s": baseline["wall_s"], "new_s": record["wall_s"],
+                                 "ratio": record["wall_s"] / baseline["wall_s"] if baseline["wall_s"] else np.nan,
+                                 "old_peak_mb": baseline.get("peak_rss_mb"), "new_peak_mb": record.get("peak_rss_mb")}
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    regressions = [stage for stage, row in rows.items() if row["ratio"] > 1 + threshold]
+    return table, regressions
+
+
+def _load_results(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the trip cleaning and analysis pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write synthetic trip CSV files")
+    add_generator_arguments(generate)
+
+    run = commands.add_parser("run", help="Measure every stage on a folder of trip CSV files")
+    run.add_argument("data_dir", help="Folder containing the monthly trip CSV files")
+    run.add_argument("--output", default="trip_benchmark.json", help="JSON file for the results")
+    run.add_argument("--pipeline", choices=["all"] + list(PIPELINES), default="all",
+                     help="Stages to run; the cache stages alone scale to data larger than memory")
+    run.add_argument("--repeat", type=int, default=1, help="Runs; the median time per stage is reported")
+    run.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    run.add_argument("--tracemalloc", action="store_true", help="Also record the peak of Python allocations")
+
+    compare = commands.add_parser("compare", help="Compare two result files")
+    compare.add_argument("old", help="Baseline results")
+    compare.add_argument("new", help="Results to check")
+    compare.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown reported as a regression")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate_from_arguments(args)
+        return 0
+
+    if args.command == "run":
+        pipelines = list(PIPELINES) if args.pipeline == "all" else [args.pipeline]
+        runs = []
+        for index in range(args.repeat):
+            print(f"Run {index + 1} of {args.repeat}")
+            runs.append(run_pipeline(args.data_dir, pipelines, workers=args.workers, trace_python=args.tracemalloc))
+
+        results = {"environment": describe_environment(args.data_dir), "pipelines": pipelines,
+                   "repeat": args.repeat, "workers": args.workers, "stages": summarize_runs(runs)}
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+        return 0
+
+    table, regressions = compare_results(_load_results(args.old), _load_results(args.new), args.threshold)
+    print(table.to_string(float_format=lambda value: f"{value:.3f}"))
+    for stage in regressions:
+        print(f"REGRESSION: {stage} is {table.loc[stage, 'ratio']:.2f}x slower")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
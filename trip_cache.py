@@ -0,0 +1,301 @@
+"""
+Persisted Parquet cache of the cleaned trip data.
+
+The cache directory holds the cleaned trips as Parquet files partitioned by the year and month the
+trips started (trips/year=YYYY/month=MM/<source file>.parquet) and a manifest.json recording the
+size, modification time and SHA-256 hash of every source CSV. Refreshing the cache only re-cleans
+the monthly files that are new or whose contents changed, and loading reads just the requested
+columns and months.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from pipeline_profile import profile_step, worker_profile
+from trip_ingest import find_trip_files
+from trip_stream import ParquetSink, clean_chunks, read_trip_chunks
+
+MANIFEST_NAME = "manifest.json"
+TRIPS_DIR_NAME = "trips"
+
+# Bump when the cleaning steps change so every source file is re-cleaned
+CACHE_VERSION = 5
+
+PARTITION_SCHEMA = pa.schema([("year", pa.int16()), ("month", pa.int8())])
+
+# Rows read and cleaned at a time when a source file is rebuilt
+CHUNK_SIZE = 500_000
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """
+    Compute the SHA-256 hash of a file.
+
+    Parameters:
+        file_path (str): Path to the file.
+        block_size (int): Number of bytes hashed at a time.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(cache_dir):
+    """
+    Read the cache manifest, or an empty one if the cache does not exist yet.
+
+    Parameters:
+        cache_dir (str): Cache directory.
+
+    Returns:
+        dict: The manifest, with a "sources" entry per cached CSV file name.
+    """
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") == CACHE_VERSION:
+            return manifest
+    return {"version": CACHE_VERSION, "sources": {}}
+
+
+def write_manifest(cache_dir, manifest):
+    """Write the cache manifest atomically."""
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def clean_source_file(file_path, trips_dir, profile_steps=False, chunksize=CHUNK_SIZE):
+    """
+    Clean one source CSV and write it to the cache as one Parquet file per month.
+
+    The file is streamed through the trip_stream pipeline, so only one chunk is held in memory.
+    Each cleaned chunk is split by month and appended to that month's Parquet file as a row group;
+    rows keep the order of the source file.
+
+    Parameters:
+        file_path (str): Path to the source CSV file.
+        trips_dir (str): Directory holding the partitioned Parquet files.
+        profile_steps (bool): Measure the reading, cleaning and writing steps (see pipeline_profile).
+        chunksize (int): Number of rows read and cleaned at a time.
+
+    Returns:
+        tuple: Partition file paths relative to trips_dir, the cleaning and timestamp parsing counts,
+        and the step records (empty unless profile_steps is set).
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    sinks = {}
+    with worker_profile(profile_steps) as steps:
+        timestamp_report = {}
+        counts = Counter()
+        try:
+            for chunk in clean_chunks(read_trip_chunks([file_path], chunksize, timestamp_report), counts):
+                with profile_step("write_partitions", len(chunk)) as step:
+                    started_at = chunk["started_at"].dt
+                    for (year, month), month_chunk in chunk.groupby([started_at.year, started_at.month], sort=True):
+                        relative_path = os.path.join(f"year={year}", f"month={month:02d}", stem + ".parquet")
+                        if relative_path not in sinks:
+                            path = os.path.join(trips_dir, relative_path)
+                            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                            # Write under a dot-prefixed name (ignored by readers) and move into place when complete
+                            temp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path))
+                            sinks[relative_path] = ParquetSink(temp_path)
+                        sinks[relative_path].write(month_chunk)
+                    step["rows_out"] = len(chunk)
+
+            for relative_path, sink in sinks.items():
+                sink.close()
+                os.replace(sink.path, os.path.join(trips_dir, relative_path))
+        except BaseException:
+            for sink in sinks.values():
+                sink.close()
+                if os.path.exists(sink.path):
+                    os.remove(sink.path)
+            raise
+
+    counts.update(timestamp_report)
+    counts = {key: int(value) for key, value in counts.items()}
+    return sorted(sinks), counts, steps
+
+
+def remove_partitions(trips_dir, partitions):
+    """Delete a source file's partition files from the cache."""
+    for relative_path in partitions:
+        path = os.path.join(trips_dir, relative_path)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def update_trip_cache(folder_path, cache_dir, max_workers=None, pattern="*.csv", profile_steps=False):
+    """
+    Bring the cache up to date with the source CSV files.
+
+    A source is skipped when its size and modification time match the manifest, or when they do
+    not but its hash does. Changed and new sources are re-cleaned in a process pool, and sources
+    that no longer exist have their partitions removed.
+
+    Parameters:
+        folder_path (str): Folder containing the monthly trip CSV files.
+        cache_dir (str): Cache directory, created if needed.
+        max_workers (int): Number of worker processes. Defaults to the number of CPUs.
+        pattern (str): Glob pattern the source file names must match.
+        profile_steps (bool): Measure the steps of each rebuilt file in its worker.
+
+    Returns:
+        dict: Lists of "rebuilt", "unchanged" and "removed" source names, the cleaning "counts"
+        of every cached source, and the worker "steps" of every rebuilt source (see
+        pipeline_profile.PipelineProfiler.add_worker_steps).
+    """
+    trips_dir = os.path.join(cache_dir, TRIPS_DIR_NAME)
+    os.makedirs(trips_dir, exist_ok=True)
+    manifest = read_manifest(cache_dir)
+    sources = manifest["sources"]
+
+    report = {"rebuilt": [], "unchanged": [], "removed": [], "steps": {}}
+    stale = {}
+    csv_files = find_trip_files(folder_path, pattern)
+    for file_path in csv_files:
+        name = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        entry = sources.get(name)
+
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            report["unchanged"].append(name)
+            continue
+
+        digest = file_digest(file_path)
+        if entry and entry["sha256"] == digest:
+            # Touched but not modified
+            entry["mtime_ns"] = stat.st_mtime_ns
+            report["unchanged"].append(name)
+            continue
+
+        stale[name] = {"path": file_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+    # Sources deleted from the folder
+    current_names = {os.path.basename(file_path) for file_path in csv_files}
+    for name in sorted(set(sources) - current_names):
+        remove_partitions(trips_dir, sources.pop(name)["partitions"])
+        report["removed"].append(name)
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            for name, source in stale.items():
+                if name in sources:
+                    remove_partitions(trips_dir, sources.pop(name)["partitions"])
+                futures[name] = pool.submit(clean_source_file, source["path"], trips_dir, profile_steps)
+
+            for name, future in futures.items():
+                partitions, counts, steps = future.result()
+                source = stale[name]
+                sources[name] = {"size": source["size"], "mtime_ns": source["mtime_ns"], "sha256": source["sha256"],
+                                 "partitions": partitions, "counts": counts}
+                report["rebuilt"].append(name)
+                if steps:
+                    report["steps"][name] = steps
+
+                # Record progress so an interrupted refresh keeps the files already cleaned
+                write_manifest(cache_dir, manifest)
+
+    write_manifest(cache_dir, manifest)
+    report["counts"] = {name: entry["counts"] for name, entry in sources.items()}
+    return report
+
+
+def cached_partition_paths(cache_dir, months=None):
+    """
+    List the Parquet files in the cache, in partition (year, month) order.
+
+    Parameters:
+        cache_dir (str): Cache directory written by update_trip_cache.
+        months (list): "YYYY-MM" strings or (year, month) tuples to keep. Defaults to all months.
+
+    Returns:
+        list: Absolute paths of the partition files.
+    """
+    trips_dir = os.path.join(cache_dir, TRIPS_DIR_NAME)
+    manifest = read_manifest(cache_dir)
+    relative_paths = [relative_path for entry in manifest["sources"].values() for relative_path in entry["partitions"]]
+
+    if months:
+        selected = {(int(year), int(month_number)) for year, month_number in
+                    (month.split("-") if isinstance(month, str) else month for month in months)}
+        relative_paths = [relative_path for relative_path in relative_paths
+                          if _partition_month(relative_path) in selected]
+    return sorted(os.path.join(trips_dir, relative_path) for relative_path in relative_paths)
+
+
+def _partition_month(relative_path):
+    """(year, month) of a partition file path such as year=2024/month=01/file.parquet."""
+    year_part, month_part = os.path.normpath(relative_path).split(os.sep)[:2]
+    return int(year_part.split("=")[1]), int(month_part.split("=")[1])
+
+
+def month_filter(months):
+    """
+    Build a partition filter selecting the given months.
+
+    Parameters:
+        months (list): "YYYY-MM" strings or (year, month) tuples.
+
+    Returns:
+        pyarrow.dataset.Expression: Filter on the year and month partition fields.
+    """
+    expression = None
+    for month in months:
+        year, month_number = (int(part) for part in month.split("-")) if isinstance(month, str) else month
+        selected = (ds.field("year") == year) & (ds.field("month") == month_number)
+        expression = selected if expression is None else expression | selected
+    return expression
+
+
+def load_cached_trips(cache_dir, columns=None, months=None, where=None):
+    """
+    Load cleaned trips from the cache.
+
+    Only the requested columns are read (projection), months outside the selection are skipped
+    without opening their files, and the optional filter is pushed down to the Parquet reader.
+
+    Parameters:
+        cache_dir (str): Cache directory written by update_trip_cache.
+        columns (list): Columns to load. Defaults to all columns; "year" and "month" are also available.
+        months (list): "YYYY-MM" strings or (year, month) tuples to load. Defaults to all months.
+        where (pyarrow.dataset.Expression): Additional row filter, e.g. ds.field("bike_type") == "electric_bike".
+
+    Returns:
+        pd.DataFrame: The selected trips, in "started_at" order.
+    """
+    trips_dir = os.path.join(cache_dir, TRIPS_DIR_NAME)
+    paths = cached_partition_paths(cache_dir)
+    if not paths:
+        raise FileNotFoundError(f"The trip cache in {cache_dir} is empty; run update_trip_cache first")
+
+    dataset = ds.dataset(paths, format="parquet", partition_base_dir=trips_dir,
+                         partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"))
+
+    expression = where
+    if months:
+        selected_months = month_filter(months)
+        expression = selected_months if expression is None else expression & selected_months
+
+    dataframe = dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    # Partition files keep the order of their source file, which is close to but not exactly "started_at"
+    if "started_at" in dataframe.columns and not dataframe["started_at"].is_monotonic_increasing:
+        dataframe = dataframe.sort_values(by="started_at").reset_index(drop=True)
+    return dataframe
@@ -0,0 +1,205 @@
+"""
+Cleaning steps for the Bluebikes trip data.
+
+These are the station fixes worked out in the cleaning script: trips with missing values and trips
+at the nonexistent station S32020 are removed, station A32046 is given its correct name, and the
+known spelling variants of station names are standardized. The station fixes themselves are listed
+in station_remap.json and applied by station_remap.StationRemapTable. Cleaning also derives the
+"trip_duration" column and drops trips whose duration is not plausible.
+"""
+import numpy as np
+import pandas as pd
+
+from pipeline_profile import profile_step
+from station_remap import SIDES, load_remap_table
+
+# Trips under a minute are mostly false starts and re-docks; trips over a day are lost or unreturned bikes
+MIN_TRIP_SECONDS = 60
+MAX_TRIP_SECONDS = 24 * 60 * 60
+
+
+def station_pairs(dataframe):
+    """
+    List the distinct (station ID, station name) pairs used as start or end stations.
+
+    Each side is reduced to its distinct pairs with integer codes before anything else is done, so
+    the result is the size of the station list rather than the number of trips.
+
+    Parameters:
+        dataframe (pd.DataFrame): The DataFrame containing bike trip data with station names and IDs.
+
+    Returns:
+        pd.DataFrame: Columns "station_id", "station_name" and "side" ("start", "end" or "both").
+    """
+    side_pairs = []
+    for side in SIDES:
+        ids = dataframe[f"{side}_station_id"].astype("category")
+        names = dataframe[f"{side}_station_name"].astype("category")
+        id_codes = ids.cat.codes.to_numpy().astype(np.int64)
+        name_codes = names.cat.codes.to_numpy().astype(np.int64)
+        name_count = max(len(names.cat.categories), 1)
+
+        # One integer key per row, deduplicated
+        present = (id_codes >= 0) & (name_codes >= 0)
+        keys = np.unique(id_codes[present] * name_count + name_codes[present])
+        side_pairs.append(pd.DataFrame({
+            "station_id": np.asarray(ids.cat.categories, dtype=object)[keys // name_count],
+            "station_name": np.asarray(names.cat.categories, dtype=object)[keys % name_count]
+        }))
+
+    pairs = side_pairs[0].merge(side_pairs[1], how="outer", on=["station_id", "station_name"], indicator="side")
+    pairs["side"] = pairs["side"].map({"left_only": "start", "right_only": "end", "both": "both"}).astype(object)
+    return pairs.sort_values(["station_id", "station_name"]).reset_index(drop=True)
+
+
+def _mapping_conflicts(pairs, key, value):
+    """Keys of the pairs table that map to more than one value."""
+    conflicted = pairs[pairs.groupby(key)[value].transform("size") > 1]
+    conflicts = conflicted.groupby(key, sort=True)[value].agg(list).rename(f"{value}s").reset_index()
+    conflicts["instances"] = conflicts[f"{value}s"].str.len()
+    return conflicts
+
+
+def validate_station_mappings(dataframe, verbose=True):
+    """
+    Validate Station Name-to-ID mappings for both start and end stations.
+
+    This function checks for inconsistencies between station names and station IDs by identifying
+    cases where a station name is associated with multiple station IDs or where a station ID is
+    associated with multiple station names. Start and end stations are checked together.
+
+    Parameters:
+        dataframe (pd.DataFrame): The DataFrame containing bike trip data with station names and IDs.
+        verbose (bool): Print the conflicts to the console.
+
+    Returns:
+        dict: "pairs" (see station_pairs), "name_to_ids" (station names with more than one ID) and
+        "id_to_names" (station IDs with more than one name), each a DataFrame. Both conflict tables
+        are empty when the mappings are consistent.
+    """
+    pairs = station_pairs(dataframe)
+    report = {
+        "pairs": pairs,
+        "name_to_ids": _mapping_conflicts(pairs, "station_name", "station_id"),
+        "id_to_names": _mapping_conflicts(pairs, "station_id", "station_name")
+    }
+    if verbose:
+        print_station_mapping_report(report)
+    return report
+
+
+def print_station_mapping_report(report):
+    """
+    Print the conflicts found by validate_station_mappings.
+
+    Parameters:
+        report (dict): The report returned by validate_station_mappings.
+    """
+    # Check for mismatches (name to multiple IDs)
+    print("Station Names Mapping to Multiple IDs:")
+    for row in report["name_to_ids"].itertuples(index=False):
+        print(f"{row.station_name}: {row.station_ids} (Instances: {row.instances})")
+    if report["name_to_ids"].empty:
+        print("nil")
+
+    # Check for mismatches (ID to multiple names)
+    print("\nStation IDs Mapping to Multiple Names:")
+    for row in report["id_to_names"].itertuples(index=False):
+        print(f"{row.station_id}: {row.station_names} (Instances: {row.instances})")
+    if report["id_to_names"].empty:
+        print("nil")
+
+
+def add_trip_duration(dataframe, min_seconds=MIN_TRIP_SECONDS, max_seconds=MAX_TRIP_SECONDS):
+    """
+    Add the "trip_duration" column (int32 seconds) and drop trips with implausible durations.
+
+    Trips that end before they start are always dropped. Either bound can be set to None to keep
+    short or long trips.
+
+    Parameters:
+        dataframe (pd.DataFrame): Trips with datetime "started_at" and "ended_at" columns.
+        min_seconds (int): Shortest duration kept.
+        max_seconds (int): Longest duration kept.
+
+    Returns:
+        tuple: The filtered DataFrame and a dict with the number of trips dropped for a
+        "negative_duration", "short_duration" or "long_duration".
+    """
+    started_at = dataframe["started_at"].to_numpy().astype("datetime64[s]")
+    ended_at = dataframe["ended_at"].to_numpy().astype("datetime64[s]")
+    seconds = (ended_at - started_at).astype(np.int64)
+
+    negative = seconds < 0
+    short = ~negative & (seconds < min_seconds) if min_seconds is not None else np.zeros_like(negative)
+    long = seconds > max_seconds if max_seconds is not None else np.zeros_like(negative)
+    counts = {"negative_duration": int(negative.sum()), "short_duration": int(short.sum()),
+              "long_duration": int(long.sum())}
+
+    keep = ~(negative | short | long)
+    dataframe = dataframe[keep].copy()
+    dataframe["trip_duration"] = seconds[keep].astype(np.int32)
+    return dataframe, counts
+
+
+def clean_trip_chunk(dataframe, remap_table=None, min_seconds=MIN_TRIP_SECONDS, max_seconds=MAX_TRIP_SECONDS):
+    """
+    Apply every cleaning step that works row by row to a trip DataFrame.
+
+    None of the steps depend on other rows, so the DataFrame can be any slice of the trip data,
+    such as one chunk of a CSV file read in pieces.
+
+    Parameters:
+        dataframe (pd.DataFrame): Trip data as returned by the loader, with renamed columns.
+        remap_table (StationRemapTable): Station fixes to apply. Defaults to station_remap.json.
+        min_seconds (int): Shortest trip duration kept (see add_trip_duration).
+        max_seconds (int): Longest trip duration kept (see add_trip_duration).
+
+    Returns:
+        tuple: The cleaned DataFrame and a dict with the number of rows affected by each step.
+    """
+    counts = {"rows_in": len(dataframe)}
+
+    # Remove rows with any missing values
+    with profile_step("dropna", len(dataframe)) as step:
+        dataframe = dataframe.dropna()
+        step["rows_out"] = len(dataframe)
+    counts["missing_values"] = counts["rows_in"] - len(dataframe)
+
+    # Drop trips at nonexistent stations and correct station names in one pass per column
+    with profile_step("station_remap", len(dataframe)) as step:
+        dataframe, remap_counts = (remap_table or load_remap_table()).apply(dataframe)
+        step["rows_out"] = len(dataframe)
+    counts.update(remap_counts)
+
+    # Derive trip_duration once, here, for every downstream plot and test
+    with profile_step("trip_duration", len(dataframe)) as step:
+        dataframe, duration_counts = add_trip_duration(dataframe, min_seconds, max_seconds)
+        step["rows_out"] = len(dataframe)
+    counts.update(duration_counts)
+
+    counts["rows_out"] = len(dataframe)
+    return dataframe, counts
+
+
+def clean_trip_data(dataframe, remap_table=None, min_seconds=MIN_TRIP_SECONDS, max_seconds=MAX_TRIP_SECONDS):
+    """
+    Apply every cleaning step to a trip DataFrame and sort it by start time.
+
+    Parameters:
+        dataframe (pd.DataFrame): Trip data as returned by the loader, with renamed columns.
+        remap_table (StationRemapTable): Station fixes to apply. Defaults to station_remap.json.
+        min_seconds (int): Shortest trip duration kept (see add_trip_duration).
+        max_seconds (int): Longest trip duration kept (see add_trip_duration).
+
+    Returns:
+        tuple: The cleaned DataFrame, sorted by "started_at", and a dict with the number of rows
+        affected by each step.
+    """
+    dataframe, counts = clean_trip_chunk(dataframe, remap_table, min_seconds, max_seconds)
+
+    # Sort by "started_at" column
+    with profile_step("sort_values", len(dataframe)) as step:
+        dataframe = dataframe.sort_values(by="started_at").reset_index(drop=True)
+        step["rows_out"] = len(dataframe)
+    return dataframe, counts
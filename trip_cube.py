@@ -0,0 +1,165 @@
+"""
+Precomputed count cube of trip starts.
+
+One pass over the trips counts them by start date, hour, day of week, rider type, bike type and
+start station. Every hourly, weekday and rider/bike breakdown used by the analysis plots is then a
+sum over this small table instead of a groupby over the trip rows, and the cube can be saved next
+to the data so dashboards can reload it without reading any trips.
+"""
+import numpy as np
+import pandas as pd
+
+from trip_schema import DAYS_ORDER
+
+DIMENSIONS = ["date", "hour", "weekday", "rider_type", "bike_type", "start_station"]
+
+CUBE_FILE_NAME = "trip_cube.parquet"
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _codes(series):
+    """Categorical codes (int64) and categories of a column."""
+    values = series.astype("category")
+    return values.cat.codes.to_numpy().astype(np.int64), values.cat.categories
+
+
+class TripCube:
+    """
+    Trip start counts by date, hour, weekday, rider type, bike type and start station.
+
+    Parameters:
+        counts (pd.DataFrame): One row per non-empty cell, with the DIMENSIONS columns and "trips".
+    """
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    @classmethod
+    def from_trips(cls, dataframe, station_column="start_station_name"):
+        """
+        Count trips into a cube in a single pass.
+
+        Parameters:
+            dataframe (pd.DataFrame): Cleaned trips with "started_at", "rider_type", "bike_type"
+                and the station column.
+            station_column (str): Column used for the start station dimension.
+
+        Returns:
+            TripCube: The counts.
+        """
+        minutes = dataframe["started_at"].to_numpy().astype("datetime64[m]").astype(np.int64)
+        days = minutes // MINUTES_PER_DAY
+        hours = (minutes % MINUTES_PER_DAY) // 60
+        rider_codes, rider_types = _codes(dataframe["rider_type"])
+        bike_codes, bike_types = _codes(dataframe["bike_type"])
+        station_codes, stations = _codes(dataframe[station_column])
+
+        valid = (rider_codes >= 0) & (bike_codes >= 0) & (station_codes >= 0)
+        if not valid.all():
+            days, hours = days[valid], hours[valid]
+            rider_codes, bike_codes, station_codes = rider_codes[valid], bike_codes[valid], station_codes[valid]
+
+        first_day = int(days.min()) if len(days) else 0
+        rider_count, bike_count, station_count = (max(len(categories), 1)
+                                                  for categories in (rider_types, bike_types, stations))
+
+        # Pack every dimension into one integer key and count the keys
+        keys = (((days - first_day) * 24 + hours) * rider_count + rider_codes) * bike_count + bike_codes
+        keys = keys * station_count + station_codes
+        key_counts = pd.Series(keys).value_counts(sort=False).sort_index()
+
+        # Unpack the distinct keys back into their dimensions
+        cells = key_counts.index.to_numpy()
+        cells, station_codes = np.divmod(cells, station_count)
+        cells, bike_codes = np.divmod(cells, bike_count)
+        cells, rider_codes = np.divmod(cells, rider_count)
+        days, hours = np.divmod(cells, 24)
+        days += first_day
+
+        counts = pd.DataFrame({
+            "date": days.astype("datetime64[D]").astype("datetime64[s]"),
+            "hour": hours.astype(np.int8),
+            # 1970-01-01 was a Thursday; weekday 0 is Monday, as in Series.dt.dayofweek
+            "weekday": ((days + 3) % 7).astype(np.int8),
+            "rider_type": pd.Categorical.from_codes(rider_codes, categories=rider_types),
+            "bike_type": pd.Categorical.from_codes(bike_codes, categories=bike_types),
+            "start_station": pd.Categorical.from_codes(station_codes, categories=stations),
+            "trips": key_counts.to_numpy().astype(np.int64)
+        })
+        return cls(counts)
+
+    def merge(self, other):
+        """
+        Combine with the cube of another set of trips (e.g. a newly cleaned month).
+
+        Parameters:
+            other (TripCube): Counts to add.
+
+        Returns:
+            TripCube: The combined counts.
+        """
+        counts = pd.concat([self.counts, other.counts], ignore_index=True)
+        for column in ("rider_type", "bike_type", "start_station"):
+            counts[column] = counts[column].astype("category")
+        counts = counts.groupby(DIMENSIONS, observed=True, sort=True)["trips"].sum().reset_index()
+        return TripCube(counts)
+
+    def save(self, path):
+        """Write the cube to a Parquet file."""
+        self.counts.to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path):
+        """Read a cube written by save."""
+        return cls(pd.read_parquet(path))
+
+    def total(self, dimensions):
+        """
+        Total trips for each combination of some dimensions.
+
+        Parameters:
+            dimensions (list): Dimension names to keep; all others are summed over.
+
+        Returns:
+            pd.Series: Trips indexed by the kept dimensions.
+        """
+        return self.counts.groupby(dimensions, observed=True, sort=True)["trips"].sum()
+
+    def hourly_trip_starts(self):
+        """Total trips per hour of day, as a "start_hour" / "Total Start Trips" table."""
+        hourly = self.total(["hour"]).reindex(range(24), fill_value=0)
+        return pd.DataFrame({"start_hour": np.arange(24), "Total Start Trips": hourly.to_numpy()})
+
+    def hourly_weekly_trip_starts(self):
+        """Total trips per day of week (rows, Monday first) and hour of day (columns)."""
+        table = self.total(["weekday", "hour"]).unstack(fill_value=0)
+        table = table.reindex(index=range(7), columns=range(24), fill_value=0)
+        table.index = pd.Index(DAYS_ORDER, name="start_day_of_week")
+        table.columns.name = "start_hour"
+        return table
+
+    def hourly_trip_starts_by(self, column):
+        """
+        Total trips per hour of day (rows) for each value of a column (columns).
+
+        Parameters:
+            column (str): "rider_type" or "bike_type".
+        """
+        table = self.total(["hour", column]).unstack(fill_value=0).reindex(range(24), fill_value=0)
+        table.index.name = "start_hour"
+        table.columns = table.columns.astype(object)
+        return table
+
+    def rider_type_analysis(self):
+        """Total trips per rider type (rows) and bike type (columns)."""
+        table = self.total(["rider_type", "bike_type"]).unstack(fill_value=0)
+        table.index = table.index.astype(object)
+        table.columns = table.columns.astype(object)
+        return table
+
+    def station_trip_starts(self):
+        """Total trips per start station, most popular first."""
+        totals = self.total(["start_station"]).sort_values(ascending=False)
+        totals.index = totals.index.astype(object)
+        return totals
@@ -0,0 +1,287 @@
+"""
+Origin-destination flow matrix of trips between stations.
+
+Start and end station names are encoded once to shared integer codes, and one pass over the trips
+counts them into a scipy.sparse matrix with a row per (slice, origin station) and a column per
+destination station, where a slice is a combination of start hour and rider type. Station
+popularity, top routes, degrees and how much of the flow is balanced by return trips are then
+sums and lookups on that matrix, for all trips or any selection of hours and rider types, instead
+of a groupby over the trip rows per question. The matrix can be saved next to the data and
+reloaded without reading any trips.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from scipy import sparse
+
+FLOW_FILE_NAME = "trip_flows.npz"
+
+# Dimensions the matrix can be sliced by
+SLICE_DIMENSIONS = ["hour", "rider_type"]
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def station_codes(origins, destinations):
+    """
+    Encode start and end station names to shared integer codes.
+
+    Parameters:
+        origins (pd.Series): Start station names.
+        destinations (pd.Series): End station names.
+
+    Returns:
+        tuple: Origin codes and destination codes (int64, -1 for missing names) and the sorted
+        station names the codes index.
+    """
+    values = [origins.astype("category"), destinations.astype("category")]
+    stations = union_categoricals(values, ignore_order=True).categories.sort_values()
+    codes = [column.cat.set_categories(stations).cat.codes.to_numpy().astype(np.int64) for column in values]
+    return codes[0], codes[1], stations
+
+
+class FlowMatrix:
+    """
+    Trip counts between stations, sliced by start hour and rider type.
+
+    Parameters:
+        counts (scipy.sparse.csr_matrix): Trips with one row per (slice, origin) pair, row
+            slice * len(stations) + origin, and one column per destination.
+        stations (pd.Index): Station names, in code order.
+        by (list): Slice dimensions, a subset of SLICE_DIMENSIONS in that order.
+        rider_types (pd.Index): Rider types, in code order, when the matrix is sliced by rider type.
+    """
+
+    def __init__(self, counts, stations, by, rider_types=None):
+        self.counts = counts
+        self.stations = pd.Index(stations)
+        self.by = list(by)
+        self.rider_types = pd.Index(rider_types if rider_types is not None else [])
+        self._matrices = {}
+
+    @classmethod
+    def from_trips(cls, dataframe, by=("hour", "rider_type"), origin="start_station_name",
+                   destination="end_station_name"):
+        """
+        Count trips into a flow matrix in a single pass.
+
+        Parameters:
+            dataframe (pd.DataFrame): Cleaned trips with the station columns, plus "started_at"
+                when sliced by hour and "rider_type" when sliced by rider type.
+            by (tuple): Slice dimensions, a subset of SLICE_DIMENSIONS.
+            origin (str): Origin station column.
+            destination (str): Destination station column.
+
+        Returns:
+            FlowMatrix: The counts.
+        """
+        by = [dimension for dimension in SLICE_DIMENSIONS if dimension in by]
+        origin_codes, destination_codes, stations = station_codes(dataframe[origin], dataframe[destination])
+        valid = (origin_codes >= 0) & (destination_codes >= 0)
+
+        slices = np.zeros(len(dataframe), dtype=np.int64)
+        rider_types = None
+        if "hour" in by:
+            minutes = dataframe["started_at"].to_numpy().astype("datetime64[m]").astype(np.int64)
+            slices = slices * 24 + (minutes % MINUTES_PER_DAY) // 60
+        if "rider_type" in by:
+            riders = dataframe["rider_type"].astype("category")
+            rider_types = riders.cat.categories
+            rider_codes = riders.cat.codes.to_numpy().astype(np.int64)
+            valid &= rider_codes >= 0
+            slices = slices * max(len(rider_types), 1) + rider_codes
+
+        station_count = len(stations)
+        slice_count = (24 if "hour" in by else 1) * (max(len(rider_types), 1) if rider_types is not None else 1)
+        rows = slices[valid] * station_count + origin_codes[valid]
+
+        # Duplicate (row, column) pairs are summed when converting to CSR
+        counts = sparse.coo_matrix((np.ones(len(rows), dtype=np.int64), (rows, destination_codes[valid])),
+                                   shape=(slice_count * station_count, station_count)).tocsr()
+        return cls(counts, stations, by, rider_types)
+
+    @property
+    def station_count(self):
+        return len(self.stations)
+
+    def _slice_ids(self, hours=None, rider_types=None):
+        """Slice numbers selected by some hours and rider types (None selects all)."""
+        hour_ids = np.arange(24) if "hour" in self.by else np.zeros(1, dtype=np.int64)
+        if hours is not None:
+            if "hour" not in self.by:
+                raise ValueError("the flow matrix is not sliced by hour")
+            hour_ids = np.atleast_1d(np.asarray(hours, dtype=np.int64))
+            outside = (hour_ids < 0) | (hour_ids >= 24)
+            if outside.any():
+                raise ValueError(f"hours must be between 0 and 23, got {hour_ids[outside].tolist()}")
+
+        rider_count = max(len(self.rider_types), 1) if "rider_type" in self.by else 1
+        rider_ids = np.arange(rider_count)
+        if rider_types is not None:
+            if "rider_type" not in self.by:
+                raise ValueError("the flow matrix is not sliced by rider type")
+            rider_types = [rider_types] if isinstance(rider_types, str) else list(rider_types)
+            rider_ids = self.rider_types.get_indexer(rider_types)
+            if (rider_ids < 0).any():
+                raise KeyError(f"unknown rider types: {[r for r, i in zip(rider_types, rider_ids) if i < 0]}")
+
+        return (hour_ids[:, None] * rider_count + rider_ids[None, :]).ravel()
+
+    def matrix(self, hours=None, rider_types=None):
+        """
+        Station-to-station trip counts for some hours and rider types.
+
+        Parameters:
+            hours (int or list): Start hours to include. Defaults to all.
+            rider_types (str or list): Rider types to include. Defaults to all.
+
+        Returns:
+            scipy.sparse.csr_matrix: Trips from the row station to the column station.
+        """
+        key = (None if hours is None else tuple(np.atleast_1d(hours).tolist()),
+               None if rider_types is None else tuple([rider_types] if isinstance(rider_types, str) else rider_types))
+        if key not in self._matrices:
+            selected = self._slice_ids(hours, rider_types)
+            n = self.station_count
+            # Sum the row blocks of the selected slices
+            blocks = [self.counts[slice_id * n:(slice_id + 1) * n] for slice_id in selected]
+            self._matrices[key] = sum(blocks[1:], blocks[0]).tocsr() if blocks else sparse.csr_matrix((n, n))
+        return self._matrices[key]
+
+    def top_stations(self, k=10, direction="departures", hours=None, rider_types=None):
+        """
+        Most popular stations.
+
+        Parameters:
+            k (int): Number of stations.
+            direction (str): Rank by "departures", "arrivals" or "total" trips.
+            hours (int or list): Start hours to include. Defaults to all.
+            rider_types (str or list): Rider types to include. Defaults to all.
+
+        Returns:
+            pd.Series: Trips per station, most popular first.
+        """
+        if k < 0:
+            raise ValueError(f"k must be at least 0, not {k}")
+        if direction not in ("departures", "arrivals", "total"):
+            raise ValueError(f"direction must be 'departures', 'arrivals' or 'total', not {direction!r}")
+        return self.degrees(hours, rider_types)[direction].nlargest(k)
+
+    def top_routes(self, k=10, include_round_trips=True, hours=None, rider_types=None):
+        """
+        Most frequent origin-destination pairs.
+
+        Parameters:
+            k (int): Number of routes.
+            include_round_trips (bool): Include trips ending at their start station.
+            hours (int or list): Start hours to include. Defaults to all.
+            rider_types (str or list): Rider types to include. Defaults to all.
+
+        Returns:
+            pd.DataFrame: "origin", "destination" and "trips", most frequent first.
+        """
+        if k < 0:
+            raise ValueError(f"k must be at least 0, not {k}")
+        flows = self.matrix(hours, rider_types).tocoo()
+        rows, columns, trips = flows.row, flows.col, flows.data
+        if not include_round_trips:
+            keep = rows != columns
+            rows, columns, trips = rows[keep], columns[keep], trips[keep]
+
+        # Partial sort: only the k largest counts are ordered
+        k = min(k, len(trips))
+        top = np.argpartition(-trips, k - 1)[:k] if 0 < k < len(trips) else np.arange(k)
+        top = top[np.lexsort((rows[top], -trips[top]))]
+        return pd.DataFrame({"origin": self.stations[rows[top]], "destination": self.stations[columns[top]],
+                             "trips": trips[top]})
+
+    def degrees(self, hours=None, rider_types=None):
+        """
+        Trips and distinct connected stations per station.
+
+        Parameters:
+            hours (int or list): Start hours to include. Defaults to all.
+            rider_types (str or list): Rider types to include. Defaults to all.
+
+        Returns:
+            pd.DataFrame: Per station, "departures" and "arrivals" (trips), "total", and
+            "out_degree" and "in_degree" (number of distinct destinations and origins).
+        """
+        flows = self.matrix(hours, rider_types)
+        departures = np.asarray(flows.sum(axis=1)).ravel()
+        arrivals = np.asarray(flows.sum(axis=0)).ravel()
+        return pd.DataFrame({"departures": departures, "arrivals": arrivals, "total": departures + arrivals,
+                             "out_degree": flows.getnnz(axis=1), "in_degree": flows.getnnz(axis=0)},
+                            index=pd.Index(self.stations, name="station"))
+
+    def flow_share(self, hours=None, rider_types=None):
+        """
+        Split the trips into flow balanced by trips in the opposite direction and the rest.
+
+        For each pair of stations, min(trips A to B, trips B to A) trips in each direction are
+        symmetric; the remainder of the larger direction is asymmetric, i.e. bikes that have to be
+        rebalanced. Round trips (same start and end station) count as symmetric.
+
+        Parameters:
+            hours (int or list): Start hours to include. Defaults to all.
+            rider_types (str or list): Rider types to include. Defaults to all.
+
+        Returns:
+            dict: "trips", "round_trips", "symmetric" and "asymmetric" trip counts, and the
+            "symmetric_share" and "asymmetric_share" of all trips.
+        """
+        flows = self.matrix(hours, rider_types)
+        total = int(flows.sum())
+        symmetric = int(flows.minimum(flows.T).sum())
+        asymmetric = total - symmetric
+        return {"trips": total, "round_trips": int(flows.diagonal().sum()), "symmetric": symmetric,
+                "asymmetric": asymmetric, "symmetric_share": symmetric / total if total else np.nan,
+                "asymmetric_share": asymmetric / total if total else np.nan}
+
+    def merge(self, other):
+        """
+        Combine with the flows of another set of trips (e.g. a newly cleaned month).
+
+        Parameters:
+            other (FlowMatrix): Counts to add, sliced by the same dimensions.
+
+        Returns:
+            FlowMatrix: The combined counts, over the union of both station and rider type sets.
+        """
+        if other.by != self.by:
+            raise ValueError("flow matrices sliced by different dimensions cannot be merged")
+        stations = self.stations.union(other.stations)
+        rider_types = self.rider_types.union(other.rider_types)
+        return FlowMatrix(self._reindexed(stations, rider_types) + other._reindexed(stations, rider_types),
+                          stations, self.by, rider_types if "rider_type" in self.by else None)
+
+    def _reindexed(self, stations, rider_types):
+        """The counts with station and rider type codes mapped into larger code sets."""
+        n, new_n = self.station_count, len(stations)
+        rider_count = max(len(self.rider_types), 1) if "rider_type" in self.by else 1
+        new_rider_count = max(len(rider_types), 1) if "rider_type" in self.by else 1
+        station_map = stations.get_indexer(self.stations)
+        rider_map = rider_types.get_indexer(self.rider_types) if "rider_type" in self.by else np.zeros(1, np.int64)
+
+        flows = self.counts.tocoo()
+        slices, origins = np.divmod(flows.row, n)
+        hours, riders = np.divmod(slices, rider_count)
+        rows = (hours * new_rider_count + rider_map[riders]) * new_n + station_map[origins]
+        shape = (self.counts.shape[0] // (rider_count * n) * new_rider_count * new_n, new_n)
+        return sparse.coo_matrix((flows.data, (rows, station_map[flows.col])), shape=shape).tocsr()
+
+    def save(self, path):
+        """Write the flow matrix, station names and slice labels to a .npz file."""
+        np.savez_compressed(path, data=self.counts.data, indices=self.counts.indices, indptr=self.counts.indptr,
+                            shape=np.array(self.counts.shape), stations=np.asarray(self.stations, dtype=str),
+                            by=np.asarray(self.by, dtype=str), rider_types=np.asarray(self.rider_types, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        """Read a flow matrix written by save."""
+        with np.load(path) as saved:
+            counts = sparse.csr_matrix((saved["data"], saved["indices"], saved["indptr"]),
+                                       shape=tuple(saved["shape"]))
+            by = saved["by"].tolist()
+            rider_types = saved["rider_types"].tolist() if "rider_type" in by else None
+            return cls(counts, saved["stations"].tolist(), by, rider_types)
@@ -0,0 +1,238 @@
+"""
+Parallel, schema-pinned loader for the monthly Bluebikes trip CSV files.
+
+Each file is parsed in a worker process with the dtypes from trip_schema, so categoricals and float32
+coordinates come straight out of read_csv, timestamps are parsed by trip_timestamps in the same
+worker, and the column rename happens as part of the read. The parsed frames are copied into a
+single preallocated table as they arrive, and the combined DataFrame is built on views of that
+table, so the full-year load never holds the per-file frames and a second copy of the trips at the
+same time.
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from pipeline_profile import profile_step
+from trip_schema import CATEGORICAL_COLUMNS, COLUMN_RENAMES, TIMESTAMP_COLUMNS, TRIP_COLUMNS, raw_dtypes
+from trip_timestamps import parse_timestamp_columns
+
+
+def find_trip_files(folder_path, pattern="*.csv"):
+    """
+    List the trip CSV files in a folder, in name (and therefore month) order.
+
+    Parameters:
+        folder_path (str): Folder containing the monthly trip CSV files.
+        pattern (str): Glob pattern the file names must match.
+
+    Returns:
+        list: Sorted file paths.
+    """
+    return sorted(glob.glob(os.path.join(folder_path, pattern)))
+
+
+def count_rows(file_path, block_size=1 << 20):
+    """
+    Count the data rows of a CSV file without parsing it.
+
+    The count is the number of lines minus the header, which is an upper bound on the number of
+    rows read_csv returns (blank lines are skipped and quoted fields may span lines).
+
+    Parameters:
+        file_path (str): Path to the CSV file.
+        block_size (int): Number of bytes read at a time.
+
+    Returns:
+        int: Upper bound on the number of data rows.
+    """
+    lines = 0
+    last_byte = b"\n"
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            lines += block.count(b"\n")
+            last_byte = block[-1:]
+
+    # The last line has no trailing newline
+    if last_byte != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def read_trip_file(file_path, timestamp_report=None):
+    """
+    Read one trip CSV file with the pinned schema and renamed columns.
+
+    Parameters:
+        file_path (str): Path to the CSV file.
+        timestamp_report (dict): Updated with the timestamp parsing counts (see parse_trip_timestamps).
+
+    Returns:
+        pd.DataFrame: The trips in the file, with timestamps already parsed.
+    """
+    with profile_step("read_csv") as step:
+        df = pd.read_csv(file_path, dtype=raw_dtypes())
+        step["rows_out"] = len(df)
+    with profile_step("parse_timestamps", len(df)) as step:
+        parse_timestamp_columns(df, TIMESTAMP_COLUMNS, timestamp_report)
+        step["rows_out"] = len(df)
+    return df.rename(columns=COLUMN_RENAMES)
+
+
+def read_trip_file_with_report(file_path):
+    """
+    Read one trip CSV file and return its timestamp parsing counts alongside it.
+
+    Worker processes cannot update the caller's report, so they send the counts back instead.
+
+    Parameters:
+        file_path (str): Path to the CSV file.
+
+    Returns:
+        tuple: The trips in the file and the timestamp parsing counts.
+    """
+    timestamp_report = {}
+    df = read_trip_file(file_path, timestamp_report)
+    return df, timestamp_report
+
+
+class TripTableBuffer:
+    """
+    Preallocated column storage for the combined trip table.
+
+    Every file gets a fixed slot of rows, sized by count_rows, so frames can be written in whatever
+    order the workers finish while the final row order still follows the file order. Categorical
+    columns are stored as int32 codes against a category list shared by all files. Slots whose
+    file had fewer rows than lines are closed up in place before the table is handed out.
+
+    Parameters:
+        capacity (int): Total number of rows to allocate.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = {}
+        self.categories = {column: {} for column in CATEGORICAL_COLUMNS}
+        # Rows written per slot, keyed by the slot's first row
+        self.slots = {}
+
+        for column in CATEGORICAL_COLUMNS:
+            self.columns[column] = np.full(capacity, -1, dtype=np.int32)
+
+    def write(self, offset, frame, source):
+        """
+        Copy a parsed file into its slot.
+
+        Parameters:
+            offset (int): First row of the file's slot.
+            frame (pd.DataFrame): The parsed file, as returned by read_trip_file.
+            source (str): File path, used in error messages.
+        """
+        missing = [column for column in TRIP_COLUMNS if column not in frame.columns]
+        if missing:
+            raise ValueError(f"{source} is missing trip columns: {missing}")
+
+        rows = slice(offset, offset + len(frame))
+        for column in TRIP_COLUMNS:
+            if column in self.categories:
+                self.columns[column][rows] = self._shared_codes(column, frame[column])
+                continue
+
+            values = frame[column].to_numpy()
+            if column not in self.columns:
+                self.columns[column] = np.empty(self.capacity, dtype=values.dtype)
+            self.columns[column][rows] = values
+
+        self.slots[offset] = len(frame)
+
+    def _shared_codes(self, column, series):
+        """Translate a file's categorical codes into codes against the shared category list."""
+        mapping = self.categories[column]
+        codes = series.cat.codes.to_numpy()
+        if len(series.cat.categories) == 0:
+            return np.full(len(codes), -1, dtype=np.int32)
+
+        lookup = np.array([mapping.setdefault(category, len(mapping)) for category in series.cat.categories],
+                          dtype=np.int32)
+        return np.where(codes >= 0, lookup[codes], -1)
+
+    def _compact(self):
+        """
+        Move the written rows of every slot down to follow the previous slot, in place.
+
+        Returns:
+            int: Number of rows written.
+        """
+        size = 0
+        for offset, length in sorted(self.slots.items()):
+            if offset != size:
+                # Slots only move towards the start, one column at a time
+                for values in self.columns.values():
+                    values[size:size + length] = values[offset:offset + length]
+            size += length
+        return size
+
+    def to_frame(self):
+        """
+        Build the combined DataFrame from the filled slots.
+
+        The non-categorical columns of the result are views of the buffer, not copies.
+
+        Returns:
+            pd.DataFrame: All trips, in file order.
+        """
+        # Close up the unused tail of slots whose files had fewer rows than lines
+        size = self._compact()
+
+        data = {}
+        for column in TRIP_COLUMNS:
+            values = self.columns[column][:size]
+            if column in self.categories:
+                values = pd.Categorical.from_codes(values, categories=list(self.categories[column]))
+            else:
+                # An explicit dtype keeps object columns as they were read instead of inferring strings
+                values = pd.Series(values, dtype=values.dtype, copy=False)
+            data[column] = values
+        # Without a copy the columns stay separate blocks instead of being consolidated into new arrays
+        return pd.DataFrame(data, copy=False)
+
+
+def load_trip_data(folder_path, max_workers=None, pattern="*.csv", timestamp_report=None):
+    """
+    Load every trip CSV file in a folder into one DataFrame using a process pool.
+
+    Parameters:
+        folder_path (str): Folder containing the monthly trip CSV files.
+        max_workers (int): Number of worker processes. Defaults to the number of CPUs.
+        pattern (str): Glob pattern the file names must match.
+        timestamp_report (dict): Updated with the timestamp parsing counts of all files.
+
+    Returns:
+        pd.DataFrame: The combined trip table with the trip_schema dtypes.
+    """
+    csv_files = find_trip_files(folder_path, pattern)
+    if not csv_files:
+        raise FileNotFoundError(f"No files matching {pattern!r} found in {folder_path}")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # Size the table before any file is parsed
+        row_counts = list(pool.map(count_rows, csv_files))
+        offsets = np.concatenate([[0], np.cumsum(row_counts)])
+        table = TripTableBuffer(int(offsets[-1]))
+
+        futures = {pool.submit(read_trip_file_with_report, file): index for index, file in enumerate(csv_files)}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Loading and Processing CSV Files"):
+            # Pop the future so its frame is released as soon as it has been copied
+            index = futures.pop(future)
+            frame, file_report = future.result()
+            table.write(int(offsets[index]), frame, csv_files[index])
+            del frame
+
+            if timestamp_report is not None:
+                for key, count in file_report.items():
+                    timestamp_report[key] = timestamp_report.get(key, 0) + count
+
+    return table.to_frame()
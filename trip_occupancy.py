@@ -0,0 +1,297 @@
+"""
+Departures, arrivals and net flow per station over time, for rebalancing analysis.
+
+Trips are counted into dense station x time-bucket arrays (5, 15 or 60 minute buckets): a
+departure in the bucket the trip started at its start station, an arrival in the bucket it ended
+at its end station. Each is one bincount over the packed (station, bucket) codes, so a year of
+trips is counted without any per-station groupby. The cumulative net flow (arrivals minus
+departures since the first bucket) is the change in the number of docked bikes a station would
+see without rebalancing. The arrays are views of larger buffers whose capacity grows geometrically,
+so appending later months (and new stations, which get the next rows) usually writes into spare
+capacity instead of copying the counts. The stations that gain or lose the most bikes in any period
+are read off the arrays.
+"""
+import numpy as np
+import pandas as pd
+
+from trip_flows import station_codes
+
+OCCUPANCY_FILE_NAME = "station_occupancy.npz"
+
+# Supported bucket widths in minutes
+BUCKET_MINUTES = (5, 15, 60)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minutes(timestamps):
+    """Minutes since the epoch (int64) of a datetime column."""
+    return timestamps.to_numpy().astype("datetime64[m]").astype(np.int64)
+
+
+class StationOccupancy:
+    """
+    Departures and arrivals per station and time bucket.
+
+    Parameters:
+        departures (np.ndarray): Trips started, int32 of shape (stations, buckets).
+        arrivals (np.ndarray): Trips ended, int32 of the same shape.
+        stations (pd.Index): Station names, one per row, in the order they were first seen.
+        start (np.datetime64): Start of the first bucket.
+        bucket_minutes (int): Bucket width in minutes, one of BUCKET_MINUTES.
+    """
+
+    def __init__(self, departures, arrivals, stations, start, bucket_minutes=15):
+        if bucket_minutes not in BUCKET_MINUTES:
+            raise ValueError(f"bucket_minutes must be one of {BUCKET_MINUTES}, not {bucket_minutes}")
+        # Count buffers; only the first len(stations) rows and bucket_count columns are in use
+        self._departures = departures
+        self._arrivals = arrivals
+        self._bucket_count = departures.shape[1]
+        self.stations = pd.Index(stations)
+        self.start = np.datetime64(start, "m")
+        self.bucket_minutes = bucket_minutes
+        self._cumulative = None
+
+    @classmethod
+    def from_trips(cls, dataframe, bucket_minutes=15):
+        """
+        Count departures and arrivals of a set of trips.
+
+        Parameters:
+            dataframe (pd.DataFrame): Cleaned trips with "started_at", "ended_at",
+                "start_station_name" and "end_station_name".
+            bucket_minutes (int): Bucket width in minutes, one of BUCKET_MINUTES.
+
+        Returns:
+            StationOccupancy: The counts.
+        """
+        occupancy = cls(np.zeros((0, 0), dtype=np.int32), np.zeros((0, 0), dtype=np.int32), [],
+                        np.datetime64(0, "m"), bucket_minutes)
+        occupancy.append(dataframe)
+        return occupancy
+
+    @property
+    def departures(self):
+        """Trips started, int32 of shape (stations, buckets)."""
+        return self._departures[:len(self.stations), :self._bucket_count]
+
+    @property
+    def arrivals(self):
+        """Trips ended, int32 of shape (stations, buckets)."""
+        return self._arrivals[:len(self.stations), :self._bucket_count]
+
+    @property
+    def capacity(self):
+        """Rows and buckets the buffers can hold before they have to be reallocated."""
+        return self._departures.shape
+
+    @property
+    def bucket_count(self):
+        return self._bucket_count
+
+    @property
+    def bucket_starts(self):
+        """Start time of every bucket."""
+        return self.start + np.arange(self.bucket_count) * np.timedelta64(self.bucket_minutes, "m")
+
+    @property
+    def net_flow(self):
+        """Arrivals minus departures per station and bucket."""
+        return self.arrivals - self.departures
+
+    @property
+    def cumulative_net_flow(self):
+        """Running net flow per station since the first bucket, i.e. the change in docked bikes."""
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self.net_flow, axis=1, dtype=np.int32)
+        return self._cumulative
+
+    def _bucket(self, minutes):
+        """Bucket number of times given in minutes since the epoch."""
+        return (minutes - self.start.astype(np.int64)) // self.bucket_minutes
+
+    def _resize(self, stations, first_minute, last_minute):
+        """
+        Cover more stations and a longer time range, keeping the counts.
+
+        The stations must start with the current ones. New rows and later buckets go into the
+        spare capacity of the buffers; when it runs out, or the range grows backwards, the buffers
+        are reallocated with at least twice their capacity and the counts are copied.
+        """
+        first_minute -= first_minute % self.bucket_minutes
+        old_count = self.bucket_count
+        if old_count:
+            current_start = int(self.start.astype(np.int64))
+            first_minute = min(first_minute, current_start)
+            last_minute = max(last_minute, current_start + old_count * self.bucket_minutes - 1)
+        bucket_count = (last_minute - first_minute) // self.bucket_minutes + 1
+        offset = (int(self.start.astype(np.int64)) - first_minute) // self.bucket_minutes if old_count else 0
+
+        row_capacity, bucket_capacity = self.capacity
+        if offset or len(stations) > row_capacity or bucket_count > bucket_capacity:
+            if len(stations) > row_capacity:
+                row_capacity = max(len(stations), 2 * row_capacity)
+            if offset or bucket_count > bucket_capacity:
+                bucket_capacity = max(bucket_count, 2 * bucket_capacity)
+            for name in ("departures", "arrivals"):
+                resized = np.zeros((row_capacity, bucket_capacity), dtype=np.int32)
+                resized[:len(self.stations), offset:offset + old_count] = getattr(self, name)
+                setattr(self, "_" + name, resized)
+
+        self.stations = stations
+        self.start = np.datetime64(first_minute, "m")
+        self._bucket_count = bucket_count
+
+    def _add(self, counts, codes, buckets):
+        """Add one trip per (station code, bucket) pair to a count array."""
+        first, last = int(buckets.min()), int(buckets.max())
+        width = last - first + 1
+        # One bincount over the packed pairs, restricted to the buckets the trips cover
+        block = np.bincount(codes * width + (buckets - first), minlength=counts.shape[0] * width)
+        counts[:, first:last + 1] += block.reshape(counts.shape[0], width).astype(np.int32)
+
+    def append(self, dataframe):
+        """
+        Add trips that are not counted yet, e.g. a newly cleaned month.
+
+        The arrays grow to cover new stations and times; counts already in them are kept.
+
+        Parameters:
+            dataframe (pd.DataFrame): Cleaned trips with "started_at", "ended_at",
+                "start_station_name" and "end_station_name".
+        """
+        start_codes, end_codes, stations = station_codes(dataframe["start_station_name"],
+                                                         dataframe["end_station_name"])
+        started, ended = _minutes(dataframe["started_at"]), _minutes(dataframe["ended_at"])
+        valid = (start_codes >= 0) & (end_codes >= 0)
+        if not valid.any():
+            return
+        start_codes, end_codes, started, ended = start_codes[valid], end_codes[valid], started[valid], ended[valid]
+
+        # Codes of the new trips in the combined station index; new stations get the next rows
+        combined = self.stations.append(stations.difference(self.stations))
+        station_map = combined.get_indexer(stations)
+        self._resize(combined, int(min(started.min(), ended.min())), int(max(started.max(), ended.max())))
+
+        self._add(self.departures, station_map[start_codes], self._bucket(started))
+        self._add(self.arrivals, station_map[end_codes], self._bucket(ended))
+        self._cumulative = None
+
+    def _bucket_range(self, start=None, end=None):
+        """Bucket numbers of the half-open time range [start, end), clipped to the data."""
+        first = 0 if start is None else int(self._bucket(np.datetime64(start, "m").astype(np.int64)))
+        last = self.bucket_count if end is None else int(self._bucket(np.datetime64(end, "m").astype(np.int64)))
+        return max(first, 0), min(max(last, 0), self.bucket_count)
+
+    def station_series(self, station, start=None, end=None):
+        """
+        Time series of one station.
+
+        Parameters:
+            station (str): Station name.
+            start (datetime-like): Start of the range. Defaults to the first bucket.
+            end (datetime-like): End of the range (exclusive). Defaults to after the last bucket.
+
+        Returns:
+            pd.DataFrame: "departures", "arrivals", "net_flow" and "cumulative_net_flow" per bucket.
+        """
+        row = self.stations.get_loc(station)
+        first, last = self._bucket_range(start, end)
+        return pd.DataFrame({"departures": self.departures[row, first:last],
+                             "arrivals": self.arrivals[row, first:last],
+                             "net_flow": self.net_flow[row, first:last],
+                             "cumulative_net_flow": self.cumulative_net_flow[row, first:last]},
+                            index=pd.Index(self.bucket_starts[first:last], name="bucket_start"))
+
+    def worst_imbalance(self, k=10, start=None, end=None):
+        """
+        Stations with the largest net gain or loss of bikes over a time range.
+
+        Parameters:
+            k (int): Number of stations.
+            start (datetime-like): Start of the range. Defaults to the first bucket.
+            end (datetime-like): End of the range (exclusive). Defaults to after the last bucket.
+
+        Returns:
+            pd.DataFrame: Per station, "departures", "arrivals", "net_flow", and "max_deficit" and
+            "max_surplus" (the lowest and highest running net flow within the range, i.e. the
+            bikes that had to be brought or taken away to never run empty or full), largest
+            absolute net flow first.
+        """
+        if k < 0:
+            raise ValueError(f"k must be at least 0, not {k}")
+        first, last = self._bucket_range(start, end)
+        departures = self.departures[:, first:last].sum(axis=1)
+        arrivals = self.arrivals[:, first:last].sum(axis=1)
+        net = arrivals - departures
+
+        k = min(k, len(net))
+        top = np.argpartition(-np.abs(net), k - 1)[:k] if 0 < k < len(net) else np.arange(k)
+        top = top[np.argsort(-np.abs(net[top]), kind="stable")]
+
+        # Running net flow within the range, only for the selected stations
+        # Starting from zero, so a range that only gains bikes has no deficit
+        running = np.cumsum(self.net_flow[top, first:last], axis=1)
+        running = np.concatenate([np.zeros((len(top), 1), dtype=running.dtype), running], axis=1)
+        return pd.DataFrame({"departures": departures[top], "arrivals": arrivals[top], "net_flow": net[top],
+                             "max_deficit": running.min(axis=1), "max_surplus": running.max(axis=1)},
+                            index=pd.Index(self.stations[top], name="station"))
+
+    def worst_imbalance_per_period(self, k=5, period_minutes=MINUTES_PER_DAY):
+        """
+        Stations with the largest net gain or loss of bikes in every period, e.g. every day.
+
+        Parameters:
+            k (int): Number of stations per period.
+            period_minutes (int): Period length in minutes, a multiple of the bucket width.
+                Periods are aligned to multiples of their length since the epoch (midnight
+                for days).
+
+        Returns:
+            pd.DataFrame: "period_start", "rank" (1 is the largest absolute net flow), "station"
+            and "net_flow", one row per period and rank.
+        """
+        if k < 0:
+            raise ValueError(f"k must be at least 0, not {k}")
+        if period_minutes % self.bucket_minutes:
+            raise ValueError(f"period_minutes must be a multiple of {self.bucket_minutes}")
+        per_period = period_minutes // self.bucket_minutes
+        start_minute = int(self.start.astype(np.int64))
+
+        # Pad with empty buckets so the array splits into whole, aligned periods
+        lead = (start_minute % period_minutes) // self.bucket_minutes
+        periods = -(-(lead + self.bucket_count) // per_period)
+        net = np.zeros((len(self.stations), periods * per_period), dtype=np.int32)
+        net[:, lead:lead + self.bucket_count] = self.net_flow
+        net = net.reshape(len(self.stations), periods, per_period).sum(axis=2)
+
+        k = min(k, len(self.stations))
+        if k == 0:
+            return pd.DataFrame(columns=["period_start", "rank", "station", "net_flow"])
+        # The k stations with the largest absolute net flow in each period, then ordered
+        top = np.argpartition(-np.abs(net), k - 1, axis=0)[:k] if k < len(self.stations) else \
+            np.broadcast_to(np.arange(len(self.stations))[:, None], net.shape).copy()
+        top_net = np.take_along_axis(net, top, axis=0)
+        order = np.argsort(-np.abs(top_net), axis=0, kind="stable")
+        top, top_net = np.take_along_axis(top, order, axis=0), np.take_along_axis(top_net, order, axis=0)
+
+        first_period = start_minute - start_minute % period_minutes
+        period_starts = np.datetime64(first_period, "m") + np.arange(periods) * np.timedelta64(period_minutes, "m")
+        table = pd.DataFrame({"period_start": np.tile(period_starts, k),
+                              "rank": np.repeat(np.arange(1, k + 1), periods),
+                              "station": self.stations[top.ravel()], "net_flow": top_net.ravel()})
+        return table.sort_values(["period_start", "rank"], ignore_index=True)
+
+    def save(self, path):
+        """Write the counts, station names and bucket layout to a .npz file."""
+        np.savez_compressed(path, departures=self.departures, arrivals=self.arrivals,
+                            stations=np.asarray(self.stations, dtype=str), start=self.start.astype(np.int64),
+                            bucket_minutes=self.bucket_minutes)
+
+    @classmethod
+    def load(cls, path):
+        """Read counts written by save."""
+        with np.load(path) as saved:
+            return cls(saved["departures"], saved["arrivals"], saved["stations"].tolist(),
+                       np.datetime64(int(saved["start"]), "m"), int(saved["bucket_minutes"]))
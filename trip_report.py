@@ -0,0 +1,340 @@
+"""
+Headless rendering of the trip analysis figures to image files.
+
+The small tables behind the analysis figures (hourly, weekday and rider/bike breakdowns from the
+trip cube, and box plot statistics from the merged duration histograms) are computed once in the
+parent process. Each figure is then drawn with the Agg backend in a worker process and written as
+PNG and/or SVG, with an index.html listing them, so the report needs no display. A manifest next
+to the files stores a hash of every figure's input table, and figures whose table is unchanged
+since the last run (and whose files still exist) are not drawn again.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from trip_cube import CUBE_FILE_NAME, TripCube
+from trip_stats import summarize_cached_durations
+
+REPORT_MANIFEST_NAME = "report_manifest.json"
+
+INDEX_FILE_NAME = "index.html"
+
+IMAGE_FORMATS = ("png", "svg")
+
+# Bump when the drawing code changes, so every figure is drawn again
+RENDER_VERSION = 1
+
+# Figure names and titles, in report order
+FIGURES = {
+    "hourly_trip_starts": "Total Trips by Hour of Day",
+    "hourly_weekly_trip_starts": "Daily Trips by Hour of Day and Day of Week",
+    "hourly_weekly_heatmap": "Daily Trips by Hour of Day and Day of Week (Heatmap)",
+    "hourly_trip_starts_by_rider_type": "Total Trips by Hour of Day by Rider Type",
+    "rider_type_analysis": "Rider Type Analysis by Bike Type",
+    "trip_duration_by_bike_type": "Trip Duration by Bike Type",
+    "hourly_trip_starts_by_bike_type": "Total Trips by Hour of Day by Bike Type",
+}
+
+
+def report_tables(cube, duration_stats):
+    """
+    Compute the input table of every figure.
+
+    Parameters:
+        cube (TripCube): Trip counts.
+        duration_stats (GroupedDurationStats): Trip duration summaries grouped by "bike_type".
+
+    Returns:
+        dict: Figure name to its table (pd.DataFrame), or to a list of box statistics for the
+        trip duration box plot.
+    """
+    hourly_weekly_trip_starts = cube.hourly_weekly_trip_starts()
+    return {
+        "hourly_trip_starts": cube.hourly_trip_starts(),
+        "hourly_weekly_trip_starts": hourly_weekly_trip_starts,
+        "hourly_weekly_heatmap": hourly_weekly_trip_starts,
+        "hourly_trip_starts_by_rider_type": cube.hourly_trip_starts_by("rider_type"),
+        "rider_type_analysis": cube.rider_type_analysis(),
+        # Quartiles and whiskers from the histograms, so the box plot never needs the trip rows
+        "trip_duration_by_bike_type": [summary.box_stats(str(bike_type))
+                                       for bike_type, summary in sorted(duration_stats.groups.items())],
+        "hourly_trip_starts_by_bike_type": cube.hourly_trip_starts_by("bike_type"),
+    }
+
+
+def table_digest(name, table, formats):
+    """
+    Hash of a figure's input, so unchanged figures can be skipped.
+
+    Parameters:
+        name (str): Figure name.
+        table (pd.DataFrame or list): The figure's table or box statistics.
+        formats (list): Image formats written.
+
+    Returns:
+        str: Hex SHA-256 digest of the table, its labels, the formats and RENDER_VERSION.
+    """
+    digest = hashlib.sha256(json.dumps([name, RENDER_VERSION, sorted(formats)]).encode())
+    if isinstance(table, pd.DataFrame):
+        digest.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+        digest.update(repr((list(table.columns), table.columns.name, list(table.index.names),
+                            list(table.dtypes.astype(str)))).encode())
+    else:
+        digest.update(json.dumps(table, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _remove_spines(ax):
+    """Remove plot boundaries at right, left, and top."""
+    for side in ("top", "right", "left"):
+        ax.spines[side].set_visible(False)
+
+
+def _hourly_lines(ax, table, title, legend_title, label):
+    """Draw one line per column of an hour (rows) x group (columns) table."""
+    for column in table.columns:
+        ax.plot(table.index, table[column], marker='o', label=label(column))
+
+    # Set x-axis ticks to show every hour
+    ax.set_xticks(range(24))
+    ax.set_title(title)
+    ax.set_xlabel("Hour of Day")
+    ax.set_ylabel("Total Trips")
+
+    # Remove vertical grid lines
+    ax.grid(axis='y')
+    _remove_spines(ax)
+    ax.legend(title=legend_title)
+
+
+def plot_hourly_trip_starts(figure, table):
+    """Line of total trips per hour of day, with the morning and evening peaks marked."""
+    figure.set_size_inches(12, 4)
+    ax = figure.add_subplot()
+    ax.plot(table["start_hour"], table["Total Start Trips"], marker='o', color="blue")
+    ax.set_xticks(range(24))
+
+    # Show morning and evening peaks
+    ax.axvline(x=8, color='green', linestyle='--', label='Morning Peak Hour (08:00 A.M.)')
+    ax.axvline(x=17, color='red', linestyle='--', label='Evening Peak Hour (05:00 P.M.)')
+
+    ax.set_title("Total Trips by Hour of Day")
+    ax.set_xlabel("Hour of Day")
+    ax.set_ylabel("Total Trips")
+    ax.grid(axis='y')
+    _remove_spines(ax)
+    ax.legend()
+
+
+def plot_hourly_weekly_trip_starts(figure, table):
+    """One line of trips per hour of day for each day of the week."""
+    figure.set_size_inches(12, 4)
+    _hourly_lines(figure.add_subplot(), table.T, "Daily Trips by Hour of Day and Day of Week", "Day of Week", str)
+
+
+def plot_hourly_weekly_heatmap(figure, table):
+    """Heatmap of trips per day of week and hour of day."""
+    import seaborn as sns
+
+    figure.set_size_inches(12, 4)
+    ax = figure.add_subplot()
+    sns.heatmap(table, cmap="Blues", annot=False, cbar_kws={'label': 'Total Trips'},
+                linewidths=0.5, linecolor='black', square=True, ax=ax)
+
+    ax.set_title("Daily Trips by Hour of Day and Day of Week", fontsize=16)
+    ax.set_xlabel("Hour of Day", fontsize=12)
+    ax.set_ylabel("Day of Week", fontsize=12)
+
+    # Set the x-ticks to show every hour
+    ax.set_xticks(range(24), labels=range(24))
+    _remove_spines(ax)
+
+
+def plot_hourly_trip_starts_by_rider_type(figure, table):
+    """One line of trips per hour of day for each rider type."""
+    figure.set_size_inches(12, 4)
+    _hourly_lines(figure.add_subplot(), table, "Total Trips by Hour of Day by Rider Type", "Rider Type",
+                  lambda rider_type: rider_type.capitalize())
+
+
+def plot_rider_type_analysis(figure, table):
+    """Stacked bars of trips per rider type, split by bike type."""
+    ax = figure.add_subplot()
+    table.plot(kind='bar', stacked=True, ax=ax)
+    ax.set_title("Rider Type Analysis by Bike Type")
+    ax.set_ylabel("Total Trips")
+    ax.set_xlabel("Rider Type")
+    ax.tick_params(axis='x', labelrotation=0)
+
+
+def plot_trip_duration_by_bike_type(figure, box_stats):
+    """Box plot of trip durations per bike type, drawn from precomputed statistics."""
+    import seaborn as sns
+
+    figure.set_size_inches(4, 12)
+    ax = figure.add_subplot()
+    boxes = ax.bxp(box_stats, showfliers=False, patch_artist=True, widths=0.8, medianprops={"color": "0.25"})
+    for patch, color in zip(boxes["boxes"], sns.color_palette(n_colors=len(box_stats))):
+        patch.set_facecolor(color)
+    ax.set_title("Trip Duration by Bike Type")
+    ax.set_xlabel("bike_type")
+    ax.set_ylabel("trip_duration")
+
+
+def plot_hourly_trip_starts_by_bike_type(figure, table):
+    """One line of trips per hour of day for each bike type."""
+    figure.set_size_inches(12, 4)
+    _hourly_lines(figure.add_subplot(), table, "Total Trips by Hour of Day by Bike Type", "Bike Type",
+                  lambda bike_type: bike_type.replace("_", " ").capitalize())
+
+
+PLOTTERS = {
+    "hourly_trip_starts": plot_hourly_trip_starts,
+    "hourly_weekly_trip_starts": plot_hourly_weekly_trip_starts,
+    "hourly_weekly_heatmap": plot_hourly_weekly_heatmap,
+    "hourly_trip_starts_by_rider_type": plot_hourly_trip_starts_by_rider_type,
+    "rider_type_analysis": plot_rider_type_analysis,
+    "trip_duration_by_bike_type": plot_trip_duration_by_bike_type,
+    "hourly_trip_starts_by_bike_type": plot_hourly_trip_starts_by_bike_type,
+}
+
+
+def render_figure(name, table, output_dir, formats=IMAGE_FORMATS):
+    """
+    Draw one figure with the Agg backend and write it to image files.
+
+    Parameters:
+        name (str): Figure name, a key of FIGURES.
+        table (pd.DataFrame or list): The figure's input from report_tables.
+        output_dir (str): Directory to write the files to.
+        formats (list): Image formats, e.g. ["png", "svg"].
+
+    Returns:
+        list: File names written, relative to output_dir.
+    """
+    # Imported in the worker, so the report never needs a display and callers never load matplotlib
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    figure = Figure()
+    PLOTTERS[name](figure, table)
+    figure.tight_layout()
+
+    file_names = []
+    for image_format in formats:
+        file_name = f"{name}.{image_format}"
+        figure.savefig(os.path.join(output_dir, file_name), format=image_format)
+        file_names.append(file_name)
+    return file_names
+
+
+def _read_manifest(output_dir):
+    """Input digests and files of the figures drawn by the last run."""
+    try:
+        with open(os.path.join(output_dir, REPORT_MANIFEST_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_index(output_dir, figures):
+    """
+    Write an HTML page showing the figures.
+
+    Parameters:
+        output_dir (str): Report directory.
+        figures (dict): Figure name to the file names written for it, in report order.
+
+    Returns:
+        str: Path to the page.
+    """
+    sections = []
+    for name, file_names in figures.items():
+        title = html.escape(FIGURES[name])
+        images = [file_name for file_name in file_names if not file_name.endswith(".svg")] or file_names
+        links = " | ".join(f'<a href="{html.escape(file_name)}">{html.escape(file_name.rsplit(".", 1)[1].upper())}</a>'
+                           for file_name in file_names)
+        sections.append(f'<section id="{name}">\n<h2>{title}</h2>\n'
+                        f'<img src="{html.escape(images[0])}" alt="{title}">\n<p>{links}</p>\n</section>')
+
+    path = os.path.join(output_dir, INDEX_FILE_NAME)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>Bluebikes Trip Analysis</title>\n'
+                   '</head>\n<body>\n<h1>Bluebikes Trip Analysis</h1>\n' + "\n".join(sections) + '\n</body>\n</html>\n')
+    return path
+
+
+def render_report(tables, output_dir, formats=IMAGE_FORMATS, max_workers=None, force=False):
+    """
+    Draw the figures whose input changed since the last run, one figure per worker task.
+
+    Parameters:
+        tables (dict): Figure name to its input, from report_tables.
+        output_dir (str): Directory for the image files, the manifest and index.html.
+        formats (list): Image formats, a subset of IMAGE_FORMATS.
+        max_workers (int): Number of worker processes. Defaults to the number of CPUs.
+        force (bool): Draw every figure, even if its input is unchanged.
+
+    Returns:
+        dict: "rendered" and "skipped" figure names and the "index" page path.
+    """
+    unknown = set(formats) - set(IMAGE_FORMATS)
+    if unknown:
+        raise ValueError(f"formats must be a subset of {IMAGE_FORMATS}, not {sorted(unknown)}")
+    os.makedirs(output_dir, exist_ok=True)
+    previous = _read_manifest(output_dir)
+
+    manifest, pending = {}, []
+    for name in FIGURES:
+        if name not in tables:
+            continue
+        digest = table_digest(name, tables[name], formats)
+        entry = previous.get(name, {})
+        unchanged = entry.get("digest") == digest and all(
+            os.path.exists(os.path.join(output_dir, file_name)) for file_name in entry.get("files", []))
+        if unchanged and not force:
+            manifest[name] = entry
+        else:
+            manifest[name] = {"digest": digest}
+            pending.append(name)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(pending))) as pool:
+            futures = {name: pool.submit(render_figure, name, tables[name], output_dir, list(formats))
+                       for name in pending}
+            for name, future in futures.items():
+                manifest[name]["files"] = future.result()
+
+    with open(os.path.join(output_dir, REPORT_MANIFEST_NAME), "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    index_path = write_index(output_dir, {name: entry["files"] for name, entry in manifest.items()})
+    return {"rendered": pending, "skipped": [name for name in manifest if name not in pending], "index": index_path}
+
+
+def main(argv=None):
+    """Render the report from a trip cache without running the cleaning pipeline."""
+    parser = argparse.ArgumentParser(description="Render the trip analysis figures from a trip cache.")
+    parser.add_argument("cache_dir", help="Cache directory written by the cleaning script")
+    parser.add_argument("--output-dir", help="Report directory (default: <cache_dir>/report)")
+    parser.add_argument("--formats", nargs="+", choices=IMAGE_FORMATS, default=list(IMAGE_FORMATS),
+                        help="Image formats to write")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="Draw every figure, even if its input is unchanged")
+    args = parser.parse_args(argv)
+
+    cube = TripCube.load(os.path.join(args.cache_dir, CUBE_FILE_NAME))
+    duration_stats = summarize_cached_durations(args.cache_dir, by=["bike_type"], max_workers=args.workers)
+    report = render_report(report_tables(cube, duration_stats), args.output_dir or os.path.join(args.cache_dir, "report"),
+                           args.formats, args.workers, args.force)
+    print(f"Rendered {len(report['rendered'])} figures, skipped {len(report['skipped'])} unchanged: {report['index']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Column schema for the Bluebikes trip data CSV files.
+
+The raw files use "member_casual" and "rideable_type"; everything downstream of the loader uses
+"rider_type" and "bike_type", so the rename is part of the schema rather than a separate step.
+optimize_trip_table converts a trip table of any origin to the compact in-memory form of the schema.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Raw column names mapped to the names used in the analysis
+COLUMN_RENAMES = {
+    "member_casual": "rider_type",
+    "rideable_type": "bike_type"
+}
+
+# Columns holding trip start and end times, parsed to datetime while reading
+TIMESTAMP_COLUMNS = ["started_at", "ended_at"]
+
+# Low-cardinality columns stored as categoricals
+CATEGORICAL_COLUMNS = ["bike_type", "rider_type", "start_station_id", "end_station_id"]
+
+# Station coordinates do not need more than float32 precision (~1 m at Boston's latitude)
+COORDINATE_COLUMNS = ["start_lat", "start_lng", "end_lat", "end_lng"]
+
+# Start/end column pairs that share one category dictionary
+STATION_COLUMN_PAIRS = [("start_station_name", "end_station_name"), ("start_station_id", "end_station_id")]
+
+# Derived hour/day-of-week columns that fit in int8
+SMALL_INTEGER_COLUMNS = ["start_hour", "start_weekday"]
+
+# Free-text columns kept as plain strings
+STRING_COLUMNS = ["ride_id", "start_station_name", "end_station_name"]
+
+# Column order of the trip table after loading
+TRIP_COLUMNS = (["ride_id", "bike_type"] + TIMESTAMP_COLUMNS +
+                ["start_station_name", "start_station_id", "end_station_name", "end_station_id"] +
+                COORDINATE_COLUMNS + ["rider_type"])
+
+# Day names in the order used by the weekday tables and plots
+DAYS_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# read_csv dtypes, keyed by the renamed column names
+TRIP_DTYPES = {}
+TRIP_DTYPES.update({column: "category" for column in CATEGORICAL_COLUMNS})
+TRIP_DTYPES.update({column: "float32" for column in COORDINATE_COLUMNS})
+TRIP_DTYPES.update({column: "object" for column in STRING_COLUMNS})
+
+
+def raw_dtypes():
+    """
+    Return the read_csv dtype mapping keyed by the raw (pre-rename) column names.
+
+    Returns:
+        dict: Column name in the CSV header mapped to its pandas dtype.
+    """
+    raw_names = {new: old for old, new in COLUMN_RENAMES.items()}
+    return {raw_names.get(column, column): dtype for column, dtype in TRIP_DTYPES.items()}
+
+
+def optimize_trip_table(dataframe):
+    """
+    Convert a trip table to its compact representation.
+
+    Station names and IDs become categoricals whose categories are shared by the start and end
+    columns, bike and rider types become categoricals, coordinates become float32, hour and weekday
+    columns become int8 (day names become an ordered categorical), "ride_id" becomes an Arrow-backed
+    string and "trip_duration" becomes int32 seconds. Columns that are not present are skipped.
+
+    Parameters:
+        dataframe (pd.DataFrame): The trip table.
+
+    Returns:
+        tuple: The compact DataFrame and a dict with its memory use in bytes "before" and "after".
+    """
+    report = {"before": int(dataframe.memory_usage(deep=True).sum())}
+    dataframe = dataframe.copy(deep=False)
+
+    # One category dictionary for each start/end pair, so codes are comparable across the two columns
+    for pair in STATION_COLUMN_PAIRS:
+        columns = [column for column in pair if column in dataframe.columns]
+        if not columns:
+            continue
+        values = [dataframe[column].astype("category") for column in columns]
+        categories = union_categoricals(values, ignore_order=True).categories.sort_values()
+        for column, column_values in zip(columns, values):
+            dataframe[column] = column_values.cat.set_categories(categories)
+
+    for column in ["bike_type", "rider_type"]:
+        if column in dataframe.columns:
+            dataframe[column] = dataframe[column].astype("category")
+
+    for column in COORDINATE_COLUMNS:
+        if column in dataframe.columns:
+            dataframe[column] = dataframe[column].astype(np.float32)
+
+    for column in SMALL_INTEGER_COLUMNS:
+        if column in dataframe.columns:
+            dataframe[column] = dataframe[column].astype(np.int8)
+
+    if "start_day_of_week" in dataframe.columns:
+        dataframe["start_day_of_week"] = dataframe["start_day_of_week"].astype(
+            pd.CategoricalDtype(DAYS_ORDER, ordered=True))
+
+    if "ride_id" in dataframe.columns:
+        dataframe["ride_id"] = dataframe["ride_id"].astype(pd.StringDtype("pyarrow"))
+
+    if "trip_duration" in dataframe.columns:
+        duration = dataframe["trip_duration"]
+        if pd.api.types.is_timedelta64_dtype(duration):
+            duration = duration.dt.total_seconds()
+        duration = duration.round()
+        dataframe["trip_duration"] = duration.astype(np.int32 if duration.notna().all() else "Int32")
+
+    report["after"] = int(dataframe.memory_usage(deep=True).sum())
+    return dataframe, report
@@ -0,0 +1,355 @@
+"""
+Trip duration statistics computed from mergeable per-group summaries.
+
+Each chunk or cache partition is reduced to a DurationSummary per group: count, mean and sum of
+squared deviations (the stable form of count / sum / sum of squares) plus a histogram of
+durations on fixed bins. Summaries from different chunks, partitions and worker processes are
+merged, and the tests work on the merged summaries, so comparing electric and classic bikes (or
+rider types, or months) over the full history never builds per-group copies of the trips.
+
+- Welch's t-test uses the count, mean and variance.
+- The Mann-Whitney U test ranks the histogram bins. Durations in the same bin count as ties, so
+  with the default 1-second bins it gives scipy's asymptotic (continuity-corrected) result for
+  whole-second durations.
+- Bootstrap confidence intervals resample the histograms.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from trip_cache import cached_partition_paths
+
+# Histogram bins: 1 second wide up to 24 hours; durations outside are counted in the end bins
+BIN_WIDTH = 1
+MAX_SECONDS = 24 * 60 * 60
+
+
+def bin_count(bin_width, max_seconds):
+    """Number of histogram bins of the given width below max_seconds."""
+    return int(np.ceil(max_seconds / bin_width))
+
+
+class DurationSummary:
+    """
+    Mergeable summary of one group's trip durations.
+
+    Parameters:
+        bin_width (int): Width of the histogram bins in seconds.
+        max_seconds (int): Upper edge of the last histogram bin.
+    """
+
+    def __init__(self, bin_width=BIN_WIDTH, max_seconds=MAX_SECONDS):
+        self.bin_width = bin_width
+        self.max_seconds = max_seconds
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.histogram = np.zeros(bin_count(bin_width, max_seconds), dtype=np.int64)
+
+    @property
+    def sum(self):
+        return self.mean * self.count
+
+    @property
+    def sum_of_squares(self):
+        return self.m2 + self.count * self.mean ** 2
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def bin_centers(self):
+        return (np.arange(len(self.histogram)) + 0.5) * self.bin_width
+
+    def add_moments(self, count, mean, m2):
+        """Merge in the moments of another batch of durations (Chan et al.'s parallel update)."""
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def merge(self, other):
+        """
+        Add the durations summarized by another DurationSummary with the same bins.
+
+        Parameters:
+            other (DurationSummary): Summary to merge in.
+        """
+        self.add_moments(other.count, other.mean, other.m2)
+        self.histogram += other.histogram
+
+    def quantile(self, q):
+        """Approximate quantile(s) from the histogram, to the bin width."""
+        cumulative = np.cumsum(self.histogram)
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side="left")
+        return (np.minimum(positions, len(self.histogram) - 1) + 0.5) * self.bin_width
+
+    def box_stats(self, label=None):
+        """
+        Box plot statistics for Axes.bxp from the histogram, with whiskers at 1.5 IQR and no fliers.
+
+        Parameters:
+            label (str): Label of the box.
+
+        Returns:
+            dict: med, q1, q3, whislo, whishi, fliers and label, to the bin width.
+        """
+        q1, median, q3 = (float(value) for value in self.quantile([0.25, 0.5, 0.75]))
+        iqr = q3 - q1
+
+        # Whiskers end at the most extreme non-empty bins inside the fences
+        centers = self.bin_centers[self.histogram > 0]
+        inside = centers[(centers >= q1 - 1.5 * iqr) & (centers <= q3 + 1.5 * iqr)]
+        whislo = float(inside.min()) if len(inside) else q1
+        whishi = float(inside.max()) if len(inside) else q3
+        return {"med": median, "q1": q1, "q3": q3, "whislo": min(whislo, q1), "whishi": max(whishi, q3),
+                "fliers": [], "label": label}
+
+
+class GroupedDurationStats:
+    """
+    DurationSummary per group, updated one chunk of trips at a time.
+
+    Parameters:
+        by (list): Columns defining the groups, e.g. ["bike_type"] or ["rider_type", "month"].
+            "month" is derived from "started_at" as YYYYMM when the chunk does not have it.
+        bin_width (int): Width of the histogram bins in seconds.
+        max_seconds (int): Upper edge of the last histogram bin.
+    """
+
+    def __init__(self, by, bin_width=BIN_WIDTH, max_seconds=MAX_SECONDS):
+        self.by = list(by)
+        self.bin_width = bin_width
+        self.max_seconds = max_seconds
+        self.groups = {}
+
+    def _summary(self, key):
+        if key not in self.groups:
+            self.groups[key] = DurationSummary(self.bin_width, self.max_seconds)
+        return self.groups[key]
+
+    def update(self, chunk):
+        """
+        Add a chunk of trips to the group summaries.
+
+        Parameters:
+            chunk (pd.DataFrame): Trips with a "trip_duration" column in seconds, or with
+                "started_at" and "ended_at", plus the group columns.
+        """
+        frame = pd.DataFrame({"duration": trip_durations(chunk)}, index=chunk.index)
+        for column in self.by:
+            if column == "month" and "month" not in chunk.columns:
+                frame[column] = (chunk["started_at"].dt.year * 100 + chunk["started_at"].dt.month).to_numpy()
+            else:
+                frame[column] = chunk[column].to_numpy()
+        frame = frame.dropna()
+
+        grouped = frame.groupby(self.by, observed=True, sort=True)["duration"]
+        moments = grouped.agg(["count", "mean", "var"])
+        group_codes = grouped.ngroup().to_numpy()
+
+        # One histogram per group from a single bincount over (group, bin) pairs
+        bins_per_group = bin_count(self.bin_width, self.max_seconds)
+        bins = np.clip((frame["duration"].to_numpy() // self.bin_width).astype(np.int64), 0, bins_per_group - 1)
+        histograms = np.bincount(group_codes * bins_per_group + bins,
+                                 minlength=len(moments) * bins_per_group).reshape(len(moments), bins_per_group)
+
+        for key, row, histogram in zip(moments.index, moments.itertuples(index=False), histograms):
+            m2 = row.var * (row.count - 1) if row.count > 1 else 0.0
+            summary = self._summary(key)
+            summary.add_moments(int(row.count), float(row.mean), float(m2))
+            summary.histogram += histogram
+
+    def merge(self, other):
+        """
+        Add the summaries of another GroupedDurationStats with the same groups and bins.
+
+        Parameters:
+            other (GroupedDurationStats): Summaries to merge in.
+        """
+        for key, summary in other.groups.items():
+            self._summary(key).merge(summary)
+
+    def table(self):
+        """Count, mean, standard deviation and median of every group, as a DataFrame."""
+        rows = {key: {"count": summary.count, "mean": summary.mean, "std": summary.std,
+                      "median": float(summary.quantile(0.5))}
+                for key, summary in sorted(self.groups.items())}
+        table = pd.DataFrame.from_dict(rows, orient="index")
+        table.index.names = self.by
+        return table
+
+
+def trip_durations(chunk):
+    """Trip durations in seconds as float64, from "trip_duration" or the start and end times."""
+    if "trip_duration" in chunk.columns:
+        return chunk["trip_duration"].to_numpy(dtype=np.float64)
+    return (chunk["ended_at"] - chunk["started_at"]).dt.total_seconds().to_numpy()
+
+
+def welch_ttest(a, b):
+    """
+    Welch's unequal-variance t-test between two groups.
+
+    Parameters:
+        a (DurationSummary): First group.
+        b (DurationSummary): Second group.
+
+    Returns:
+        tuple: The t-statistic and two-sided p-value.
+    """
+    # scipy is only needed by the tests, not by the worker processes that import this module
+    from scipy import stats
+
+    result = stats.ttest_ind_from_stats(a.mean, a.std, a.count, b.mean, b.std, b.count, equal_var=False)
+    return result.statistic, result.pvalue
+
+
+def mann_whitney(a, b, use_continuity=True):
+    """
+    Two-sided Mann-Whitney U test between two groups, from their histograms.
+
+    Durations in the same bin are treated as ties, and the normal approximation with tie
+    correction is used, which is accurate for the group sizes of trip data. With the continuity
+    correction this is scipy.stats.mannwhitneyu(method="asymptotic") on the binned durations.
+
+    Parameters:
+        a (DurationSummary): First group.
+        b (DurationSummary): Second group.
+        use_continuity (bool): Apply the 0.5 continuity correction, as scipy does by default.
+
+    Returns:
+        tuple: The U statistic of the first group and the two-sided p-value.
+    """
+    from scipy import stats
+
+    n_a, n_b = a.histogram.sum(), b.histogram.sum()
+
+    # Each value of a beats every value of b in lower bins and ties with half of those in its own bin
+    b_below = np.cumsum(b.histogram) - b.histogram
+    u_statistic = float(np.sum(a.histogram * (b_below + 0.5 * b.histogram)))
+
+    total = n_a + n_b
+    ties = (a.histogram + b.histogram).astype(np.float64)
+    tie_correction = np.sum(ties ** 3 - ties) / (total * (total - 1))
+    sigma = np.sqrt(n_a * n_b / 12.0 * ((total + 1) - tie_correction))
+    z_score = (abs(u_statistic - n_a * n_b / 2.0) - (0.5 if use_continuity else 0.0)) / sigma
+    return u_statistic, float(np.clip(2 * stats.norm.sf(z_score), 0, 1))
+
+
+def bootstrap_mean_difference(a, b, n_resamples=1000, confidence=0.95, seed=None, batch_size=50):
+    """
+    Bootstrap confidence interval for the difference in mean duration (a minus b).
+
+    Each resample draws Poisson(count) trips from every non-empty histogram bin, which
+    approximates resampling the trips with replacement without materializing them. Durations are
+    represented by their bin centers.
+
+    Parameters:
+        a (DurationSummary): First group.
+        b (DurationSummary): Second group.
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level of the interval.
+        seed (int): Seed for the random generator.
+        batch_size (int): Resamples drawn at a time, to bound memory.
+
+    Returns:
+        tuple: Lower and upper bound of the interval.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Empty bins always draw zero trips, so only the occupied bins are resampled
+    occupied = [np.flatnonzero(summary.histogram) for summary in (a, b)]
+    groups = [(summary.histogram[bins], summary.bin_centers[bins]) for summary, bins in zip((a, b), occupied)]
+
+    differences = []
+    for start in range(0, n_resamples, batch_size):
+        size = min(batch_size, n_resamples - start)
+        means = []
+        for histogram, centers in groups:
+            counts = rng.poisson(histogram, size=(size, len(histogram)))
+            means.append(counts @ centers / np.maximum(counts.sum(axis=1), 1))
+        differences.append(means[0] - means[1])
+
+    alpha = (1 - confidence) / 2
+    return tuple(np.quantile(np.concatenate(differences), [alpha, 1 - alpha]))
+
+
+def summarize_partition(path, by, bin_width=BIN_WIDTH, max_seconds=MAX_SECONDS):
+    """
+    Summarize the trip durations of one cache partition file.
+
+    Parameters:
+        path (str): Path to the Parquet partition file.
+        by (list): Group columns.
+        bin_width (int): Width of the histogram bins in seconds.
+        max_seconds (int): Upper edge of the last histogram bin.
+
+    Returns:
+        GroupedDurationStats: The partition's summaries.
+    """
+    available = pq.read_schema(path).names
+    columns = ["trip_duration"] if "trip_duration" in available else ["started_at", "ended_at"]
+    if "month" in by and "started_at" not in columns:
+        columns.append("started_at")
+    columns += [column for column in by if column != "month"]
+
+    summaries = GroupedDurationStats(by, bin_width, max_seconds)
+    summaries.update(pq.read_table(path, columns=columns).to_pandas())
+    return summaries
+
+
+def summarize_cached_durations(cache_dir, by, months=None, max_workers=None,
+                               bin_width=BIN_WIDTH, max_seconds=MAX_SECONDS):
+    """
+    Summarize trip durations per group over the trip cache, one partition per worker task.
+
+    Parameters:
+        cache_dir (str): Cache directory written by trip_cache.update_trip_cache.
+        by (list): Group columns, e.g. ["bike_type"], ["rider_type"] or ["month"].
+        months (list): "YYYY-MM" strings or (year, month) tuples to include. Defaults to all months.
+        max_workers (int): Number of worker processes. Defaults to the number of CPUs.
+        bin_width (int): Width of the histogram bins in seconds.
+        max_seconds (int): Upper edge of the last histogram bin.
+
+    Returns:
+        GroupedDurationStats: Summaries merged over all partitions.
+    """
+    paths = cached_partition_paths(cache_dir, months)
+    summaries = GroupedDurationStats(by, bin_width, max_seconds)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(summarize_partition, path, list(by), bin_width, max_seconds) for path in paths]
+        for future in futures:
+            summaries.merge(future.result())
+    return summaries
+
+
+def compare_durations(a, b, n_resamples=1000, seed=None):
+    """
+    Run every duration comparison between two groups.
+
+    Parameters:
+        a (DurationSummary): First group.
+        b (DurationSummary): Second group.
+        n_resamples (int): Number of bootstrap resamples.
+        seed (int): Seed for the bootstrap.
+
+    Returns:
+        dict: Welch t-test, Mann-Whitney U test and bootstrap interval of the mean difference.
+    """
+    t_stat, t_p_value = welch_ttest(a, b)
+    u_stat, u_p_value = mann_whitney(a, b)
+    low, high = bootstrap_mean_difference(a, b, n_resamples=n_resamples, seed=seed)
+    return {"welch_t": t_stat, "welch_p": t_p_value, "mann_whitney_u": u_stat, "mann_whitney_p": u_p_value,
+            "mean_difference": a.mean - b.mean, "mean_difference_ci": (low, high)}
@@ -0,0 +1,274 @@
+"""
+Streaming, chunked version of the trip cleaning pipeline.
+
+Each CSV file is read in fixed-size chunks that are pushed through a chain of generator stages:
+the cleaning steps from trip_cleaning, incremental counters for the hourly, weekday and rider/bike
+type breakdowns, and finally an output sink. Only one chunk is in memory at a time, so the full
+Bluebikes history can be processed on a machine that cannot hold it.
+
+Because the steps only see one chunk, the output keeps the input order (file by file) instead of
+being sorted by "started_at".
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline_profile import profile_step
+from trip_cleaning import clean_trip_chunk
+from trip_ingest import find_trip_files
+from trip_schema import COLUMN_RENAMES, DAYS_ORDER, TIMESTAMP_COLUMNS, raw_dtypes
+from trip_timestamps import parse_timestamp_columns
+
+
+def read_trip_chunks(csv_files, chunksize=500_000, timestamp_report=None):
+    """
+    Read trip CSV files in chunks with the pinned schema and renamed columns.
+
+    Parameters:
+        csv_files (list): Paths to the CSV files, read in order.
+        chunksize (int): Number of rows per chunk.
+        timestamp_report (dict): Updated with the timestamp parsing counts (see parse_trip_timestamps).
+
+    Yields:
+        pd.DataFrame: One chunk of trips.
+    """
+    for file in csv_files:
+        with pd.read_csv(file, dtype=raw_dtypes(), chunksize=chunksize) as reader:
+            while True:
+                with profile_step("read_csv") as step:
+                    chunk = next(reader, None)
+                    step["rows_out"] = 0 if chunk is None else len(chunk)
+                if chunk is None:
+                    break
+                with profile_step("parse_timestamps", len(chunk)) as step:
+                    parse_timestamp_columns(chunk, TIMESTAMP_COLUMNS, timestamp_report)
+                    step["rows_out"] = len(chunk)
+                yield chunk.rename(columns=COLUMN_RENAMES)
+
+
+def clean_chunks(chunks, counts):
+    """
+    Apply the row-by-row cleaning steps to each chunk.
+
+    Parameters:
+        chunks (iterable): Chunks of trip data.
+        counts (Counter): Updated with the number of rows affected by each step.
+
+    Yields:
+        pd.DataFrame: The cleaned chunk.
+    """
+    for chunk in chunks:
+        chunk, chunk_counts = clean_trip_chunk(chunk)
+        counts.update(chunk_counts)
+        yield chunk
+
+
+def count_chunks(chunks, aggregates):
+    """
+    Add each chunk to the running trip counts and pass it on unchanged.
+
+    Parameters:
+        chunks (iterable): Chunks of cleaned trip data.
+        aggregates (TripAggregates): The running counts.
+
+    Yields:
+        pd.DataFrame: The same chunk.
+    """
+    for chunk in chunks:
+        aggregates.update(chunk)
+        yield chunk
+
+
+class TripAggregates:
+    """
+    Trip start counts accumulated one chunk at a time.
+
+    Holds the same breakdowns the analysis plots use: trips per hour of day, per day of week and
+    hour, per hour and rider type, per hour and bike type, and per rider type and bike type.
+    The memory used depends only on the number of rider and bike types.
+    """
+
+    def __init__(self):
+        self.hourly = np.zeros(24, dtype=np.int64)
+        self.weekday_hourly = np.zeros((7, 24), dtype=np.int64)
+        self.hourly_by = {"rider_type": {}, "bike_type": {}}
+        self.rider_bike = Counter()
+
+    def update(self, chunk):
+        """
+        Add the trips in a chunk to the counts.
+
+        Parameters:
+            chunk (pd.DataFrame): Cleaned trips with a datetime "started_at" column.
+        """
+        hours = chunk["started_at"].dt.hour.to_numpy()
+        weekdays = chunk["started_at"].dt.dayofweek.to_numpy()
+
+        self.hourly += np.bincount(hours, minlength=24)
+        self.weekday_hourly += np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+
+        for column, counts in self.hourly_by.items():
+            values = chunk[column].astype("category")
+            categories = values.cat.categories
+            codes = values.cat.codes.to_numpy().astype(np.int64)
+            by_hour = np.bincount(codes * 24 + hours, minlength=len(categories) * 24).reshape(-1, 24)
+            for category, category_counts in zip(categories, by_hour):
+                counts[category] = counts.get(category, 0) + category_counts
+
+        pairs = chunk.groupby(["rider_type", "bike_type"], observed=True).size()
+        self.rider_bike.update({pair: int(count) for pair, count in pairs.items()})
+
+    def merge(self, other):
+        """
+        Add the counts from another TripAggregates, e.g. one built from a different set of files.
+
+        Parameters:
+            other (TripAggregates): Counts to add.
+        """
+        self.hourly += other.hourly
+        self.weekday_hourly += other.weekday_hourly
+        for column, counts in self.hourly_by.items():
+            for category, category_counts in other.hourly_by[column].items():
+                counts[category] = counts.get(category, 0) + category_counts
+        self.rider_bike.update(other.rider_bike)
+
+    def hourly_trip_starts(self):
+        """Total trips per hour of day, as a "start_hour" / "Total Start Trips" table."""
+        return pd.DataFrame({"start_hour": np.arange(24), "Total Start Trips": self.hourly})
+
+    def hourly_weekly_trip_starts(self):
+        """Total trips per day of week (rows, Monday first) and hour of day (columns)."""
+        return pd.DataFrame(self.weekday_hourly, index=pd.Index(DAYS_ORDER, name="start_day_of_week"),
+                            columns=pd.RangeIndex(24, name="start_hour"))
+
+    def hourly_trip_starts_by(self, column):
+        """
+        Total trips per hour of day (rows) for each value of a column (columns).
+
+        Parameters:
+            column (str): "rider_type" or "bike_type".
+        """
+        counts = self.hourly_by[column]
+        table = pd.DataFrame({category: counts[category] for category in sorted(counts)},
+                             index=pd.RangeIndex(24, name="start_hour"))
+        table.columns.name = column
+        return table
+
+    def rider_type_analysis(self):
+        """Total trips per rider type (rows) and bike type (columns)."""
+        table = pd.Series(self.rider_bike, dtype=np.int64).unstack(fill_value=0)
+        table.index.name = "rider_type"
+        table.columns.name = "bike_type"
+        return table.sort_index().sort_index(axis=1)
+
+
+def sink_schema(schema):
+    """
+    Widen the schema Arrow inferred from one chunk so every later chunk can be cast to it.
+
+    Arrow sizes the dictionary indices of a categorical column by that chunk's number of
+    categories, so a small first chunk would get int8 indices that cannot hold the codes of a
+    larger one. Dictionary columns get int32 indices, and columns that were all null in the first
+    chunk are taken to be strings.
+
+    Parameters:
+        schema (pa.Schema): Schema of the first chunk.
+
+    Returns:
+        pa.Schema: The schema every chunk is written with.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            value_type = pa.string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+            field = field.with_type(pa.dictionary(pa.int32(), value_type))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+class ParquetSink:
+    """
+    Write chunks to a single Parquet file, one row group per chunk.
+
+    Parameters:
+        path (str): Output file path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, sink_schema(table.schema))
+        # Categorical index widths depend on each chunk's categories, so every chunk is cast to the fixed schema
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvSink:
+    """
+    Append chunks to a single CSV file, writing the header once.
+
+    Parameters:
+        path (str): Output file path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header_written = False
+
+    def write(self, chunk):
+        chunk.to_csv(self.path, mode="a" if self.header_written else "w", header=not self.header_written,
+                     index=False)
+        self.header_written = True
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def stream_clean_trips(folder_path, sink, chunksize=500_000, pattern="*.csv"):
+    """
+    Clean every trip CSV file in a folder chunk by chunk and write the result to a sink.
+
+    Parameters:
+        folder_path (str): Folder containing the monthly trip CSV files.
+        sink (ParquetSink or CsvSink): Where the cleaned chunks are written. The caller closes it.
+        chunksize (int): Number of rows per chunk.
+        pattern (str): Glob pattern the file names must match.
+
+    Returns:
+        tuple: The cleaning and timestamp parsing counts (Counter) and the trip counts (TripAggregates).
+    """
+    counts = Counter()
+    aggregates = TripAggregates()
+
+    chunks = read_trip_chunks(find_trip_files(folder_path, pattern), chunksize, counts)
+    chunks = clean_chunks(chunks, counts)
+    chunks = count_chunks(chunks, aggregates)
+    for chunk in chunks:
+        sink.write(chunk)
+
+    return counts, aggregates
@@ -0,0 +1,302 @@
+"""
+Synthetic Bluebikes trip data for benchmarking the cleaning and analysis pipeline.
+
+Writes one CSV file per month with the raw Bluebikes header, at any scale from a few thousand to
+hundreds of millions of rows. Rows are generated and written in chunks, so memory use depends on
+the chunk size and not on the number of rows. The data has the shape the pipeline expects (morning
+and evening peaks, a few popular stations, mostly members, log-normal trip durations) and the
+problems the cleaning steps fix, each at a configurable rate:
+
+- station names written with non-breaking spaces,
+- trips starting or ending at the nonexistent station S32020,
+- timestamps with fractional seconds,
+- old spellings of renamed station names (the "from" names in station_remap.json),
+- "Tremont St at Court St" recorded under station ID A32046,
+- missing end stations, and trip durations that are negative, under a minute or over a day.
+
+The same seed always writes the same files. A manifest with the parameters is written next to the
+CSV files so benchmark results can record the data they were measured on.
+
+Usage:
+    python trip_synth.py data/synthetic --rows 10000000 --months 12 --seed 0
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from station_remap import DEFAULT_REMAP_PATH
+
+# Raw column order of the Bluebikes CSV files
+RAW_COLUMNS = ["ride_id", "rideable_type", "started_at", "ended_at", "start_station_name", "start_station_id",
+               "end_station_name", "end_station_id", "start_lat", "start_lng", "end_lat", "end_lng",
+               "member_casual"]
+
+MANIFEST_NAME = "synthetic_manifest.json"
+
+DROPPED_STATION_ID = "S32020"
+DROPPED_STATION_NAME = "Bluebikes Test Station"
+MISLABELED_STATION_ID = "A32046"
+MISLABELED_STATION_NAME = "Tremont St at Court St"
+
+# Fraction of rows with each injected problem
+DEFAULT_RATES = {
+    "nbsp_names": 0.01,
+    "dropped_station": 0.002,
+    "fractional_seconds": 0.05,
+    "old_names": 0.01,
+    "mislabeled_station": 0.001,
+    "missing_end_station": 0.005,
+    "bad_duration": 0.005
+}
+
+# Relative number of trips starting in each hour of the day, with the 8:00 and 17:00 peaks
+HOURLY_WEIGHTS = np.array([3, 2, 1, 1, 1, 3, 8, 16, 24, 15, 10, 11, 13, 13, 13, 16, 21, 27, 20, 14, 10, 8, 6, 4],
+                          dtype=np.float64)
+
+STREETS = ["Main St", "Washington St", "Massachusetts Ave", "Beacon St", "Boylston St", "Cambridge St",
+           "Commonwealth Ave", "Harvard St", "Broadway", "Summer St", "Huntington Ave", "Columbus Ave",
+           "Tremont St", "Hampshire St", "Prospect St", "Elm St", "Highland Ave", "Central St", "School St",
+           "Hancock St", "Adams St", "Centre St", "Dorchester Ave", "Blue Hill Ave", "Brighton Ave",
+           "Western Ave", "River St", "Green St", "Charles St", "Bowdoin St"]
+CROSS_STREETS = ["Oak St", "Pine St", "Maple Ave", "Cedar St", "Chestnut St", "Walnut St", "Spring St",
+                 "Park St", "Union Sq", "Church St", "Court St", "Mill St", "Water St", "Pearl St", "Cherry St",
+                 "Franklin St", "Lincoln St", "Warren St", "Putnam Ave", "Dudley St", "Essex St", "Kent St",
+                 "Leonard St", "Medford St", "Norfolk St", "Otis St", "Perry St", "Quincy Ave", "Rindge Ave",
+                 "Sidney St"]
+
+
+class StationSet:
+    """
+    The stations trips are drawn from, with their popularity, coordinates and name variants.
+
+    Name variants are stored in one array so a trip's name is picked with a single index:
+    the canonical names come first, followed by the same names with non-breaking spaces and the
+    old spellings of renamed stations.
+
+    Parameters:
+        count (int): Number of stations.
+        rng (np.random.Generator): Random generator.
+        remap_path (str): station_remap.json, for the canonical and old names of renamed stations.
+    """
+
+    def __init__(self, count, rng, remap_path=DEFAULT_REMAP_PATH):
+        with open(remap_path, encoding="utf-8") as file:
+            renames = json.load(file).get("rename", [])
+
+        # Renamed stations first, so their old spellings can be injected, then generated names
+        names = []
+        for rule in renames:
+            if rule["to"] not in names:
+                names.append(rule["to"])
+        generated = (f"{street} at {cross}" for street in STREETS for cross in CROSS_STREETS)
+        for name in generated:
+            if len(names) >= count:
+                break
+            if name not in names:
+                names.append(name)
+        count = len(names)
+
+        self.names = np.array(names, dtype=object)
+        # Canal St at Causeway St keeps its real ID, which the mislabeled rows reuse
+        other_ids = (f"A{number}" for number in range(32000, 40000) if f"A{number}" != MISLABELED_STATION_ID)
+        self.ids = np.array([MISLABELED_STATION_ID if name == "Canal St at Causeway St" else next(other_ids)
+                             for name in names], dtype=object)
+
+        # Zipf-like popularity: a few busy stations and a long tail
+        weights = 1.0 / (np.arange(count) + 10.0)
+        self.probabilities = rng.permutation(weights / weights.sum())
+        self.lat = 42.36 + rng.normal(0, 0.04, count)
+        self.lng = -71.08 + rng.normal(0, 0.05, count)
+
+        # Old spelling per station, or -1; indexes into the variant array below
+        old_names = [rule["from"] for rule in renames]
+        self.old_name_index = np.full(count, -1, dtype=np.int64)
+        for position, rule in enumerate(renames):
+            self.old_name_index[names.index(rule["to"])] = 2 * count + position
+        self.name_variants = np.concatenate([self.names, [name.replace(" ", "\u00a0") for name in names],
+                                             np.array(old_names, dtype=object)])
+
+    def __len__(self):
+        return len(self.names)
+
+
+def _inject(rng, size, rate):
+    """Boolean mask selecting a fraction rate of size rows."""
+    return rng.random(size) < rate if rate > 0 else np.zeros(size, dtype=bool)
+
+
+def _format_timestamps(seconds, fractional):
+    """
+    Format epoch seconds as "YYYY-MM-DD HH:MM:SS", with milliseconds appended where fractional is set.
+
+    Returns:
+        pa.Array: The timestamp strings.
+    """
+    text = pc.strftime(pa.array(seconds.astype("datetime64[s]")), format="%Y-%m-%d %H:%M:%S")
+    if fractional.any():
+        milliseconds = pc.utf8_lpad(pa.array(np.arange(len(seconds)) % 1000).cast(pa.string()), 3, "0")
+        with_fraction = pc.binary_join_element_wise(text, milliseconds, ".")
+        text = pc.if_else(pa.array(fractional), with_fraction, text)
+    return text
+
+
+def _station_names(stations, index, nbsp, old_name):
+    """Station name of each trip, switched to a NBSP or old-spelling variant where requested."""
+    variant = index.copy()
+    variant[nbsp] += len(stations)
+    old = old_name & (stations.old_name_index[index] >= 0)
+    variant[old] = stations.old_name_index[index[old]]
+    return stations.name_variants[variant]
+
+
+def generate_chunk(rng, stations, size, month_start, month_seconds, first_ride, rates):
+    """
+    Generate one chunk of trips.
+
+    Parameters:
+        rng (np.random.Generator): Random generator.
+        stations (StationSet): Stations to draw from.
+        size (int): Number of trips.
+        month_start (np.datetime64): First second of the month.
+        month_seconds (int): Length of the month in seconds.
+        first_ride (int): Number of the first trip, for unique ride IDs.
+        rates (dict): Fraction of rows with each injected problem (see DEFAULT_RATES).
+
+    Returns:
+        pa.Table: The trips, with RAW_COLUMNS.
+    """
+    # Start times: a uniform day, an hour from the daily profile and a uniform second in the hour
+    days = rng.integers(0, month_seconds // 86400, size)
+    hours = rng.choice(24, size, p=HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum())
+    started = month_start.astype(np.int64) + days * 86400 + hours * 3600 + rng.integers(0, 3600, size)
+
+    # Durations around 12 minutes, plus a share of negative, sub-minute and over-a-day trips
+    durations = np.clip(rng.lognormal(np.log(700), 0.8, size), 60, 86400).astype(np.int64)
+    bad = np.flatnonzero(_inject(rng, size, rates["bad_duration"]))
+    durations[bad] = rng.choice(np.array([-120, 30, 2 * 86400]), len(bad))
+    ended = started + durations
+
+    start_index = rng.choice(len(stations), size, p=stations.probabilities)
+    end_index = rng.choice(len(stations), size, p=stations.probabilities)
+
+    columns = {"ride_id": pa.array(np.arange(first_ride, first_ride + size)).cast(pa.string()),
+               "rideable_type": pa.array(np.where(rng.random(size) < 0.6, "classic_bike", "electric_bike")),
+               "started_at": _format_timestamps(started, _inject(rng, size, rates["fractional_seconds"])),
+               "ended_at": _format_timestamps(ended, _inject(rng, size, rates["fractional_seconds"]))}
+
+    for side, index in (("start", start_index), ("end", end_index)):
+        names = _station_names(stations, index, _inject(rng, size, rates["nbsp_names"]),
+                               _inject(rng, size, rates["old_names"]))
+        ids = stations.ids[index]
+
+        dropped = _inject(rng, size, rates["dropped_station"] / 2)
+        names[dropped], ids[dropped] = DROPPED_STATION_NAME, DROPPED_STATION_ID
+        mislabeled = _inject(rng, size, rates["mislabeled_station"] / 2)
+        names[mislabeled], ids[mislabeled] = MISLABELED_STATION_NAME, MISLABELED_STATION_ID
+
+        missing = _inject(rng, size, rates["missing_end_station"]) if side == "end" else None
+        columns[f"{side}_station_name"] = pa.array(names, type=pa.string(), mask=missing)
+        columns[f"{side}_station_id"] = pa.array(ids, type=pa.string(), mask=missing)
+
+    for side, index in (("start", start_index), ("end", end_index)):
+        columns[f"{side}_lat"] = pa.array(np.round(stations.lat[index] + rng.normal(0, 1e-4, size), 6))
+        columns[f"{side}_lng"] = pa.array(np.round(stations.lng[index] + rng.normal(0, 1e-4, size), 6))
+
+    columns["member_casual"] = pa.array(np.where(rng.random(size) < 0.75, "member", "casual"))
+    return pa.table({column: columns[column] for column in RAW_COLUMNS})
+
+
+def generate_trip_files(output_dir, rows, months=12, year=2024, stations=600, seed=0, chunk_rows=1_000_000,
+                        rates=None):
+    """
+    Write synthetic monthly trip CSV files.
+
+    Parameters:
+        output_dir (str): Folder for the CSV files and the manifest, created if needed.
+        rows (int): Total number of trips, split evenly over the months.
+        months (int): Number of monthly files, starting in January (at most 12).
+        year (int): Year of the trips.
+        stations (int): Number of stations (at most the number of generated names).
+        seed (int): Seed; the same seed writes the same files.
+        chunk_rows (int): Trips generated and written at a time.
+        rates (dict): Overrides for DEFAULT_RATES.
+
+    Returns:
+        dict: The manifest, with the parameters and the files written.
+    """
+    if not 1 <= months <= 12:
+        raise ValueError("months must be between 1 and 12")
+    rates = {**DEFAULT_RATES, **(rates or {})}
+    rng = np.random.default_rng(seed)
+    station_set = StationSet(stations, rng)
+    os.makedirs(output_dir, exist_ok=True)
+
+    files = []
+    first_ride = 0
+    for month in range(1, months + 1):
+        month_start = np.datetime64(f"{year}-{month:02d}-01T00:00:00")
+        month_end = np.datetime64(f"{year + month // 12}-{month % 12 + 1:02d}-01T00:00:00")
+        month_seconds = int((month_end - month_start) / np.timedelta64(1, "s"))
+        month_rows = rows // months + (1 if month <= rows % months else 0)
+
+        path = os.path.join(output_dir, f"{year}{month:02d}-bluebikes-tripdata.csv")
+        with pa_csv.CSVWriter(path, generate_chunk(rng, station_set, 0, month_start, month_seconds, 0, rates).schema,
+                              write_options=pa_csv.WriteOptions(quoting_style="needed")) as writer:
+            for offset in range(0, month_rows, chunk_rows):
+                size = min(chunk_rows, month_rows - offset)
+                writer.write_table(generate_chunk(rng, station_set, size, month_start, month_seconds,
+                                                  first_ride, rates))
+                first_ride += size
+        files.append({"file": os.path.basename(path), "rows": month_rows})
+        print(f"Wrote {month_rows} trips to {path}")
+
+    manifest = {"rows": rows, "months": months, "year": year, "stations": len(station_set), "seed": seed,
+                "chunk_rows": chunk_rows, "rates": rates, "files": files}
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def read_generator_manifest(folder_path):
+    """The manifest of a synthetic data folder, or None for real trip data."""
+    path = os.path.join(folder_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def add_generator_arguments(parser):
+    """Add the generator options to an argument parser (shared with trip_benchmark)."""
+    parser.add_argument("output_dir", help="Folder for the monthly CSV files")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Total number of trips")
+    parser.add_argument("--months", type=int, default=12, help="Number of monthly files")
+    parser.add_argument("--year", type=int, default=2024, help="Year of the trips")
+    parser.add_argument("--stations", type=int, default=600, help="Number of stations")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Trips generated at a time")
+    for name, rate in DEFAULT_RATES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}-rate", type=float, default=rate, dest=f"rate_{name}",
+                            help=f"Fraction of rows with {name.replace('_', ' ')} (default {rate})")
+
+
+def generate_from_arguments(args):
+    rates = {name: getattr(args, f"rate_{name}") for name in DEFAULT_RATES}
+    return generate_trip_files(args.output_dir, args.rows, months=args.months, year=args.year,
+                               stations=args.stations, seed=args.seed, chunk_rows=args.chunk_rows, rates=rates)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic Bluebikes trip CSV files.")
+    add_generator_arguments(parser)
+    manifest = generate_from_arguments(parser.parse_args(argv))
+    print(f"Wrote {manifest['rows']} trips in {len(manifest['files'])} files")
+
+
+if __name__ == "__main__":
+    main()
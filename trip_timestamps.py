@@ -0,0 +1,65 @@
+"""
+Timestamp parsing for the "started_at" and "ended_at" trip columns.
+
+Most Bluebikes timestamps look like "2024-01-12 12:06:52", but some months write fractional seconds
+("2024-01-12 12:06:52.123"). Parsing with the fixed format alone turns those into NaT, so values
+that do not match it are parsed again as ISO 8601. Trip files repeat the same second many times,
+so each distinct string is parsed only once.
+"""
+import numpy as np
+import pandas as pd
+
+FAST_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_trip_timestamps(values, report=None):
+    """
+    Parse trip timestamp strings, with or without fractional seconds.
+
+    Parameters:
+        values (pd.Series or array-like): Timestamp strings; missing values stay missing.
+        report (dict): Updated with the number of "timestamps" parsed, "distinct_timestamps",
+            "fallback_timestamps" (values that needed the ISO 8601 parser) and
+            "unparsed_timestamps" (non-missing values that could not be parsed and became NaT).
+
+    Returns:
+        pd.Series: The parsed timestamps, with the same index as values when it is a Series.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+
+    # Fast path: the fixed format, which covers almost every value
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=FAST_FORMAT, errors="coerce").to_numpy(copy=True)
+    fallback = np.isnat(parsed)
+
+    # Slow path: fractional seconds and any other ISO 8601 variant
+    if fallback.any():
+        slow = pd.to_datetime(pd.Series(uniques[fallback], dtype=object), format="ISO8601", errors="coerce")
+        parsed[fallback] = slow.to_numpy().astype(parsed.dtype)
+    unparsed = np.isnat(parsed)
+
+    if report is not None:
+        # Row counts per distinct string, to report rows rather than distinct values
+        present = codes >= 0
+        occurrences = np.bincount(codes[present], minlength=len(uniques))
+        report["timestamps"] = report.get("timestamps", 0) + int(present.sum())
+        report["distinct_timestamps"] = report.get("distinct_timestamps", 0) + len(uniques)
+        report["fallback_timestamps"] = report.get("fallback_timestamps", 0) + int(occurrences[fallback].sum())
+        report["unparsed_timestamps"] = report.get("unparsed_timestamps", 0) + int(occurrences[unparsed].sum())
+
+    # Missing values have code -1, which picks the NaT appended at the end
+    parsed = np.append(parsed, np.array(["NaT"], dtype=parsed.dtype))
+    return pd.Series(parsed[codes], index=index, name=getattr(values, "name", None))
+
+
+def parse_timestamp_columns(dataframe, columns, report=None):
+    """
+    Parse several timestamp columns of a DataFrame in place.
+
+    Parameters:
+        dataframe (pd.DataFrame): Frame holding the timestamp strings.
+        columns (list): Names of the timestamp columns.
+        report (dict): Updated with the parsing counts, summed over the columns.
+    """
+    for column in columns:
+        dataframe[column] = parse_trip_timestamps(dataframe[column], report)